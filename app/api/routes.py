@@ -1,13 +1,75 @@
 """Маршруты Flask: форма и JSON API."""
 
-from flask import Blueprint, render_template, request, jsonify
+import json
+import time
+from typing import Optional
 
-from app.services import RequestAnalyzerService
+from flask import Blueprint, Response, g, render_template, request, jsonify, stream_with_context
 
+from app.db import fts_available, list_requests, search_requests
+from app.db.queries import MAX_PAGE_SIZE
+from app.metrics import HTTP_REQUEST_SECONDS, render_metrics, server_timing_header, start_request_timing
+from app.services import JobWorkerPool, RequestAnalyzerService
 
-def register_routes(app, analyzer_service: RequestAnalyzerService) -> None:
+
+def _int_arg(name: str) -> Optional[int]:
+    """Целочисленный query-параметр или None; ValueError при некорректном значении."""
+    value = request.args.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Параметр {name} должен быть целым числом")
+
+
+def _bool_arg(name: str) -> Optional[bool]:
+    value = request.args.get(name)
+    if value is None or value == "":
+        return None
+    value = value.strip().lower()
+    if value in ("1", "true", "yes"):
+        return True
+    if value in ("0", "false", "no"):
+        return False
+    raise ValueError(f"Параметр {name} должен быть true или false")
+
+
+def register_routes(
+    app,
+    analyzer_service: RequestAnalyzerService,
+    job_pool: Optional[JobWorkerPool] = None,
+    batch_max_size: int = 500,
+    metrics_enabled: bool = True,
+    server_timing: bool = False,
+) -> None:
     """Зарегистрировать маршруты на экземпляре Flask app."""
 
+    if metrics_enabled:
+        @app.before_request
+        def _start_timing():
+            g.request_started = time.perf_counter()
+            g.stage_timings = start_request_timing()
+
+        @app.after_request
+        def _record_timing(response):
+            started = g.get("request_started")
+            if started is None:
+                return response
+            # Шаблон маршрута, а не путь: /api/jobs/<int:job_id> — одна серия на все id
+            endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+            HTTP_REQUEST_SECONDS.labels(
+                endpoint=endpoint, method=request.method, status=str(response.status_code)
+            ).observe(time.perf_counter() - started)
+            if server_timing and g.stage_timings:
+                response.headers["Server-Timing"] = server_timing_header(g.stage_timings)
+            return response
+
+        @app.route("/metrics", methods=["GET"])
+        def metrics():
+            body, content_type = render_metrics()
+            return Response(body, content_type=content_type)
+
     @app.route("/", methods=["GET"])
     def index():
         return render_template(
@@ -34,6 +96,26 @@ def register_routes(app, analyzer_service: RequestAnalyzerService) -> None:
             fields=result.get("fields"),
         )
 
+    @app.route("/health/live", methods=["GET"])
+    def health_live():
+        return jsonify({"status": "ok"})
+
+    @app.route("/health/ready", methods=["GET"])
+    def health_ready():
+        ml_model = analyzer_service.ml_model
+        if not ml_model.is_loaded:
+            try:
+                ml_model.load()
+            except FileNotFoundError as e:
+                return jsonify({
+                    "status": "not_ready",
+                    "model": {"loaded": False, "error": str(e)},
+                }), 503
+        return jsonify({
+            "status": "ready",
+            "model": {"loaded": True, "kind": ml_model.loaded_kind, "version": ml_model.version},
+        })
+
     @app.route("/api/analyze", methods=["POST"])
     def api_analyze():
         data = request.get_json(silent=True) or {}
@@ -41,10 +123,123 @@ def register_routes(app, analyzer_service: RequestAnalyzerService) -> None:
         result = analyzer_service.analyze(text, save=True)
         if "error" in result:
             return jsonify({"error": result["error"]}), 400
+        if analyzer_service.classify_only:
+            return jsonify(result)
         return jsonify({
             "id": result.get("id"),
             "label": result.get("label"),
             "confidence": result.get("confidence"),
+            "model_version": result.get("model_version"),
             "summary": result.get("summary"),
             "fields": result.get("fields"),
+            "field_sources": result.get("field_sources"),
+            "duplicate_of": result.get("duplicate_of"),
+        })
+
+    @app.route("/api/analyze/stream", methods=["POST"])
+    def api_analyze_stream():
+        """Server-Sent Events: label сразу, затем фрагменты резюме, поля и итог."""
+        data = request.get_json(silent=True) or request.form
+        text = data.get("text") or ""
+
+        def events():
+            for event, payload in analyzer_service.analyze_stream(text, save=True):
+                yield f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+        return Response(
+            stream_with_context(events()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.route("/api/analyze/batch", methods=["POST"])
+    def api_analyze_batch():
+        data = request.get_json(silent=True) or {}
+        texts = data.get("texts")
+        if not isinstance(texts, list) or not texts:
+            return jsonify({"error": "Поле texts должно быть непустым списком строк"}), 400
+        if len(texts) > batch_max_size:
+            return jsonify({"error": f"Слишком большой пакет: максимум {batch_max_size} заявок"}), 400
+        results = analyzer_service.analyze_many(texts, save=True)
+        errors = sum(1 for item in results if "error" in item)
+        return jsonify({
+            "count": len(results),
+            "errors": errors,
+            "results": results,
         })
+
+    @app.route("/api/jobs", methods=["POST"])
+    def api_jobs_create():
+        if job_pool is None or job_pool.workers <= 0:
+            return jsonify({"error": "Асинхронная обработка отключена (JOB_WORKERS=0)"}), 503
+        data = request.get_json(silent=True) or {}
+        text = (data.get("text") or "").strip()
+        if not text:
+            return jsonify({"error": "Текст заявки не может быть пустым"}), 400
+        job_id = job_pool.submit(text)
+        return jsonify({"id": job_id, "status": "pending"}), 202
+
+    @app.route("/api/jobs/<int:job_id>", methods=["GET"])
+    def api_jobs_get(job_id: int):
+        if job_pool is None:
+            return jsonify({"error": "Асинхронная обработка отключена"}), 503
+        job = job_pool.get(job_id)
+        if job is None:
+            return jsonify({"error": "Задача не найдена"}), 404
+        return jsonify(job)
+
+    @app.route("/api/requests", methods=["GET"])
+    def api_requests_list():
+        """Список заявок с фильтрами; пагинация: cursor = next_cursor предыдущей страницы."""
+        try:
+            filters = {
+                "label": request.args.get("label") or None,
+                "status": request.args.get("status") or None,
+                "min_debt": _int_arg("min_debt"),
+                "max_debt": _int_arg("max_debt"),
+                "has_overdue": _bool_arg("has_overdue"),
+                "min_creditors": _int_arg("min_creditors"),
+                "max_creditors": _int_arg("max_creditors"),
+                "before_id": _int_arg("cursor"),
+                "limit": min(max(_int_arg("limit") or 50, 1), MAX_PAGE_SIZE),
+            }
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        session = analyzer_service.session_factory()
+        try:
+            rows = list_requests(session, **filters)
+            items = [row.to_dict() for row in rows]
+        finally:
+            session.close()
+        next_cursor = items[-1]["id"] if len(items) == filters["limit"] else None
+        return jsonify({"items": items, "next_cursor": next_cursor})
+
+    @app.route("/api/requests/search", methods=["GET"])
+    def api_requests_search():
+        """Полнотекстовый поиск по тексту и резюме; страницы — offset = next_offset предыдущего ответа."""
+        query = (request.args.get("q") or "").strip()
+        if not query:
+            return jsonify({"error": "Параметр q не может быть пустым"}), 400
+        try:
+            limit = min(max(_int_arg("limit") or 20, 1), MAX_PAGE_SIZE)
+            offset = max(_int_arg("offset") or 0, 0)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        session = analyzer_service.session_factory()
+        try:
+            if not fts_available(session.get_bind()):
+                return jsonify({"error": "Полнотекстовый поиск доступен только для SQLite с FTS5"}), 501
+            items = search_requests(
+                session, query, label=request.args.get("label") or None, limit=limit, offset=offset
+            )
+        finally:
+            session.close()
+        next_offset = offset + limit if len(items) == limit else None
+        return jsonify({"items": items, "next_offset": next_offset})
+
+    @app.route("/api/llm/cache/stats", methods=["GET"])
+    def api_llm_cache_stats():
+        cache = analyzer_service.llm_client.cache if analyzer_service.llm_client is not None else None
+        if cache is None:
+            return jsonify({"enabled": False})
+        return jsonify({"enabled": True, **cache.stats()})
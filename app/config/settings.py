@@ -16,16 +16,89 @@ class Settings:
         else:
             load_dotenv()
 
+        # Режим приложения: full (ML + LLM) | classify (только ML-классификация, без LLM-клиента;
+        # API_KEY не нужен, /api/analyze возвращает класс и уверенность)
+        self.app_mode: str = self._get("APP_MODE", "full").lower()
+
         # API
-        self.api_key: str = self._get_required("API_KEY")
+        self.api_key: str = (
+            self._get("API_KEY", "") if self.app_mode == "classify" else self._get_required("API_KEY")
+        )
         self.openai_base_url: str = self._get("OPENAI_BASE_URL", "")
         self.llm_model: str = self._get("LLM_MODEL", "gpt-4o-mini")
+        # Режим вызова LLM: sequential | parallel | single (один объединённый запрос)
+        self.llm_mode: str = self._get("LLM_MODE", "parallel").lower()
+        # Таймаут на один вызов LLM в режиме parallel/single, секунды (0 — без таймаута)
+        self.llm_call_timeout: float = float(self._get("LLM_CALL_TIMEOUT", "30"))
+        # Максимум одновременных вызовов LLM в процессе
+        self.llm_max_concurrency: int = int(self._get("LLM_MAX_CONCURRENCY", "8"))
+        # Клиент LLM: sync (OpenAI SDK) | async (пул соединений, повторы, лимиты)
+        self.llm_client: str = self._get("LLM_CLIENT", "sync").lower()
+        self.llm_timeout: float = float(self._get("LLM_TIMEOUT", "60"))
+        self.llm_connect_timeout: float = float(self._get("LLM_CONNECT_TIMEOUT", "5"))
+        self.llm_max_retries: int = int(self._get("LLM_MAX_RETRIES", "3"))
+        self.llm_backoff_base: float = float(self._get("LLM_BACKOFF_BASE", "0.5"))
+        self.llm_backoff_max: float = float(self._get("LLM_BACKOFF_MAX", "8"))
+        # Ограничение частоты запросов к API, запросов/с (0 — без ограничения), и размер всплеска
+        self.llm_rate_limit: float = float(self._get("LLM_RATE_LIMIT", "0"))
+        self.llm_rate_burst: int = int(self._get("LLM_RATE_BURST", "10"))
+        # Structured outputs для JSON-ответов: json_schema (строгая схема полей) | json_object | none;
+        # если API отклоняет response_format, клиент переходит на обычные промпты сам
+        self.llm_response_format: str = self._get("LLM_RESPONSE_FORMAT", "json_schema").lower()
+        # Бюджеты токенов промптов: текст клиента сверх *_INPUT_TOKENS сжимается по предложениям,
+        # *_OUTPUT_TOKENS передаётся в API как max_tokens (0 — без ограничения)
+        self.llm_summary_input_tokens: int = int(self._get("LLM_SUMMARY_INPUT_TOKENS", "3000"))
+        self.llm_summary_output_tokens: int = int(self._get("LLM_SUMMARY_OUTPUT_TOKENS", "400"))
+        self.llm_fields_input_tokens: int = int(self._get("LLM_FIELDS_INPUT_TOKENS", "3000"))
+        self.llm_fields_output_tokens: int = int(self._get("LLM_FIELDS_OUTPUT_TOKENS", "300"))
+        self.llm_combined_input_tokens: int = int(self._get("LLM_COMBINED_INPUT_TOKENS", "3000"))
+        self.llm_combined_output_tokens: int = int(self._get("LLM_COMBINED_OUTPUT_TOKENS", "700"))
+        # Резюме текста длиннее LLM_MAP_REDUCE_TOKENS (0 — выключено) строится map-reduce:
+        # куски по LLM_MAP_CHUNK_TOKENS (не больше LLM_MAP_MAX_CHUNKS, более длинный текст
+        # сначала сжимается) параллельно сводятся к фактам, резюме пишется по ним
+        self.llm_map_reduce_tokens: int = int(self._get("LLM_MAP_REDUCE_TOKENS", "8000"))
+        self.llm_map_chunk_tokens: int = int(self._get("LLM_MAP_CHUNK_TOKENS", "3000"))
+        self.llm_map_output_tokens: int = int(self._get("LLM_MAP_OUTPUT_TOKENS", "300"))
+        self.llm_map_max_chunks: int = int(self._get("LLM_MAP_MAX_CHUNKS", "16"))
+        # Маршрутизация заявок по уровням обработки full | light | template | skip: правила
+        # «метка[:мин. уверенность[:макс. длина текста]]=уровень» через запятую (пусто — все full),
+        # уровень без подходящего правила; модель уровня light (пусто — LLM_MODEL) и max_tokens
+        # её краткого резюме
+        self.llm_routes: str = self._get("LLM_ROUTES", "")
+        self.llm_route_default: str = self._get("LLM_ROUTE_DEFAULT", "full").strip().lower()
+        self.llm_light_model: str = self._get("LLM_LIGHT_MODEL", "")
+        self.llm_light_summary_output_tokens: int = int(self._get("LLM_LIGHT_SUMMARY_OUTPUT_TOKENS", "150"))
+
+        # Пакетная обработка (/api/analyze/batch)
+        self.batch_max_size: int = int(self._get("BATCH_MAX_SIZE", "500"))
+        # Сколько заявок пакета одновременно обрабатываются LLM
+        self.batch_concurrency: int = int(self._get("BATCH_CONCURRENCY", "4"))
+
+        # Кэш ответов LLM: none | memory (LRU в процессе) | sqlite (общий для воркеров)
+        self.llm_cache_backend: str = self._get("LLM_CACHE_BACKEND", "memory").lower()
+        self.llm_cache_max_size: int = int(self._get("LLM_CACHE_MAX_SIZE", "1000"))
+        self.llm_cache_ttl: float = float(self._get("LLM_CACHE_TTL", "86400"))
 
         # Database
         self.database_url: str = self._get(
             "DATABASE_URL", "sqlite:///./data/app.db"
         )
 
+        # SQLite под конкурентной записью: WAL + synchronous=NORMAL, ожидание блокировки (мс),
+        # размер пула соединений; DB_WRITE_BEHIND_MS > 0 — групповой коммит вставок раз в N мс
+        self.db_sqlite_wal: bool = self._get("DB_SQLITE_WAL", "1").strip().lower() in ("1", "true", "yes")
+        self.db_busy_timeout_ms: int = int(self._get("DB_BUSY_TIMEOUT_MS", "5000"))
+        self.db_pool_size: int = int(self._get("DB_POOL_SIZE", "8"))
+        self.db_max_overflow: int = int(self._get("DB_MAX_OVERFLOW", "8"))
+        self.db_write_behind_ms: int = int(self._get("DB_WRITE_BEHIND_MS", "0"))
+        self.db_write_behind_max_batch: int = int(self._get("DB_WRITE_BEHIND_MAX_BATCH", "100"))
+
+        # Асинхронные задачи (/api/jobs): число фоновых потоков в процессе (0 — выключено),
+        # период опроса очереди и время аренды задачи до повторной выдачи, секунды
+        self.job_workers: int = int(self._get("JOB_WORKERS", "0"))
+        self.job_poll_interval: float = float(self._get("JOB_POLL_INTERVAL", "1"))
+        self.job_lease_seconds: float = float(self._get("JOB_LEASE_SECONDS", "300"))
+
         # Paths (относительно корня проекта)
         self.project_root: Path = self._project_root()
         self.labeled_data_path: Path = self.project_root / self._get(
@@ -34,6 +107,40 @@ class Settings:
         self.ml_model_path: Path = self.project_root / self._get(
             "ML_MODEL_PATH", "data/models/text_clf.pkl"
         )
+        # Быстрый инференс по компактной модели (массивы NumPy рядом с .pkl)
+        self.ml_fast_inference: bool = self._get("ML_FAST_INFERENCE", "1").strip().lower() in ("1", "true", "yes")
+        # Загрузить модель при старте (до fork воркеров при gunicorn --preload)
+        self.ml_preload: bool = self._get("ML_PRELOAD", "1").strip().lower() in ("1", "true", "yes")
+        # Отображать массивы модели в память (mmap) — общие страницы для всех воркеров
+        self.ml_mmap: bool = self._get("ML_MMAP", "1").strip().lower() in ("1", "true", "yes")
+        # Реестр версий модели (активная версия важнее ML_MODEL_PATH) и период проверки
+        # новой версии в секундах (0 — без горячей перезагрузки)
+        self.model_registry_path: Path = self.project_root / self._get("MODEL_REGISTRY_PATH", "data/models/registry")
+        self.ml_reload_interval: float = float(self._get("ML_RELOAD_INTERVAL", "30"))
+        # Извлечение полей правилами до LLM; поля с уверенностью ниже порога уходят в LLM
+        self.rules_enabled: bool = self._get("RULES_ENABLED", "1").strip().lower() in ("1", "true", "yes")
+        self.rules_min_confidence: float = float(self._get("RULES_MIN_CONFIDENCE", "0.8"))
+        # Почти-дубликаты: порог косинуса TF-IDF, reuse (ответ оригинала без LLM) или flag,
+        # сколько последних заявок держать в индексе
+        self.dedup_enabled: bool = self._get("DEDUP_ENABLED", "1").strip().lower() in ("1", "true", "yes")
+        self.dedup_threshold: float = float(self._get("DEDUP_THRESHOLD", "0.9"))
+        self.dedup_action: str = self._get("DEDUP_ACTION", "flag").strip().lower()
+        self.dedup_max_size: int = int(self._get("DEDUP_MAX_SIZE", "10000"))
+        # Single-flight: одновременные /api/analyze с одинаковым текстом обрабатываются один раз
+        # (в процессе и между воркерами через таблицу в БД); сколько ждать чужой результат,
+        # аренда блокировки (на случай падения воркера) и сколько хранить результат, секунды
+        self.singleflight_enabled: bool = self._get("SINGLEFLIGHT_ENABLED", "1").strip().lower() in ("1", "true", "yes")
+        # Блокировка между воркерами в БД: две лишние записи в SQLite на каждый analyze
+        self.singleflight_shared: bool = self._get("SINGLEFLIGHT_SHARED", "0").strip().lower() in ("1", "true", "yes")
+        self.singleflight_wait_seconds: float = float(self._get("SINGLEFLIGHT_WAIT_SECONDS", "90"))
+        self.singleflight_lease_seconds: float = float(self._get("SINGLEFLIGHT_LEASE_SECONDS", "120"))
+        self.singleflight_result_ttl: float = float(self._get("SINGLEFLIGHT_RESULT_TTL", "5"))
+        # Метрики Prometheus на /metrics и заголовок Server-Timing с длительностями этапов
+        self.metrics_enabled: bool = self._get("METRICS_ENABLED", "1").strip().lower() in ("1", "true", "yes")
+        self.server_timing: bool = self._get("SERVER_TIMING", "0").strip().lower() in ("1", "true", "yes")
+        self.llm_cache_path: Path = self.project_root / self._get(
+            "LLM_CACHE_PATH", "data/cache/llm_cache.sqlite3"
+        )
 
         # Flask
         self.flask_env: str = self._get("FLASK_ENV", "development")
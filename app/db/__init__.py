@@ -1,6 +1,19 @@
 """Модуль работы с БД."""
 
 from .connection import get_engine, get_session_factory, init_db
-from .models import Request
+from .models import InflightAnalysis, Request
+from .queries import list_requests
+from .search import fts_available, search_requests
+from .writer import WriteBehindWriter
 
-__all__ = ["get_engine", "get_session_factory", "init_db", "Request"]
+__all__ = [
+    "get_engine",
+    "get_session_factory",
+    "init_db",
+    "Request",
+    "InflightAnalysis",
+    "WriteBehindWriter",
+    "list_requests",
+    "search_requests",
+    "fts_available",
+]
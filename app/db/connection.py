@@ -2,36 +2,146 @@
 
 from typing import Optional
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, select, text, update
 from sqlalchemy.orm import sessionmaker, Session
 
-from .models import Base
+from .models import Base, Request
+from .search import init_fts
 
 
-def get_engine(database_url: str, echo: bool = False):
-    """Создать движок SQLAlchemy."""
+def get_engine(
+    database_url: str,
+    echo: bool = False,
+    sqlite_wal: bool = False,
+    sqlite_busy_timeout_ms: Optional[int] = None,
+    pool_size: Optional[int] = None,
+    max_overflow: Optional[int] = None,
+):
+    """
+    Создать движок SQLAlchemy.
+    Для файловой SQLite: sqlite_wal включает WAL и synchronous=NORMAL (читатели не блокируют
+    писателя, коммит без fsync журнала), sqlite_busy_timeout_ms — ожидание блокировки
+    вместо немедленной ошибки "database is locked". PRAGMA применяются к каждому соединению пула.
+    """
     # SQLite требует connect_args для относительного пути
     connect_args = {}
-    if database_url.startswith("sqlite"):
+    kwargs = {}
+    is_sqlite = database_url.startswith("sqlite")
+    in_memory = ":memory:" in database_url or database_url.rstrip("/") in ("sqlite:", "sqlite+pysqlite:")
+    if is_sqlite:
         connect_args["check_same_thread"] = False
-    return create_engine(
+    # Для SQLite в памяти используется пул из одного соединения — его размер не настраивается
+    if not in_memory:
+        if pool_size is not None:
+            kwargs["pool_size"] = pool_size
+        if max_overflow is not None:
+            kwargs["max_overflow"] = max_overflow
+    engine = create_engine(
         database_url,
         echo=echo,
         connect_args=connect_args,
         future=True,
+        **kwargs,
     )
 
+    if is_sqlite and not in_memory and (sqlite_wal or sqlite_busy_timeout_ms):
+        @event.listens_for(engine, "connect")
+        def _sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                if sqlite_wal:
+                    cursor.execute("PRAGMA journal_mode=WAL")
+                    cursor.execute("PRAGMA synchronous=NORMAL")
+                if sqlite_busy_timeout_ms:
+                    cursor.execute(f"PRAGMA busy_timeout={int(sqlite_busy_timeout_ms)}")
+            finally:
+                cursor.close()
+
+    return engine
+
 
 def get_session_factory(engine):
     """Фабрика сессий."""
     return sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
 
 
+# Версия разбора типизированных колонок (PRAGMA user_version в SQLite): 2 — «1,2 млн»
+# и дробные числа разбираются верно; строки, заполненные прежним разбором, пересчитываются
+TYPED_FIELDS_VERSION = 2
+
+
 def init_db(engine) -> None:
-    """Создать таблицы."""
+    """Создать таблицы; в существующие добавить недостающие колонки и индексы; FTS-индекс поиска."""
     Base.metadata.create_all(bind=engine)
+    added = _add_missing_columns(engine)
+    if "requests.total_debt" in added or _typed_fields_outdated(engine):
+        _backfill_typed_fields(engine)
+        _set_typed_fields_version(engine)
+    init_fts(engine)
+
+
+def _typed_fields_outdated(engine) -> bool:
+    """Колонки total_debt/creditors_count/has_overdue заполнены прежней версией разбора (только SQLite)."""
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.connect() as conn:
+        return conn.execute(text("PRAGMA user_version")).scalar() < TYPED_FIELDS_VERSION
+
+
+def _set_typed_fields_version(engine) -> None:
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        conn.execute(text(f"PRAGMA user_version = {TYPED_FIELDS_VERSION}"))
+
+
+def _add_missing_columns(engine) -> set[str]:
+    """
+    Простая миграция для БД, созданных старой версией схемы:
+    ALTER TABLE ADD COLUMN для новых колонок модели и создание недостающих индексов.
+    Возвращает добавленные колонки в виде "таблица.колонка".
+    """
+    added: set[str] = set()
+    insp = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not insp.has_table(table.name):
+            continue
+        existing = {col["name"] for col in insp.get_columns(table.name)}
+        with engine.begin() as conn:
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT '{column.server_default.arg}'"
+                elif not column.nullable:
+                    raise RuntimeError(f"Нельзя добавить NOT NULL колонку {table.name}.{column.name} без server_default")
+                conn.execute(text(ddl))
+                added.add(f"{table.name}.{column.name}")
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    return added
 
 
-def get_session(session_factory) -> Session:
-    """Вернуть новую сессию (контекстный менеджер — вызывающий код сам close)."""
-    return session_factory()
+def _backfill_typed_fields(engine, batch_size: int = 1000) -> None:
+    """Заполнить total_debt/creditors_count/has_overdue из JSON extracted для старых строк."""
+    session = get_session_factory(engine)()
+    try:
+        last_id = 0
+        while True:
+            rows = session.execute(
+                select(Request.id, Request.extracted)
+                .where(Request.id > last_id)
+                .order_by(Request.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            session.execute(
+                update(Request),
+                [{"id": row.id, **Request.typed_columns(row.extracted)} for row in rows],
+            )
+            session.commit()
+            last_id = rows[-1].id
+    finally:
+        session.close()
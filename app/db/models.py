@@ -1,27 +1,94 @@
-"""Модели SQLAlchemy для хранения заявок."""
+"""Модели SQLAlchemy: заявки и блокировки одновременной обработки одинаковых текстов."""
 
-from sqlalchemy import Column, Integer, String, Text, JSON
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Float, Index, Integer, String, Text, JSON
 from sqlalchemy.orm import declarative_base
 
+from app.llm.schema import to_bool, to_int
+
 Base = declarative_base()
 
+# Статусы обработки заявки (асинхронный режим /api/jobs)
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+def utcnow() -> datetime:
+    """Текущее время UTC без таймзоны (колонки DateTime хранят naive UTC)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 
 class Request(Base):
     """Обработанная заявка клиента."""
 
     __tablename__ = "requests"
+    __table_args__ = (
+        # Фильтры /api/requests + сортировка по id (keyset-пагинация)
+        Index("ix_requests_label_id", "label", "id"),
+        Index("ix_requests_has_overdue_id", "has_overdue", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     raw_text = Column(Text, nullable=False)
     label = Column(String(50), nullable=True)  # класс от ML
+    confidence = Column(Float, nullable=True)  # уверенность ML в классе
     summary = Column(Text, nullable=True)      # резюме от LLM
     extracted = Column(JSON, nullable=True)  # поля от LLM (dict)
+    status = Column(String(20), nullable=False, default=STATUS_DONE, server_default=STATUS_DONE, index=True)
+    error = Column(Text, nullable=True)          # текст ошибки для status=failed
+    claimed_at = Column(DateTime, nullable=True)  # когда воркер взял задачу
+    created_at = Column(DateTime, nullable=True, default=utcnow, index=True)
+    # Числовые поля из extracted — отдельные колонки с индексами для фильтрации
+    total_debt = Column(BigInteger, nullable=True, index=True)
+    creditors_count = Column(Integer, nullable=True, index=True)
+    has_overdue = Column(Boolean, nullable=True)
+    model_version = Column(String(64), nullable=True, index=True)  # версия ML-модели из реестра
+    duplicate_of = Column(Integer, nullable=True, index=True)  # id исходной заявки, если это почти-дубликат
+
+    @staticmethod
+    def typed_columns(fields: Optional[dict[str, Any]]) -> dict[str, Any]:
+        """
+        Значения типизированных колонок из словаря полей LLM (некорректные — None).
+        Приведение то же, что у ответов LLM: «1,2 млн» -> 1200000, «1.5» -> 2.
+        """
+        fields = fields if isinstance(fields, dict) else {}
+        return {
+            "total_debt": to_int(fields.get("total_debt")),
+            "creditors_count": to_int(fields.get("creditors_count")),
+            "has_overdue": to_bool(fields.get("has_overdue")),
+        }
 
     def to_dict(self) -> dict:
         return {
             "id": self.id,
             "raw_text": self.raw_text[:200] + "..." if len(self.raw_text or "") > 200 else (self.raw_text or ""),
             "label": self.label,
+            "confidence": self.confidence,
             "summary": self.summary,
             "extracted": self.extracted,
+            "status": self.status,
+            "created_at": self.created_at.isoformat() + "Z" if self.created_at else None,
+            "total_debt": self.total_debt,
+            "creditors_count": self.creditors_count,
+            "has_overdue": self.has_overdue,
+            "model_version": self.model_version,
+            "duplicate_of": self.duplicate_of,
         }
+
+
+class InflightAnalysis(Base):
+    """
+    Блокировка single-flight между воркерами: текст, который сейчас обрабатывает один из
+    процессов, а после завершения — его результат на короткое время для ожидающих.
+    """
+
+    __tablename__ = "inflight_analyses"
+
+    key = Column(String(64), primary_key=True)         # sha256 нормализованного текста и параметров
+    owner = Column(String(128), nullable=False)         # хост:pid:поток, который выполняет обработку
+    expires_at = Column(Float, nullable=False, index=True)  # unix-время: конец аренды или хранения результата
+    result = Column(JSON, nullable=True)                # результат analyze(); None — ещё выполняется
@@ -0,0 +1,48 @@
+"""Запросы на чтение сохранённых заявок."""
+
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .models import Request
+
+MAX_PAGE_SIZE = 200
+
+
+def list_requests(
+    session: Session,
+    label: Optional[str] = None,
+    status: Optional[str] = None,
+    min_debt: Optional[int] = None,
+    max_debt: Optional[int] = None,
+    has_overdue: Optional[bool] = None,
+    min_creditors: Optional[int] = None,
+    max_creditors: Optional[int] = None,
+    before_id: Optional[int] = None,
+    limit: int = 50,
+) -> list[Request]:
+    """
+    Страница заявок, новые первыми, с keyset-пагинацией: следующая страница —
+    before_id = id последней записи текущей. В отличие от OFFSET, стоимость
+    не растёт с номером страницы: индекс по (фильтр, id) сразу находит начало.
+    """
+    query = select(Request)
+    if label is not None:
+        query = query.where(Request.label == label)
+    if status is not None:
+        query = query.where(Request.status == status)
+    if min_debt is not None:
+        query = query.where(Request.total_debt >= min_debt)
+    if max_debt is not None:
+        query = query.where(Request.total_debt <= max_debt)
+    if has_overdue is not None:
+        query = query.where(Request.has_overdue == has_overdue)
+    if min_creditors is not None:
+        query = query.where(Request.creditors_count >= min_creditors)
+    if max_creditors is not None:
+        query = query.where(Request.creditors_count <= max_creditors)
+    if before_id is not None:
+        query = query.where(Request.id < before_id)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    return list(session.scalars(query.order_by(Request.id.desc()).limit(limit)))
@@ -0,0 +1,289 @@
+"""
+Полнотекстовый поиск по заявкам: SQLite FTS5 по raw_text и summary.
+
+Индекс requests_fts — FTS5-таблица с внешним содержимым: текст не дублируется, FTS хранит
+только инвертированный индекс, а фрагменты для snippet() читаются из представления
+requests_fts_src (requests с «ё» -> «е», чтобы «расчётный» находился по «расчетный»).
+Триггеры на requests поддерживают индекс при INSERT/DELETE и при UPDATE raw_text/summary
+(задачи /api/jobs получают резюме уже после вставки).
+
+Токенизатор unicode61 приводит кириллицу к нижнему регистру; морфологию FTS5 не знает,
+поэтому слова запроса усекаются до основы, а основа раскрывается в словоформы из словаря
+индекса (requests_fts_vocab): «ипотека» -> (ипотека OR ипотеки OR ипотеку OR ипотекой).
+Явный OR дешевле префиксного запроса ипотек*: FTS5 не собирает общий список документов
+всех словоформ целиком и может пропускать строки вне окна ранжирования. Словоформы основы
+кэшируются в процессе на VOCAB_TTL секунд: fts5vocab читает списки документов слов целиком.
+
+bm25 перед ранжированием считает по всему индексу, в скольких строках есть каждое слово, — для
+частых слов это десятки миллисекунд даже при маленьком окне. Если слова запроса встречаются
+суммарно больше чем в RANK_MAX_DOCS строках, заявки отдаются от новых к старым без bm25
+(как список /api/requests, но со словоформами и «ё»): FTS5 идёт по индексу с конца и
+останавливается на странице.
+"""
+
+import html
+import re
+import threading
+import time
+import weakref
+from typing import Any, Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from .models import Request
+
+FTS_TABLE = "requests_fts"
+FTS_SOURCE_VIEW = "requests_fts_src"
+FTS_VOCAB = "requests_fts_vocab"
+
+# Окончания существительных и прилагательных, отбрасываемые у слов запроса (длинные — первыми)
+_ENDINGS = sorted(
+    (
+        "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "иях", "ях", "ах",
+        "ия", "ие", "ий", "ый", "ой", "ая", "яя", "ое", "ее", "ые", "ов", "ев", "ей",
+        "ам", "ям", "ом", "ем", "ую", "юю", "ых", "их", "ью",
+        "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+    ),
+    key=len,
+    reverse=True,
+)
+MIN_STEM = 3
+MAX_TERMS = 10
+# Больше словоформ у основы — ищется префиксом (короткие основы вроде «суд» дают сотни слов)
+MAX_EXPANSIONS = 32
+# bm25 считается для каждого совпадения: ранжируются только RANK_WINDOW самых новых
+# совпадений — стоимость запроса не растёт с размером таблицы
+RANK_WINDOW = 1_000
+# Сумма строк со словами запроса (по словарю индекса), выше которой bm25 не считается:
+# статистика bm25 читает списки документов всех слов, около 1 мс на 10 000 строк
+RANK_MAX_DOCS = 50_000
+VOCAB_TTL = 60.0
+VOCAB_CACHE_SIZE = 10_000
+
+# Границы найденных слов во фрагменте snippet(): управляющие символы, которых нет в тексте заявок,
+# заменяются на <mark> уже после экранирования HTML
+_MARK_OPEN, _MARK_CLOSE = "\x02", "\x03"
+
+_TOKEN_RE = re.compile(r"\w+")
+_CYRILLIC_RE = re.compile(r"[а-я]")
+
+_DDL = (
+    f"""
+    CREATE VIEW IF NOT EXISTS {FTS_SOURCE_VIEW} AS
+    SELECT id,
+           replace(replace(raw_text, 'ё', 'е'), 'Ё', 'Е') AS raw_text,
+           replace(replace(summary, 'ё', 'е'), 'Ё', 'Е') AS summary
+    FROM requests
+    """,
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        raw_text, summary,
+        content='{FTS_SOURCE_VIEW}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_VOCAB} USING fts5vocab({FTS_TABLE}, 'row')",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS requests_fts_ai AFTER INSERT ON requests BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, raw_text, summary)
+        SELECT id, raw_text, summary FROM {FTS_SOURCE_VIEW} WHERE id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS requests_fts_ad AFTER DELETE ON requests BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, raw_text, summary) VALUES (
+            'delete', old.id,
+            replace(replace(old.raw_text, 'ё', 'е'), 'Ё', 'Е'),
+            replace(replace(old.summary, 'ё', 'е'), 'Ё', 'Е')
+        );
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS requests_fts_au AFTER UPDATE OF raw_text, summary ON requests BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, raw_text, summary) VALUES (
+            'delete', old.id,
+            replace(replace(old.raw_text, 'ё', 'е'), 'Ё', 'Е'),
+            replace(replace(old.summary, 'ё', 'е'), 'Ё', 'Е')
+        );
+        INSERT INTO {FTS_TABLE}(rowid, raw_text, summary)
+        SELECT id, raw_text, summary FROM {FTS_SOURCE_VIEW} WHERE id = new.id;
+    END
+    """,
+)
+
+
+# Результаты по движку: проверка FTS5 и словоформы основ (term, doc) с временем получения
+_fts_available: "weakref.WeakKeyDictionary[Any, bool]" = weakref.WeakKeyDictionary()
+_vocab_cache: "weakref.WeakKeyDictionary[Any, dict[str, tuple[float, Optional[list[str]], int]]]" = (
+    weakref.WeakKeyDictionary()
+)
+_vocab_lock = threading.Lock()
+
+
+def fts_available(engine) -> bool:
+    """Поиск возможен: SQLite, собранная с FTS5 (проверяется один раз на движок)."""
+    available = _fts_available.get(engine)
+    if available is None:
+        available = engine.dialect.name == "sqlite"
+        if available:
+            with engine.connect() as conn:
+                available = bool(conn.execute(text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar())
+        _fts_available[engine] = available
+    return available
+
+
+def init_fts(engine) -> bool:
+    """
+    Создать индекс, представление и триггеры (идемпотентно). Для таблицы, заполненной
+    до появления индекса, индекс строится по всем строкам. Возвращает False, если FTS5 недоступен.
+    """
+    if not fts_available(engine):
+        return False
+    with engine.begin() as conn:
+        created = not conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE},
+        ).first()
+        for ddl in _DDL:
+            conn.execute(text(ddl))
+        if created:
+            # Ранжирование по умолчанию (ORDER BY rank): совпадение в тексте заявки весит вдвое больше, чем в резюме
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25(1.0, 0.5)')"))
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    return True
+
+
+def _stem(word: str) -> str:
+    word = word.lower().replace("ё", "е")
+    if not _CYRILLIC_RE.search(word):
+        return word
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[: -len(ending)]
+    return word
+
+
+def query_stems(query: str) -> list[str]:
+    """Основы слов запроса (до MAX_TERMS, без повторов)."""
+    return list(dict.fromkeys(_stem(word) for word in _TOKEN_RE.findall(query)))[:MAX_TERMS]
+
+
+def _expand(session: Session, stem: str) -> tuple[Optional[list[str]], int]:
+    """
+    Словоформы основы из словаря индекса (None — их больше MAX_EXPANSIONS, искать префиксом)
+    и число строк с ними (сумма по словоформам; для префикса — не меньше RANK_MAX_DOCS + 1).
+    """
+    engine = session.get_bind()
+    now = time.monotonic()
+    with _vocab_lock:
+        cached = _vocab_cache.get(engine, {}).get(stem)
+    if cached is not None and now - cached[0] < VOCAB_TTL:
+        return cached[1], cached[2]
+    rows = session.execute(
+        text(f"SELECT term, doc FROM {FTS_VOCAB} WHERE term >= :low AND term < :high LIMIT :limit"),
+        {"low": stem, "high": stem + "\uffff", "limit": MAX_EXPANSIONS + 1},
+    ).all()
+    if len(rows) > MAX_EXPANSIONS:
+        terms, docs = None, max(sum(row.doc for row in rows), RANK_MAX_DOCS + 1)
+    else:
+        terms, docs = [row.term for row in rows], sum(row.doc for row in rows)
+    if not rows:
+        # Слова ещё нет в индексе — не кэшируется, чтобы новые заявки находились сразу
+        return terms, docs
+    with _vocab_lock:
+        stems = _vocab_cache.setdefault(engine, {})
+        if len(stems) >= VOCAB_CACHE_SIZE:
+            stems.clear()
+        stems[stem] = (now, terms, docs)
+    return terms, docs
+
+
+def _match_query(session: Session, query: str) -> tuple[Optional[str], int]:
+    """Выражение MATCH (см. build_match_query) и сумма строк со словами запроса по словарю индекса."""
+    stems = query_stems(query)
+    if not stems:
+        return None, 0
+    groups, total_docs = [], 0
+    for stem in stems:
+        terms, docs = _expand(session, stem)
+        if terms == []:
+            return None, 0
+        total_docs += docs
+        if terms is None:
+            groups.append(f'"{stem}"*')
+        else:
+            groups.append("(" + " OR ".join(f'"{term}"' for term in terms) + ")")
+    return " AND ".join(groups), total_docs
+
+
+def build_match_query(session: Session, query: str) -> Optional[str]:
+    """
+    Выражение MATCH: все слова запроса обязательны, каждое — OR его словоформ из индекса.
+    Слова берутся в кавычки, поэтому спецсимволы FTS5 из запроса не интерпретируются.
+    None, если в запросе нет слов или какого-то слова нет в индексе (совпадений не будет).
+    """
+    return _match_query(session, query)[0]
+
+
+def _snippet_html(snippet: Optional[str]) -> Optional[str]:
+    """Фрагмент как безопасный HTML: текст заявки экранирован, разметка — только <mark>."""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>")
+
+
+def search_requests(
+    session: Session,
+    query: str,
+    label: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+    rank_window: int = RANK_WINDOW,
+) -> list[dict[str, Any]]:
+    """
+    Страница заявок по релевантности (bm25) среди rank_window самых новых совпадений,
+    а для частых слов (больше RANK_MAX_DOCS строк) — от новых к старым, score None:
+    Request.to_dict() плюс score и snippet — фрагмент в виде HTML: текст экранирован,
+    найденные слова обёрнуты в <mark>…</mark>.
+    """
+    match, total_docs = _match_query(session, query)
+    if match is None:
+        return []
+    join, where = "", ""
+    if label is not None:
+        join, where = f"JOIN requests AS r ON r.id = {FTS_TABLE}.rowid", "AND r.label = :label"
+    if total_docs > RANK_MAX_DOCS:
+        score, window, order = "NULL", "", f"{FTS_TABLE}.rowid DESC"
+    else:
+        score, order = "-rank", "rank"
+        window = f"""
+          AND {FTS_TABLE}.rowid >= coalesce((
+              SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match
+              ORDER BY rowid DESC LIMIT 1 OFFSET :window
+          ), 0)"""
+    sql = f"""
+        SELECT {FTS_TABLE}.rowid AS id, {score} AS score,
+               snippet({FTS_TABLE}, -1, char(2), char(3), '…', 16) AS snippet
+        FROM {FTS_TABLE} {join}
+        WHERE {FTS_TABLE} MATCH :match {where}{window}
+        ORDER BY {order}
+        LIMIT :limit OFFSET :offset
+    """
+    hits = session.execute(
+        text(sql),
+        {"match": match, "label": label, "limit": limit, "offset": offset, "window": rank_window - 1},
+    ).all()
+    rows = {
+        row.id: row
+        for row in session.scalars(select(Request).where(Request.id.in_([hit.id for hit in hits])))
+    }
+    return [
+        {
+            **rows[hit.id].to_dict(),
+            "score": round(hit.score, 4) if hit.score is not None else None,
+            "snippet": _snippet_html(hit.snippet),
+        }
+        for hit in hits
+        if hit.id in rows
+    ]
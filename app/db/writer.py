@@ -0,0 +1,111 @@
+"""
+Отложенная запись (write-behind): вставки копятся в буфере и фиксируются
+одной транзакцией раз в interval_ms (group commit).
+
+Вызывающий поток получает Future с id записи; под нагрузкой один коммит
+обслуживает десятки вставок вместо отдельного fsync и блокировки на каждую.
+При выходе процесса (atexit) остаток буфера записывается до остановки потока.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Optional
+
+from .models import Request
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class WriteBehindWriter:
+    """Буфер вставок в таблицу requests с групповым коммитом."""
+
+    def __init__(self, session_factory, interval_ms: int = 20, max_batch: int = 100) -> None:
+        self.session_factory = session_factory
+        self.interval = interval_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue: queue.Queue = queue.Queue()
+        self._pid: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, **values: Any) -> Future:
+        """Поставить Request(**values) в буфер; Future получит id после коммита."""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((values, future))
+        return future
+
+    def _ensure_started(self) -> None:
+        """Фоновый поток на процесс (после fork воркера gunicorn — новый)."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(
+                target=self._loop, args=(self._queue,), name="db-write-behind", daemon=True
+            )
+            self._thread.start()
+            self._pid = os.getpid()
+            # Поток daemon: без записи при выходе вставки из буфера были бы потеряны
+            atexit.register(self.close)
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Записать остаток буфера и остановить поток; следующий submit запустит его снова."""
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            self._pid = None
+            self._queue.put(_STOP)
+            thread = self._thread
+        thread.join(timeout)
+
+    def _loop(self, items: queue.Queue) -> None:
+        while True:
+            first = items.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            stop = False
+            # От первой вставки ждём не дольше interval, собирая всё, что пришло за это время
+            deadline = time.monotonic() + self.interval
+            try:
+                while len(batch) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    item = items.get(timeout=remaining)
+                    if item is _STOP:
+                        stop = True
+                        break
+                    batch.append(item)
+            except queue.Empty:
+                pass
+            self._flush(batch)
+            if stop:
+                return
+
+    def _flush(self, batch: list[tuple[dict[str, Any], Future]]) -> None:
+        session = self.session_factory()
+        try:
+            rows = [Request(**values) for values, _ in batch]
+            session.add_all(rows)
+            session.commit()
+            for row, (_, future) in zip(rows, batch):
+                future.set_result(row.id)
+        except Exception as e:
+            logger.exception("Write-behind flush of %d row(s) failed: %s", len(batch), e)
+            session.rollback()
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            session.close()
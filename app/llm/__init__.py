@@ -1,5 +1,33 @@
 """Модуль LLM: резюме и извлечение полей из текста заявки."""
 
-from .client import LLMClient
+import importlib
+from typing import Any
 
-__all__ = ["LLMClient"]
+from .budget import PromptBudget, TokenBudgets, count_tokens, tfidf_sentence_scorer
+from .cache import LLMCacheBase, MemoryLRUCache, SQLiteCache, create_cache
+from .client import LLMClient, LLMClientBase, SUMMARY_FALLBACK
+
+# Асинхронный клиент тянет httpx и openai; импортируется при первом обращении
+_LAZY = {"AsyncLLMClient": ".async_client"}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY:
+        return getattr(importlib.import_module(_LAZY[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = [
+    "LLMClient",
+    "LLMClientBase",
+    "AsyncLLMClient",
+    "SUMMARY_FALLBACK",
+    "PromptBudget",
+    "TokenBudgets",
+    "count_tokens",
+    "tfidf_sentence_scorer",
+    "LLMCacheBase",
+    "MemoryLRUCache",
+    "SQLiteCache",
+    "create_cache",
+]
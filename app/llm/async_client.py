@@ -0,0 +1,343 @@
+"""
+Асинхронный клиент LLM: общий пул HTTP-соединений, повторы с экспоненциальной
+задержкой и jitter, глобальный лимит одновременных запросов и token bucket.
+
+Запросы выполняются в отдельном потоке с event loop; синхронный complete()
+(интерфейс LLMClientBase) ставит корутину в этот loop и ждёт результат,
+так что все потоки gunicorn делят одни соединения и одни лимиты.
+"""
+
+import asyncio
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator, Optional
+
+import httpx
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    APITimeoutError,
+    AsyncOpenAI,
+    RateLimitError,
+)
+
+from app.metrics import LLM_FAILURES, record_llm_usage
+
+from .budget import TokenBudgets
+from .cache import LLMCacheBase
+from .client import LLMClientBase, failure_reason, rejects_response_format, request_options
+from .schema import RESPONSE_FORMATS
+
+logger = logging.getLogger(__name__)
+
+# HTTP-статусы, при которых запрос имеет смысл повторить
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def is_retryable(error: Exception) -> bool:
+    """Временная ошибка (таймаут, обрыв соединения, 429/5xx) — можно повторить."""
+    if isinstance(error, (APITimeoutError, APIConnectionError, RateLimitError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code in RETRYABLE_STATUSES
+    return False
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Задержка из заголовка Retry-After ответа, если он есть."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class _ResponseFormatRejected(Exception):
+    """API отклонил response_format — запрос повторяется без него."""
+
+
+class TokenBucket:
+    """Token bucket: не более rate запросов в секунду в среднем, всплески до burst."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncLLMClient(LLMClientBase):
+    """Асинхронный клиент OpenAI-совместимого API с повторами и ограничением нагрузки."""
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gpt-4o-mini",
+        base_url: Optional[str] = None,
+        cache: Optional[LLMCacheBase] = None,
+        timeout: float = 60.0,
+        connect_timeout: float = 5.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        max_concurrency: int = 16,
+        rate_limit: float = 0.0,
+        rate_burst: int = 10,
+        budgets: Optional[TokenBudgets] = None,
+        response_format_mode: str = "json_schema",
+        brief_summary: bool = False,
+    ) -> None:
+        if response_format_mode not in RESPONSE_FORMATS:
+            raise ValueError(
+                f"Неизвестный режим response_format: {response_format_mode}. Допустимые: {', '.join(RESPONSE_FORMATS)}"
+            )
+        self.api_key = api_key
+        self.model = model
+        self.cache = cache
+        self.budgets = budgets
+        self.response_format_mode = response_format_mode
+        self.brief_summary = brief_summary
+        self.base_url = base_url.rstrip("/") if base_url and base_url.strip() else None
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_concurrency = max_concurrency
+        self.rate_limit = rate_limit
+        self.rate_burst = rate_burst
+
+        # Loop, HTTP-клиент и лимиты создаются лениво в каждом процессе:
+        # поток event loop не переживает fork воркера gunicorn
+        self._pid: Optional[int] = None
+        self._init_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[AsyncOpenAI] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._bucket: Optional[TokenBucket] = None
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        if self._pid == os.getpid() and self._loop is not None:
+            return self._loop
+        with self._init_lock:
+            if self._pid != os.getpid() or self._loop is None:
+                self._start()
+        return self._loop
+
+    def _start(self) -> None:
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, name="llm-async-loop", daemon=True)
+        thread.start()
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            ),
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+        )
+        kwargs = {
+            "api_key": self.api_key,
+            "http_client": http_client,
+            # Повторы выполняет сам клиент (с jitter и общими лимитами)
+            "max_retries": 0,
+        }
+        if self.base_url:
+            kwargs["base_url"] = self.base_url
+        self._client = AsyncOpenAI(**kwargs)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._bucket = TokenBucket(self.rate_limit, self.rate_burst) if self.rate_limit > 0 else None
+        self._loop = loop
+        self._pid = os.getpid()
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Экспоненциальная задержка с full jitter; Retry-After от сервера имеет приоритет."""
+        server_delay = retry_after(error)
+        if server_delay is not None:
+            return min(server_delay, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def acomplete(
+        self,
+        prompt: str,
+        temperature: float = 0.3,
+        max_tokens: Optional[int] = None,
+        response_format: Optional[dict[str, Any]] = None,
+    ) -> Optional[str]:
+        """Один запрос (user message) с повторами при временных ошибках."""
+        try:
+            return await self._acomplete(prompt, temperature, max_tokens, response_format)
+        except _ResponseFormatRejected:
+            return await self._acomplete(prompt, temperature, max_tokens, None)
+
+    async def _acomplete(
+        self,
+        prompt: str,
+        temperature: float,
+        max_tokens: Optional[int],
+        response_format: Optional[dict[str, Any]],
+    ) -> Optional[str]:
+        for attempt in range(self.max_retries + 1):
+            async with self._semaphore:
+                if self._bucket is not None:
+                    await self._bucket.acquire()
+                try:
+                    resp = await self._client.chat.completions.create(
+                        model=self.model,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=temperature,
+                        **request_options(max_tokens, response_format),
+                    )
+                    record_llm_usage(self.model, resp.usage, self.tier)
+                    if resp.choices and len(resp.choices) > 0:
+                        return (resp.choices[0].message.content or "").strip()
+                    return None
+                except Exception as e:
+                    if response_format is not None and rejects_response_format(e):
+                        self._disable_response_format(e)
+                        raise _ResponseFormatRejected() from e
+                    if not is_retryable(e) or attempt == self.max_retries:
+                        LLM_FAILURES.labels(reason=failure_reason(e)).inc()
+                        logger.exception("LLM API call failed after %d attempt(s): %s", attempt + 1, e)
+                        return None
+                    error = e
+            # Ждём вне семафора, чтобы не занимать слот во время паузы
+            delay = self._backoff(attempt, error)
+            logger.warning("LLM API call failed (%s), retry %d in %.2fs", error, attempt + 1, delay)
+            await asyncio.sleep(delay)
+        return None
+
+    async def astream_complete(
+        self, prompt: str, temperature: float = 0.3, max_tokens: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        """
+        Запрос с stream=True: фрагменты текста по мере генерации.
+        Повтор возможен только до первого полученного фрагмента; сбой до него — пустой поток,
+        после — исключение (ответ неполный). Токены учитываются по usage последнего фрагмента.
+        """
+        for attempt in range(self.max_retries + 1):
+            emitted = False
+            async with self._semaphore:
+                if self._bucket is not None:
+                    await self._bucket.acquire()
+                try:
+                    stream = await self._client.chat.completions.create(
+                        model=self.model,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=temperature,
+                        stream=True,
+                        stream_options={"include_usage": True},
+                        **request_options(max_tokens),
+                    )
+                    async for chunk in stream:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            emitted = True
+                            yield chunk.choices[0].delta.content
+                        if getattr(chunk, "usage", None) is not None:
+                            record_llm_usage(self.model, chunk.usage, self.tier)
+                    return
+                except Exception as e:
+                    if emitted or not is_retryable(e) or attempt == self.max_retries:
+                        LLM_FAILURES.labels(reason=failure_reason(e)).inc()
+                        logger.exception("LLM API streaming call failed after %d attempt(s): %s", attempt + 1, e)
+                        if emitted:
+                            raise
+                        return
+                    error = e
+            delay = self._backoff(attempt, error)
+            logger.warning("LLM API streaming call failed (%s), retry %d in %.2fs", error, attempt + 1, delay)
+            await asyncio.sleep(delay)
+
+    def stream_complete(
+        self, prompt: str, temperature: float = 0.3, max_tokens: Optional[int] = None
+    ) -> Iterator[str]:
+        """Синхронный итератор над astream_complete(): фрагменты передаются через очередь."""
+        loop = self._ensure_started()
+        chunks: queue.Queue = queue.Queue()
+        done = object()
+
+        async def pump() -> None:
+            try:
+                async for delta in self.astream_complete(prompt, temperature, max_tokens):
+                    chunks.put(delta)
+            except Exception as e:
+                # Обрыв после первых фрагментов — исключение передаётся читателю
+                chunks.put(e)
+            finally:
+                chunks.put(done)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), loop)
+        try:
+            while True:
+                item = chunks.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Клиент отключился раньше конца потока — не держим соединение с API
+            future.cancel()
+
+    def complete(
+        self,
+        prompt: str,
+        temperature: float = 0.3,
+        max_tokens: Optional[int] = None,
+        response_format: Optional[dict[str, Any]] = None,
+    ) -> Optional[str]:
+        """Синхронная обёртка над acomplete() для потоков Flask/gunicorn."""
+        loop = self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(
+            self.acomplete(prompt, temperature, max_tokens, response_format), loop
+        )
+        return future.result()
+
+    def complete_many(
+        self, prompts: list[str], temperature: float = 0.3, max_tokens: Optional[int] = None
+    ) -> list[Optional[str]]:
+        """Промпты параллельно в общем event loop — под теми же лимитами, что остальные вызовы."""
+        loop = self._ensure_started()
+
+        async def gather() -> list[Optional[str]]:
+            return await asyncio.gather(*(self.acomplete(p, temperature, max_tokens) for p in prompts))
+
+        return asyncio.run_coroutine_threadsafe(gather(), loop).result()
+
+    def after_fork(self) -> None:
+        super().after_fork()
+        # Поток loop мастера в воркере не существует: состояние сбрасывается без close(),
+        # новый loop и пул соединений создаст первый запрос
+        self._init_lock = threading.Lock()
+        self._loop = None
+        self._client = None
+        self._semaphore = None
+        self._bucket = None
+        self._pid = None
+
+    def close(self) -> None:
+        """Закрыть HTTP-клиент и остановить event loop текущего процесса."""
+        if self._loop is None or self._pid != os.getpid():
+            return
+        asyncio.run_coroutine_threadsafe(self._client.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+        self._pid = None
@@ -0,0 +1,191 @@
+"""
+Бюджет токенов промптов: локальный подсчёт токенов и сжатие длинного текста клиента.
+
+Токены считаются через tiktoken, если пакет установлен (кодировка по имени модели,
+для неизвестных моделей — o200k_base), иначе оценкой по длине текста с запасом
+для кириллицы. Текст сверх бюджета сжимается по предложениям: остаются предложения
+с числами (суммы, сроки, количество кредиторов) и самые информативные по весам
+TF-IDF ML-модели, в исходном порядке; пропуски отмечаются «[…]».
+"""
+
+import functools
+import math
+import re
+from typing import Any, Callable, NamedTuple, Optional
+
+# Оценка без tiktoken: у русского текста 2,5–4 символа на токен — берём меньшее с запасом
+CHARS_PER_TOKEN = 3.0
+FALLBACK_ENCODING = "o200k_base"
+GAP_MARKER = "[…]"
+# Прибавка к оценке предложения с числами: они почти всегда нужны юристу
+NUMBER_BONUS = 1.0
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+|\n+")
+_DIGIT_RE = re.compile(r"\d")
+
+SentenceScorer = Callable[[str], float]
+
+
+class PromptBudget(NamedTuple):
+    """Бюджет одного промпта: токенов текста клиента на входе и максимум токенов ответа."""
+
+    input_tokens: int
+    output_tokens: int
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model: str) -> Any:
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding(FALLBACK_ENCODING)
+
+
+def count_tokens(text: str, model: str = "") -> int:
+    """Число токенов текста для модели (точно с tiktoken, иначе оценка сверху)."""
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def split_sentences(text: str) -> list[str]:
+    """Предложения и строки текста без пустых."""
+    return [part.strip() for part in _SENTENCE_RE.split(text) if part and part.strip()]
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = "") -> str:
+    """Начало текста не длиннее max_tokens."""
+    encoding = _encoding(model)
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+    return text[: int(max_tokens * CHARS_PER_TOKEN)]
+
+
+def _digit_score(sentence: str) -> float:
+    return NUMBER_BONUS if _DIGIT_RE.search(sentence) else 0.0
+
+
+def tfidf_sentence_scorer(ml_model: Any) -> SentenceScorer:
+    """
+    Оценка информативности предложения по TF-IDF признакам ML-модели: сумма нормированных
+    весов растёт с числом редких слов из словаря модели; предложения с числами получают NUMBER_BONUS.
+    """
+
+    def score(sentence: str) -> float:
+        _, values, _ = ml_model.vectorize(sentence)
+        return float(values.sum()) + _digit_score(sentence)
+
+    return score
+
+
+def compress_text(
+    text: str,
+    max_tokens: int,
+    model: str = "",
+    scorer: Optional[SentenceScorer] = None,
+) -> str:
+    """
+    Текст не длиннее max_tokens: предложения с наибольшей оценкой scorer (без scorer —
+    предложения с числами, затем первые по порядку) в исходном порядке, пропуски — «[…]».
+    Текст в пределах бюджета возвращается без изменений.
+    """
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    sentences = split_sentences(text)
+    score = scorer or _digit_score
+    # При равной оценке выигрывает более раннее предложение: обычно там суть обращения
+    ranked = sorted(range(len(sentences)), key=lambda i: (-score(sentences[i]), i))
+    marker_tokens = count_tokens(GAP_MARKER, model) + 1
+    kept: set[int] = set()
+    used = 0
+    for i in ranked:
+        cost = count_tokens(sentences[i], model) + marker_tokens
+        if used + cost <= max_tokens:
+            kept.add(i)
+            used += cost
+    if not kept:
+        # Одно предложение больше бюджета (например, вставленная выписка без точек)
+        return truncate_tokens(sentences[ranked[0]] if sentences else text, max_tokens, model)
+    parts: list[str] = []
+    for i, sentence in enumerate(sentences):
+        if i in kept:
+            parts.append(sentence)
+        elif not parts or parts[-1] != GAP_MARKER:
+            parts.append(GAP_MARKER)
+    return " ".join(parts)
+
+
+def split_chunks(text: str, max_tokens: int, model: str = "") -> list[str]:
+    """Разбить текст на куски не длиннее max_tokens по границам предложений."""
+    chunks: list[str] = []
+    current: list[str] = []
+    used = 0
+    for sentence in split_sentences(text):
+        cost = count_tokens(sentence, model) + 1
+        if cost > max_tokens:
+            sentence = truncate_tokens(sentence, max_tokens - 1, model)
+            cost = max_tokens
+        if current and used + cost > max_tokens:
+            chunks.append(" ".join(current))
+            current, used = [], 0
+        current.append(sentence)
+        used += cost
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+class TokenBudgets:
+    """
+    Бюджеты промптов по имени (summary, fields, combined, map). Нулевой бюджет — без ограничения.
+    map_reduce_tokens > 0: текст длиннее этого порога резюмируется по кускам размером
+    с входной бюджет промпта map, а итоговый промпт получает выжимку кусков. Кусков не больше
+    map_max_chunks: текст длиннее сначала сжимается, чтобы число вызовов LLM было ограничено.
+    """
+
+    def __init__(
+        self,
+        prompts: dict[str, PromptBudget],
+        map_reduce_tokens: int = 0,
+        map_max_chunks: int = 16,
+        scorer: Optional[SentenceScorer] = None,
+    ) -> None:
+        self.prompts = prompts
+        self.map_reduce_tokens = map_reduce_tokens
+        self.map_max_chunks = map_max_chunks
+        self.scorer = scorer
+
+    def max_tokens(self, prompt_name: str) -> Optional[int]:
+        """Ограничение длины ответа (max_tokens запроса) или None."""
+        budget = self.prompts.get(prompt_name)
+        return budget.output_tokens if budget is not None and budget.output_tokens > 0 else None
+
+    def fit(self, prompt_name: str, text: str, model: str = "") -> str:
+        """Текст клиента, сжатый до входного бюджета промпта."""
+        budget = self.prompts.get(prompt_name)
+        if budget is None or budget.input_tokens <= 0:
+            return text
+        return compress_text(text, budget.input_tokens, model, self.scorer)
+
+    def map_chunks(self, text: str, model: str = "") -> Optional[list[str]]:
+        """Куски для map-шага, если текст длиннее порога map-reduce; иначе None."""
+        budget = self.prompts.get("map")
+        if self.map_reduce_tokens <= 0 or budget is None or budget.input_tokens <= 0:
+            return None
+        tokens = count_tokens(text, model)
+        if tokens <= self.map_reduce_tokens:
+            return None
+        # Запас на границы предложений: куски заполняются не до конца
+        limit = self.map_max_chunks * budget.input_tokens * 9 // 10
+        chunks = split_chunks(compress_text(text, limit, model, self.scorer), budget.input_tokens, model)
+        while len(chunks) > self.map_max_chunks and limit > budget.input_tokens:
+            # Запаса не хватило (длинные предложения) — сжать сильнее пропорционально лишним кускам
+            limit = max(budget.input_tokens, limit * self.map_max_chunks // len(chunks))
+            chunks = split_chunks(compress_text(text, limit, model, self.scorer), budget.input_tokens, model)
+        return chunks
@@ -0,0 +1,239 @@
+"""Кэш ответов LLM: ключ — хэш (модель, версия промпта, нормализованный текст, temperature)."""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKENDS = ("none", "memory", "sqlite")
+
+
+def normalize_text(text: str) -> str:
+    """Нормализовать текст для ключа кэша: Unicode NFC, схлопнуть пробелы и переводы строк."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def make_cache_key(
+    model: str,
+    prompt_version: str,
+    text: str,
+    temperature: float,
+) -> str:
+    """SHA-256 от (модель, версия промпта, нормализованный текст, temperature)."""
+    payload = json.dumps(
+        [model, prompt_version, normalize_text(text), round(float(temperature), 3)],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCacheBase(ABC):
+    """Базовый интерфейс кэша ответов LLM. Значения — JSON-сериализуемые объекты."""
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Значение по ключу или None (нет, истёк TTL)."""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Any) -> None:
+        """Сохранить значение; при переполнении вытеснить давно не использованные."""
+        pass
+
+    @abstractmethod
+    def stats(self) -> dict[str, Any]:
+        """Счётчики hits/misses, текущий размер и параметры кэша."""
+        pass
+
+    def after_fork(self) -> None:
+        """Вызывается в воркере gunicorn после fork: ресурсы процесса-родителя не используются."""
+        pass
+
+    def _expires_at(self) -> float:
+        return time.time() + self.ttl if self.ttl > 0 else float("inf")
+
+    def _stats_dict(self, backend: str, hits: int, misses: int, size: int) -> dict[str, Any]:
+        total = hits + misses
+        return {
+            "backend": backend,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else None,
+            "size": size,
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+        }
+
+
+class MemoryLRUCache(LLMCacheBase):
+    """
+    LRU-кэш в памяти процесса (свой у каждого воркера gunicorn).
+    Значения хранятся сериализованными, чтобы вызывающий код не мог изменить запись в кэше.
+    """
+
+    def __init__(self, max_size: int = 1000, ttl: float = 86400) -> None:
+        super().__init__(max_size, ttl)
+        self._data: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] < time.time():
+                del self._data[key]
+                item = None
+            if item is None:
+                self._misses += 1
+                return None
+            self._data.move_to_end(key)
+            self._hits += 1
+        return json.loads(item[1])
+
+    def set(self, key: str, value: Any) -> None:
+        raw = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._data[key] = (self._expires_at(), raw)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return self._stats_dict("memory", self._hits, self._misses, len(self._data))
+
+
+class SQLiteCache(LLMCacheBase):
+    """
+    Общий кэш в файле SQLite: все воркеры gunicorn видят результаты друг друга.
+    Счётчики hits/misses тоже хранятся в файле и суммируются по всем процессам.
+    """
+
+    # Вытеснение по размеру проверяется не на каждой записи
+    EVICT_EVERY = 50
+
+    def __init__(self, path: Path, max_size: int = 10000, ttl: float = 86400) -> None:
+        super().__init__(max_size, ttl)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed_at ON llm_cache (accessed_at)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache_stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        """Отдельное соединение на поток."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def after_fork(self) -> None:
+        # Соединение мастера (создано в __init__) бросается без close(): SQLite запрещает
+        # использовать соединение через fork, а close() в потомке может снять блокировки родителя
+        self._local = threading.local()
+
+    def _incr(self, conn: sqlite3.Connection, name: str) -> None:
+        conn.execute(
+            "INSERT INTO llm_cache_stats (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            conn = self._conn()
+            now = time.time()
+            with conn:
+                row = conn.execute(
+                    "SELECT value FROM llm_cache WHERE key = ? AND expires_at > ?",
+                    (key, now),
+                ).fetchone()
+                if row is None:
+                    self._incr(conn, "misses")
+                    return None
+                conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                self._incr(conn, "hits")
+            return json.loads(row[0])
+        except sqlite3.Error as e:
+            logger.warning("LLM cache read failed: %s", e)
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        try:
+            conn = self._conn()
+            now = time.time()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), self._expires_at(), now),
+                )
+                self._writes += 1
+                if self._writes % self.EVICT_EVERY == 0:
+                    self._evict(conn, now)
+        except sqlite3.Error as e:
+            logger.warning("LLM cache write failed: %s", e)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Удалить истёкшие записи и самые давно использованные сверх max_size."""
+        conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        conn.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_size,),
+        )
+
+    def stats(self) -> dict[str, Any]:
+        conn = self._conn()
+        counters = dict(conn.execute("SELECT name, value FROM llm_cache_stats").fetchall())
+        size = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return self._stats_dict(
+            "sqlite", counters.get("hits", 0), counters.get("misses", 0), size
+        )
+
+
+def create_cache(
+    backend: str,
+    max_size: int,
+    ttl: float,
+    path: Optional[Path] = None,
+) -> Optional[LLMCacheBase]:
+    """Создать кэш по имени бэкенда (none | memory | sqlite)."""
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return MemoryLRUCache(max_size=max_size, ttl=ttl)
+    if backend == "sqlite":
+        if path is None:
+            raise ValueError("Для кэша sqlite нужен путь к файлу (LLM_CACHE_PATH)")
+        return SQLiteCache(path, max_size=max_size, ttl=ttl)
+    raise ValueError(f"Неизвестный бэкенд кэша LLM: {backend}. Допустимые: {', '.join(CACHE_BACKENDS)}")
@@ -1,23 +1,376 @@
 """Клиент для работы с LLM API (OpenAI-совместимый, в т.ч. через прокси)."""
 
-import json
 import logging
 from abc import ABC, abstractmethod
-from typing import Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator, Optional
 
-from openai import OpenAI
+from app.metrics import (
+    LLM_CACHE_REQUESTS,
+    LLM_FAILURES,
+    LLM_INPUT_REDUCTIONS,
+    LLM_JSON_PARSE_FAILURES,
+    LLM_JSON_REPAIRS,
+    record_llm_usage,
+)
+
+from .budget import TokenBudgets
+from .cache import LLMCacheBase, make_cache_key
+from .schema import RESPONSE_FORMATS, coerce_fields, parse_json_response, response_format
 
 logger = logging.getLogger(__name__)
 
+SUMMARY_FALLBACK = "(не удалось сформировать резюме)"
+
+# Поля, которые извлекаются из заявки, и их описание в промпте
+FIELD_PROMPTS = {
+    "total_debt": '"total_debt" (число или null)',
+    "creditors_count": '"creditors_count" (число или null)',
+    "has_overdue": '"has_overdue" (true/false)',
+    "notes": '"notes" (краткий комментарий)',
+}
+
+# Версии шаблонов промптов: входят в ключ кэша, менять при правке текста промпта
+PROMPT_VERSIONS = {
+    "summary": "summary-v1",
+    "fields": "fields-v2",
+    "combined": "combined-v2",
+}
+
+# Длина резюме в промптах: обычное и краткое (клиент с brief_summary, уровень light маршрутизации)
+SUMMARY_LENGTH = "3–4 предложения"
+BRIEF_SUMMARY_LENGTH = "1–2 предложения"
+
+# Промпты, которые для очень длинного текста получают выжимку map-шага вместо самого текста
+MAP_REDUCE_PROMPTS = ("summary", "combined")
+# Потоков на map-шаг у синхронного клиента (асинхронный ограничен своим семафором)
+MAP_MAX_WORKERS = 8
+
+
+def request_options(
+    max_tokens: Optional[int] = None,
+    response_format: Optional[dict[str, Any]] = None,
+) -> dict[str, Any]:
+    """Необязательные параметры запроса: длина ответа и structured outputs (пусто — не задавать)."""
+    options: dict[str, Any] = {}
+    if max_tokens:
+        options["max_tokens"] = max_tokens
+    if response_format is not None:
+        options["response_format"] = response_format
+    return options
+
+
+def rejects_response_format(error: Exception) -> bool:
+    """API отклонил запрос из-за response_format (модель или прокси не поддерживают structured outputs)."""
+    status = getattr(error, "status_code", None)
+    if status not in (400, 422):
+        return False
+    message = str(error).lower()
+    return any(word in message for word in ("response_format", "json_schema", "json_object"))
+
+
+def failure_reason(error: Exception) -> str:
+    """Категория ошибки вызова LLM для метрики llm_failures."""
+    from openai import APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+
+    if isinstance(error, RateLimitError):
+        return "rate_limit"
+    if isinstance(error, APITimeoutError):
+        return "timeout"
+    if isinstance(error, APIConnectionError):
+        return "connection"
+    if isinstance(error, APIStatusError):
+        if getattr(error, "code", None) == "context_length_exceeded":
+            return "context_length"
+        return f"status_{error.status_code // 100}xx"
+    return "other"
+
 
 class LLMClientBase(ABC):
-    """Базовый интерфейс LLM-клиента."""
+    """
+    Базовый интерфейс LLM-клиента.
+    Подклассы реализуют complete() и задают model/cache/budgets/response_format_mode;
+    промпты заявки общие.
+    """
+
+    model: str
+    cache: Optional[LLMCacheBase] = None
+    budgets: Optional[TokenBudgets] = None
+    # Structured outputs для JSON-промптов: json_schema | json_object | none
+    response_format_mode: str = "none"
+    # Краткое резюме (1–2 предложения) в промптах summary и combined
+    brief_summary: bool = False
+
+    @property
+    def tier(self) -> str:
+        """Уровень маршрутизации клиента для метрик токенов: краткое резюме — light."""
+        return "light" if self.brief_summary else "full"
 
     @abstractmethod
-    def complete(self, prompt: str, temperature: float = 0.3) -> Optional[str]:
-        """Отправить промпт и вернуть текст ответа."""
+    def complete(
+        self,
+        prompt: str,
+        temperature: float = 0.3,
+        max_tokens: Optional[int] = None,
+        response_format: Optional[dict[str, Any]] = None,
+    ) -> Optional[str]:
+        """
+        Отправить промпт и вернуть текст ответа (не длиннее max_tokens, если задан).
+        response_format — structured outputs; если API его отклоняет, клиент повторяет запрос без него.
+        """
         pass
 
+    def after_fork(self) -> None:
+        """В воркере gunicorn после fork: HTTP-соединения и кэш мастера не переиспользуются."""
+        if self.cache is not None:
+            self.cache.after_fork()
+
+    def _response_format(self, name: str, keys: list[str], with_summary: bool = False) -> Optional[dict[str, Any]]:
+        return response_format(self.response_format_mode, name, keys, with_summary)
+
+    def _disable_response_format(self, error: Exception) -> None:
+        """API не поддерживает structured outputs: дальше JSON разбирается из обычного ответа."""
+        if self.response_format_mode != "none":
+            logger.warning(
+                "LLM API rejected response_format=%s, falling back to plain JSON prompts: %s",
+                self.response_format_mode,
+                error,
+            )
+            self.response_format_mode = "none"
+
+    def _parse_json(
+        self,
+        prompt_name: str,
+        result: str,
+        keys: list[str],
+        with_summary: bool = False,
+    ) -> Optional[dict[str, Any]]:
+        """
+        JSON-объект из ответа; если разобрать не удалось — один повторный запрос с просьбой
+        исправить ответ. None, если не помог и он.
+        """
+        data = parse_json_response(result)
+        if data is not None:
+            return data
+        LLM_JSON_PARSE_FAILURES.labels(prompt=prompt_name).inc()
+        repaired = self.complete(
+            self._repair_prompt(result, keys, with_summary),
+            temperature=0.0,
+            max_tokens=self._max_tokens(prompt_name),
+            response_format=self._response_format(prompt_name, keys, with_summary),
+        )
+        data = parse_json_response(repaired) if repaired else None
+        LLM_JSON_REPAIRS.labels(prompt=prompt_name, result="failed" if data is None else "ok").inc()
+        return data
+
+    def _repair_prompt(self, result: str, keys: list[str], with_summary: bool) -> str:
+        names = (["summary"] if with_summary else []) + keys
+        return (
+            "Ответ ниже должен был быть JSON-объектом с ключами "
+            + ", ".join(f'"{name}"' for name in names)
+            + ", но его не удалось разобрать. Верни только исправленный JSON, без пояснений; "
+            "значения не меняй, отсутствующие — null.\n\n"
+            f"Ответ:\n{result}\n\nJSON:"
+        )
+
+    def stream_complete(
+        self, prompt: str, temperature: float = 0.3, max_tokens: Optional[int] = None
+    ) -> Iterator[str]:
+        """
+        Отправить промпт и отдавать текст ответа частями по мере генерации.
+        По умолчанию — весь ответ одной частью; клиенты с поддержкой stream переопределяют.
+        """
+        result = self.complete(prompt, temperature=temperature, max_tokens=max_tokens)
+        if result:
+            yield result
+
+    def complete_many(
+        self, prompts: list[str], temperature: float = 0.3, max_tokens: Optional[int] = None
+    ) -> list[Optional[str]]:
+        """Несколько независимых промптов параллельно; ответы в порядке prompts."""
+        if len(prompts) <= 1:
+            return [self.complete(prompt, temperature, max_tokens) for prompt in prompts]
+        with ThreadPoolExecutor(max_workers=min(len(prompts), MAP_MAX_WORKERS)) as pool:
+            return list(pool.map(lambda prompt: self.complete(prompt, temperature, max_tokens), prompts))
+
+    def _max_tokens(self, prompt_name: str) -> Optional[int]:
+        return self.budgets.max_tokens(prompt_name) if self.budgets is not None else None
+
+    def _fit_text(self, prompt_name: str, text: str) -> str:
+        """
+        Текст клиента в пределах входного бюджета промпта: очень длинный для резюме —
+        выжимка map-шага, остальной сверх бюджета — сжатие по предложениям.
+        """
+        if self.budgets is None:
+            return text
+        if prompt_name in MAP_REDUCE_PROMPTS:
+            notes = self._map_notes(text)
+            if notes is not None:
+                LLM_INPUT_REDUCTIONS.labels(prompt=prompt_name, method="map_reduce").inc()
+                text = notes
+        fitted = self.budgets.fit(prompt_name, text, self.model)
+        if fitted != text:
+            LLM_INPUT_REDUCTIONS.labels(prompt=prompt_name, method="compress").inc()
+        return fitted
+
+    def _map_notes(self, text: str) -> Optional[str]:
+        """
+        Map-шаг: факты из каждого куска длинного текста, куски — параллельно.
+        None, если текст не длиннее порога или какой-то кусок не обработан
+        (тогда текст сжимается целиком, чтобы не потерять часть обращения молча).
+        """
+        chunks = self.budgets.map_chunks(text, self.model)
+        if not chunks:
+            return None
+        prompts = [self._map_prompt(chunk, i, len(chunks)) for i, chunk in enumerate(chunks, 1)]
+        notes = self.complete_many(prompts, temperature=0.2, max_tokens=self._max_tokens("map"))
+        if not all(notes):
+            return None
+        return "\n".join(notes)
+
+    def _map_prompt(self, chunk: str, index: int, total: int) -> str:
+        return (
+            f"Фрагмент {index} из {total} длинного обращения клиента о долгах. "
+            "Выпиши кратко факты из фрагмента: суммы и виды долгов, кредиторы, просрочки, "
+            "суды и исполнительные производства, имущество, вопросы клиента. "
+            "Числа сохраняй точно, ничего не выдумывай.\n\n"
+            f"Фрагмент:\n{chunk}\n\nФакты:"
+        )
+
+    def _cache_get(
+        self,
+        prompt_name: str,
+        text: str,
+        temperature: float,
+        variant: str = "",
+    ) -> tuple[Optional[str], Any]:
+        """Ключ и значение из кэша (None, если кэш выключен или промах)."""
+        if self.cache is None:
+            return None, None
+        version = PROMPT_VERSIONS[prompt_name] + (f":{variant}" if variant else "")
+        if self.brief_summary and prompt_name in ("summary", "combined"):
+            version += ":brief"
+        key = make_cache_key(self.model, version, text, temperature)
+        value = self.cache.get(key)
+        LLM_CACHE_REQUESTS.labels(prompt=prompt_name, result="miss" if value is None else "hit").inc()
+        return key, value
+
+    def _cache_set(self, key: Optional[str], value: Any) -> None:
+        if self.cache is not None and key is not None:
+            self.cache.set(key, value)
+
+    def summarize_request(self, text: str) -> str:
+        """Краткое резюме заявки для юриста (3–4 предложения, при brief_summary — 1–2)."""
+        key, cached = self._cache_get("summary", text, 0.3)
+        if cached is not None:
+            return cached
+        result = self.complete(
+            self._summary_prompt(self._fit_text("summary", text)),
+            temperature=0.3,
+            max_tokens=self._max_tokens("summary"),
+        )
+        if not result:
+            return SUMMARY_FALLBACK
+        self._cache_set(key, result)
+        return result
+
+    def summarize_request_stream(self, text: str) -> Iterator[str]:
+        """То же резюме, что summarize_request, но частями по мере генерации."""
+        key, cached = self._cache_get("summary", text, 0.3)
+        if cached is not None:
+            yield cached
+            return
+        parts: list[str] = []
+        prompt = self._summary_prompt(self._fit_text("summary", text))
+        for delta in self.stream_complete(prompt, temperature=0.3, max_tokens=self._max_tokens("summary")):
+            parts.append(delta)
+            yield delta
+        result = "".join(parts).strip()
+        if not result:
+            yield SUMMARY_FALLBACK
+            return
+        self._cache_set(key, result)
+
+    def _summary_length(self) -> str:
+        return BRIEF_SUMMARY_LENGTH if self.brief_summary else SUMMARY_LENGTH
+
+    def _summary_prompt(self, text: str) -> str:
+        return (
+            "Клиент описывает свою долговую ситуацию. "
+            f"Сделай краткое резюме для юриста ({self._summary_length()}), без выдумывания фактов.\n\n"
+            f"Текст клиента:\n{text}\n\nРезюме:"
+        )
+
+    def extract_fields(self, text: str, keys: Optional[list[str]] = None) -> dict[str, Any]:
+        """
+        Извлечь из текста: total_debt, creditors_count, has_overdue, notes.
+        keys — запросить только часть полей (notes запрашивается всегда).
+        """
+        keys = [k for k in FIELD_PROMPTS if k in keys or k == "notes"] if keys is not None else list(FIELD_PROMPTS)
+        variant = "" if len(keys) == len(FIELD_PROMPTS) else ",".join(keys)
+        key, cached = self._cache_get("fields", text, 0.2, variant)
+        if cached is not None:
+            return cached
+        prompt = (
+            "Проанализируй текст и верни JSON с ключами: "
+            + ", ".join(FIELD_PROMPTS[k] for k in keys)
+            + ". Только JSON, без пояснений.\n\n"
+            f"Текст клиента:\n{self._fit_text('fields', text)}\n\nJSON:"
+        )
+        result = self.complete(
+            prompt,
+            temperature=0.2,
+            max_tokens=self._max_tokens("fields"),
+            response_format=self._response_format("fields", keys),
+        )
+        if not result:
+            return {"raw_response": None}
+        data = self._parse_json("fields", result, keys)
+        if data is None:
+            return {"raw_response": result}
+        data = coerce_fields(data, keys)
+        self._cache_set(key, data)
+        return data
+
+    def analyze_request(self, text: str) -> tuple[str, dict[str, Any]]:
+        """
+        Резюме и поля одним запросом (режим single-call).
+        Возвращает (summary, fields) в том же формате, что summarize_request/extract_fields.
+        """
+        key, cached = self._cache_get("combined", text, 0.2)
+        if cached is not None:
+            return cached["summary"], cached["fields"]
+        prompt = (
+            "Клиент описывает свою долговую ситуацию. "
+            "Проанализируй текст и верни JSON с ключами: "
+            f'"summary" (краткое резюме для юриста, {self._summary_length()}, без выдумывания фактов), '
+            '"total_debt" (число или null), '
+            '"creditors_count" (число или null), '
+            '"has_overdue" (true/false), '
+            '"notes" (краткий комментарий). '
+            "Только JSON, без пояснений.\n\n"
+            f"Текст клиента:\n{self._fit_text('combined', text)}\n\nJSON:"
+        )
+        keys = list(FIELD_PROMPTS)
+        result = self.complete(
+            prompt,
+            temperature=0.2,
+            max_tokens=self._max_tokens("combined"),
+            response_format=self._response_format("combined", keys, with_summary=True),
+        )
+        if not result:
+            return SUMMARY_FALLBACK, {"raw_response": None}
+        data = self._parse_json("combined", result, keys, with_summary=True)
+        if data is None:
+            return SUMMARY_FALLBACK, {"raw_response": result}
+        summary = data.get("summary")
+        summary = str(summary).strip() if summary else ""
+        data = coerce_fields(data, keys)
+        if not summary:
+            return SUMMARY_FALLBACK, data
+        self._cache_set(key, {"summary": summary, "fields": data})
+        return summary, data
+
 
 class LLMClient(LLMClientBase):
     """Клиент OpenAI-совместимого API (прямой OpenAI или прокси, например api.proxyapi.ru)."""
@@ -27,61 +380,92 @@ class LLMClient(LLMClientBase):
         api_key: str,
         model: str = "gpt-4o-mini",
         base_url: Optional[str] = None,
+        cache: Optional[LLMCacheBase] = None,
+        timeout: float = 60.0,
+        max_retries: int = 2,
+        budgets: Optional[TokenBudgets] = None,
+        response_format_mode: str = "json_schema",
+        brief_summary: bool = False,
     ) -> None:
+        if response_format_mode not in RESPONSE_FORMATS:
+            raise ValueError(
+                f"Неизвестный режим response_format: {response_format_mode}. Допустимые: {', '.join(RESPONSE_FORMATS)}"
+            )
         self.api_key = api_key
         self.model = model
-        kwargs = {"api_key": api_key}
+        self.cache = cache
+        self.budgets = budgets
+        self.response_format_mode = response_format_mode
+        self.brief_summary = brief_summary
+        kwargs = {"api_key": api_key, "timeout": timeout, "max_retries": max_retries}
         if base_url and base_url.strip():
             kwargs["base_url"] = base_url.rstrip("/")
-        self._client = OpenAI(**kwargs)
+        self._client_kwargs = kwargs
+        self._client = self._create_client()
+
+    def _create_client(self):
+        # openai импортируется при создании клиента: в режиме classify пакет не загружается
+        from openai import OpenAI
+
+        return OpenAI(**self._client_kwargs)
+
+    def after_fork(self) -> None:
+        super().after_fork()
+        # Пул httpx мастера не переходит в воркер: сокеты keep-alive были бы общими у процессов
+        self._client = self._create_client()
 
-    def complete(self, prompt: str, temperature: float = 0.3) -> Optional[str]:
+    def complete(
+        self,
+        prompt: str,
+        temperature: float = 0.3,
+        max_tokens: Optional[int] = None,
+        response_format: Optional[dict[str, Any]] = None,
+    ) -> Optional[str]:
         """Один запрос (user message) — возврат текста ответа."""
         try:
             resp = self._client.chat.completions.create(
                 model=self.model,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=temperature,
+                **request_options(max_tokens, response_format),
             )
+            record_llm_usage(self.model, resp.usage, self.tier)
             if resp.choices and len(resp.choices) > 0:
                 return (resp.choices[0].message.content or "").strip()
         except Exception as e:
+            if response_format is not None and rejects_response_format(e):
+                self._disable_response_format(e)
+                return self.complete(prompt, temperature, max_tokens)
+            LLM_FAILURES.labels(reason=failure_reason(e)).inc()
             logger.exception("LLM API call failed: %s", e)
         return None
 
-    def summarize_request(self, text: str) -> str:
-        """Краткое резюме заявки для юриста (3–4 предложения)."""
-        prompt = (
-            "Клиент описывает свою долговую ситуацию. "
-            "Сделай краткое резюме для юриста (3–4 предложения), без выдумывания фактов.\n\n"
-            f"Текст клиента:\n{text}\n\nРезюме:"
-        )
-        result = self.complete(prompt, temperature=0.3)
-        return result or "(не удалось сформировать резюме)"
-
-    def extract_fields(self, text: str) -> dict[str, Any]:
-        """Извлечь из текста: total_debt, creditors_count, has_overdue, notes."""
-        prompt = (
-            "Проанализируй текст и верни JSON с ключами: "
-            '"total_debt" (число или null), '
-            '"creditors_count" (число или null), '
-            '"has_overdue" (true/false), '
-            '"notes" (краткий комментарий). '
-            "Только JSON, без пояснений.\n\n"
-            f"Текст клиента:\n{text}\n\nJSON:"
-        )
-        result = self.complete(prompt, temperature=0.2)
-        if not result:
-            return {"raw_response": None}
+    def stream_complete(
+        self, prompt: str, temperature: float = 0.3, max_tokens: Optional[int] = None
+    ) -> Iterator[str]:
+        """
+        Один запрос с stream=True — отдаёт фрагменты текста по мере генерации.
+        Сбой до первого фрагмента — пустой поток, после — исключение (ответ неполный).
+        Токены учитываются по usage последнего фрагмента (stream_options.include_usage).
+        """
+        emitted = False
         try:
-            # Убрать возможные markdown-обёртки
-            raw = result.strip()
-            if raw.startswith("```"):
-                lines = raw.split("\n")
-                raw = "\n".join(
-                    line for line in lines
-                    if not line.strip().startswith("```")
-                )
-            return json.loads(raw)
-        except json.JSONDecodeError:
-            return {"raw_response": result}
+            stream = self._client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                stream=True,
+                stream_options={"include_usage": True},
+                **request_options(max_tokens),
+            )
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    emitted = True
+                    yield chunk.choices[0].delta.content
+                if getattr(chunk, "usage", None) is not None:
+                    record_llm_usage(self.model, chunk.usage, self.tier)
+        except Exception as e:
+            LLM_FAILURES.labels(reason=failure_reason(e)).inc()
+            logger.exception("LLM API streaming call failed: %s", e)
+            if emitted:
+                raise
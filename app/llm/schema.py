@@ -0,0 +1,135 @@
+"""
+Схема полей заявки для ответов LLM: JSON Schema для structured outputs (response_format),
+устойчивый разбор JSON из «шумного» ответа и приведение значений к типам колонок БД.
+"""
+
+import json
+import re
+from typing import Any, Callable, Optional
+
+# Режимы response_format: json_schema (строгая схема), json_object (любой JSON-объект), none
+RESPONSE_FORMATS = ("json_schema", "json_object", "none")
+
+# Тип каждого поля в JSON Schema; любое поле может быть null, если в тексте его нет
+FIELD_TYPES = {
+    "total_debt": "integer",
+    "creditors_count": "integer",
+    "has_overdue": "boolean",
+    "notes": "string",
+}
+
+_MULTIPLIERS = (("млрд", 10 ** 9), ("млн", 10 ** 6), ("миллион", 10 ** 6), ("тыс", 10 ** 3))
+_NUMBER_RE = re.compile(r"\d[\d\s]*(?:[.,]\d+)*")
+_TRUE = ("true", "yes", "да", "есть", "1")
+_FALSE = ("false", "no", "нет", "0")
+
+
+def json_schema(keys: list[str], with_summary: bool = False) -> dict[str, Any]:
+    """JSON Schema ответа: поля keys (и summary) обязательны, лишние ключи запрещены (strict)."""
+    properties: dict[str, Any] = {}
+    if with_summary:
+        properties["summary"] = {"type": "string"}
+    properties.update({key: {"type": [FIELD_TYPES[key], "null"]} for key in keys})
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def response_format(mode: str, name: str, keys: list[str], with_summary: bool = False) -> Optional[dict[str, Any]]:
+    """Параметр response_format запроса для режима mode (None — без structured outputs)."""
+    if mode == "json_schema":
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": name, "schema": json_schema(keys, with_summary), "strict": True},
+        }
+    if mode == "json_object":
+        return {"type": "json_object"}
+    return None
+
+
+def parse_json_response(result: str) -> Optional[dict[str, Any]]:
+    """
+    Первый JSON-объект в ответе LLM. Чистый JSON разбирается сразу; иначе (markdown-обёртка,
+    пояснения до и после объекта) raw_decode пробует каждую «{» по порядку.
+    """
+    raw = result.strip()
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError:
+        data = None
+    if isinstance(data, dict):
+        return data
+    decoder = json.JSONDecoder()
+    start = raw.find("{")
+    while start != -1:
+        try:
+            data, _ = decoder.raw_decode(raw, start)
+        except json.JSONDecodeError:
+            data = None
+        if isinstance(data, dict):
+            return data
+        start = raw.find("{", start + 1)
+    return None
+
+
+def to_int(value: Any) -> Optional[int]:
+    """Целое из числа или строки («850 000 руб.», «1,2 млн», «1,200», «1,200,000»); иначе None."""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return round(value) if value == value and abs(value) != float("inf") else None
+    if not isinstance(value, str):
+        return None
+    match = _NUMBER_RE.search(value)
+    if match is None:
+        return None
+    digits = re.sub(r"\s", "", match.group())
+    separators = re.findall(r"[.,]", digits)
+    parts = re.split(r"[.,]", digits)
+    tail = value[match.end():].strip().lower()
+    multiplier = next((m for word, m in _MULTIPLIERS if tail.startswith(word)), 1)
+    if len(set(separators)) > 1:
+        # «1,200.50» — последний разделитель десятичный, остальные — разрядов
+        number = float("".join(parts[:-1]) + "." + parts[-1])
+    elif len(parts) > 2 or (separators == [","] and len(parts[1]) == 3 and multiplier == 1):
+        # «1,200,000» / «1.200.000» / «1,200» — разделители разрядов (но «1,200 млн» — дробь)
+        number = float("".join(parts))
+    else:
+        number = float(".".join(parts))
+    return round(number * multiplier)
+
+
+def to_bool(value: Any) -> Optional[bool]:
+    """Логическое значение из bool, 0/1 или строки (true/false, да/нет); иначе None."""
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return bool(value)
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in _TRUE:
+            return True
+        if value in _FALSE:
+            return False
+    return None
+
+
+def to_str(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False)
+    return value.strip() or None
+
+
+_COERCE: dict[str, Callable[[Any], Any]] = {"integer": to_int, "boolean": to_bool, "string": to_str}
+
+
+def coerce_fields(data: dict[str, Any], keys: list[str]) -> dict[str, Any]:
+    """Поля keys, приведённые к типам схемы (некорректное значение — None); остальные ключи отбрасываются."""
+    return {key: _COERCE[FIELD_TYPES[key]](data.get(key)) for key in keys}
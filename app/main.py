@@ -5,15 +5,200 @@ from pathlib import Path
 from flask import Flask
 
 from app.config import Settings
-from app.db import get_engine, get_session_factory, init_db
-from app.ml import MLModel
-from app.llm import LLMClient
-from app.services import RequestAnalyzerService
+from app.db import WriteBehindWriter, get_engine, get_session_factory, init_db
+from app.ml import MLModel, ModelRegistry
+from app.llm import LLMClient, LLMClientBase, PromptBudget, TokenBudgets, create_cache, tfidf_sentence_scorer
+from app.nlp import RuleExtractor
+from app.services import DuplicateIndex, JobWorkerPool, RequestAnalyzerService, RoutingPolicy, SingleFlight
 from app.api import register_routes
 
+APP_MODES = ("full", "classify")
 
-def create_app(config: Settings | None = None) -> Flask:
-    """Создать и сконфигурировать Flask-приложение."""
+
+def create_token_budgets(
+    config: Settings,
+    ml_model: MLModel | None = None,
+    brief_summary: bool = False,
+) -> TokenBudgets:
+    """
+    Бюджеты токенов промптов из настроек; предложения для сжатия оценивает TF-IDF модели.
+    brief_summary — для клиента уровня light: ответ с кратким резюме ограничен LLM_LIGHT_SUMMARY_OUTPUT_TOKENS.
+    """
+    summary_output = config.llm_summary_output_tokens
+    combined_output = config.llm_combined_output_tokens
+    if brief_summary:
+        summary_output = config.llm_light_summary_output_tokens
+        combined_output = config.llm_fields_output_tokens + config.llm_light_summary_output_tokens
+    return TokenBudgets(
+        {
+            "summary": PromptBudget(config.llm_summary_input_tokens, summary_output),
+            "fields": PromptBudget(config.llm_fields_input_tokens, config.llm_fields_output_tokens),
+            "combined": PromptBudget(config.llm_combined_input_tokens, combined_output),
+            "map": PromptBudget(config.llm_map_chunk_tokens, config.llm_map_output_tokens),
+        },
+        map_reduce_tokens=config.llm_map_reduce_tokens,
+        map_max_chunks=config.llm_map_max_chunks,
+        scorer=tfidf_sentence_scorer(ml_model) if ml_model is not None else None,
+    )
+
+
+def create_llm_client(
+    config: Settings,
+    cache=None,
+    budgets: TokenBudgets | None = None,
+    model: str | None = None,
+    brief_summary: bool = False,
+) -> LLMClientBase:
+    """LLM-клиент по настройке LLM_CLIENT (sync | async); model — вместо LLM_MODEL."""
+    if config.llm_client == "sync":
+        return LLMClient(
+            api_key=config.api_key,
+            model=model or config.llm_model,
+            base_url=config.openai_base_url_or_none,
+            cache=cache,
+            timeout=config.llm_timeout,
+            max_retries=config.llm_max_retries,
+            budgets=budgets,
+            response_format_mode=config.llm_response_format,
+            brief_summary=brief_summary,
+        )
+    if config.llm_client == "async":
+        # Ленивый импорт: httpx и асинхронный openai нужны только этому клиенту
+        from app.llm import AsyncLLMClient
+
+        return AsyncLLMClient(
+            api_key=config.api_key,
+            model=model or config.llm_model,
+            base_url=config.openai_base_url_or_none,
+            cache=cache,
+            timeout=config.llm_timeout,
+            connect_timeout=config.llm_connect_timeout,
+            max_retries=config.llm_max_retries,
+            backoff_base=config.llm_backoff_base,
+            backoff_max=config.llm_backoff_max,
+            max_concurrency=config.llm_max_concurrency,
+            rate_limit=config.llm_rate_limit,
+            rate_burst=config.llm_rate_burst,
+            budgets=budgets,
+            response_format_mode=config.llm_response_format,
+            brief_summary=brief_summary,
+        )
+    raise ValueError(f"Неизвестный LLM_CLIENT: {config.llm_client}. Допустимые: sync, async")
+
+
+def create_analyzer(config: Settings) -> RequestAnalyzerService:
+    """
+    Собрать сервис обработки заявок: БД, ML-модель, индекс дубликатов, LLM-клиент.
+    При APP_MODE=classify LLM-клиент, правила и индекс дубликатов не создаются.
+    """
+    if config.app_mode not in APP_MODES:
+        raise ValueError(f"Неизвестный APP_MODE: {config.app_mode}. Допустимые: {', '.join(APP_MODES)}")
+    classify_only = config.app_mode == "classify"
+    # БД
+    engine = get_engine(
+        config.database_url,
+        sqlite_wal=config.db_sqlite_wal,
+        sqlite_busy_timeout_ms=config.db_busy_timeout_ms,
+        pool_size=config.db_pool_size,
+        max_overflow=config.db_max_overflow,
+    )
+    init_db(engine)
+    session_factory = get_session_factory(engine)
+    writer = None
+    if config.db_write_behind_ms > 0:
+        writer = WriteBehindWriter(
+            session_factory,
+            interval_ms=config.db_write_behind_ms,
+            max_batch=config.db_write_behind_max_batch,
+        )
+
+    # ML: при ml_preload — загрузка сразу (в мастере gunicorn --preload, до fork),
+    # иначе ленивая загрузка при первом запросе
+    ml_model = MLModel(
+        config.ml_model_path,
+        use_compact=config.ml_fast_inference,
+        mmap_mode="r" if config.ml_mmap else None,
+        registry=ModelRegistry(config.model_registry_path),
+        reload_interval=config.ml_reload_interval,
+    )
+    dedup_index = None
+    if config.dedup_enabled and not classify_only:
+        dedup_index = DuplicateIndex(
+            ml_model,
+            session_factory,
+            threshold=config.dedup_threshold,
+            max_size=config.dedup_max_size,
+        )
+    if config.ml_preload:
+        ml_model.load()
+        # Индекс дубликатов строится один раз в мастере и наследуется воркерами;
+        # без предзагрузки — при первом поиске
+        if dedup_index is not None:
+            dedup_index.rebuild()
+        # Соединения пула, открытые init_db, не должны переходить в воркеры после fork
+        engine.dispose()
+
+    # LLM (+ кэш ответов) и маршрутизация по уровням обработки
+    llm_client = None
+    routing = None
+    light_llm_client = None
+    if not classify_only:
+        llm_cache = create_cache(
+            config.llm_cache_backend,
+            max_size=config.llm_cache_max_size,
+            ttl=config.llm_cache_ttl,
+            path=config.llm_cache_path,
+        )
+        llm_client = create_llm_client(config, llm_cache, create_token_budgets(config, ml_model))
+        if config.llm_routes.strip() or config.llm_route_default != "full":
+            routing = RoutingPolicy.from_spec(config.llm_routes, config.llm_route_default)
+            if "light" in routing.tiers:
+                # Отдельный клиент дешёвой модели; кэш общий — модель и краткость резюме входят в ключ
+                light_llm_client = create_llm_client(
+                    config,
+                    llm_cache,
+                    create_token_budgets(config, ml_model, brief_summary=True),
+                    model=config.llm_light_model or config.llm_model,
+                    brief_summary=True,
+                )
+
+    analyzer = RequestAnalyzerService(
+        ml_model,
+        llm_client,
+        session_factory,
+        llm_mode=config.llm_mode,
+        llm_timeout=config.llm_call_timeout,
+        llm_max_workers=config.llm_max_concurrency,
+        batch_concurrency=config.batch_concurrency,
+        writer=writer,
+        rule_extractor=RuleExtractor() if config.rules_enabled and not classify_only else None,
+        rules_min_confidence=config.rules_min_confidence,
+        dedup_index=dedup_index,
+        dedup_action=config.dedup_action,
+        single_flight=SingleFlight(
+            session_factory if config.singleflight_shared else None,
+            wait_timeout=config.singleflight_wait_seconds,
+            lease_seconds=config.singleflight_lease_seconds,
+            result_ttl=config.singleflight_result_ttl,
+        ) if config.singleflight_enabled else None,
+        routing=routing,
+        light_llm_client=light_llm_client,
+    )
+    return analyzer
+
+
+def start_background(app: Flask) -> None:
+    """Запустить в текущем процессе потоки задач и проверки новой версии модели."""
+    app.extensions["job_pool"].ensure_started()
+    app.extensions["analyzer"].ml_model.ensure_watching()
+
+
+def create_app(config: Settings | None = None, background: bool = True) -> Flask:
+    """
+    Создать и сконфигурировать Flask-приложение.
+    background=False — фоновые потоки не запускаются: при gunicorn --preload приложение создаётся
+    в мастере, потоки не переживают fork, и их запускает post_fork через start_background().
+    """
     if config is None:
         config = Settings()
 
@@ -23,23 +208,32 @@ def create_app(config: Settings | None = None) -> Flask:
     )
     app.config["SECRET_KEY"] = config.secret_key
 
-    # БД
-    engine = get_engine(config.database_url)
-    init_db(engine)
-    session_factory = get_session_factory(engine)
-
-    # ML (ленивая загрузка при первом запросе)
-    ml_model = MLModel(config.ml_model_path)
-
-    # LLM
-    llm_client = LLMClient(
-        api_key=config.api_key,
-        model=config.llm_model,
-        base_url=config.openai_base_url_or_none,
+    analyzer = create_analyzer(config)
+    # Хуки gunicorn (post_fork в gunicorn.conf.py) находят сервис через приложение
+    app.extensions["analyzer"] = analyzer
+    app.extensions["job_pool"] = job_pool = JobWorkerPool(
+        analyzer,
+        analyzer.session_factory,
+        workers=config.job_workers,
+        poll_interval=config.job_poll_interval,
+        lease_seconds=config.job_lease_seconds,
+    )
+    register_routes(
+        app,
+        analyzer,
+        job_pool=job_pool,
+        batch_max_size=config.batch_max_size,
+        metrics_enabled=config.metrics_enabled,
+        server_timing=config.server_timing,
     )
 
-    # Сервис и маршруты
-    analyzer = RequestAnalyzerService(ml_model, llm_client, session_factory)
-    register_routes(app, analyzer)
+    if background:
+        start_background(app)
+
+    # Запасной путь, если приложение загружено в мастере без post_fork (gunicorn --preload
+    # без gunicorn.conf.py): запуск повторно в процессе воркера — только проверка pid
+    @app.before_request
+    def _start_background():
+        start_background(app)
 
     return app
@@ -0,0 +1,38 @@
+"""Модуль метрик: задержки этапов обработки, счётчики LLM и эндпоинт /metrics."""
+
+from .registry import (
+    ANALYZE_COALESCED,
+    ANALYZE_STAGE_SECONDS,
+    ANALYZE_TIER,
+    ANALYZE_TIER_SECONDS,
+    HTTP_REQUEST_SECONDS,
+    LLM_CACHE_REQUESTS,
+    LLM_FAILURES,
+    LLM_INPUT_REDUCTIONS,
+    LLM_JSON_PARSE_FAILURES,
+    LLM_JSON_REPAIRS,
+    LLM_TOKENS,
+    record_llm_usage,
+    render_metrics,
+)
+from .timing import server_timing_header, stage_timer, start_request_timing, timed
+
+__all__ = [
+    "ANALYZE_COALESCED",
+    "ANALYZE_STAGE_SECONDS",
+    "ANALYZE_TIER",
+    "ANALYZE_TIER_SECONDS",
+    "HTTP_REQUEST_SECONDS",
+    "LLM_CACHE_REQUESTS",
+    "LLM_FAILURES",
+    "LLM_INPUT_REDUCTIONS",
+    "LLM_JSON_PARSE_FAILURES",
+    "LLM_JSON_REPAIRS",
+    "LLM_TOKENS",
+    "record_llm_usage",
+    "render_metrics",
+    "server_timing_header",
+    "stage_timer",
+    "start_request_timing",
+    "timed",
+]
@@ -0,0 +1,102 @@
+"""
+Метрики Prometheus.
+
+В gunicorn у каждого воркера своя память, поэтому при заданной переменной окружения
+PROMETHEUS_MULTIPROC_DIR prometheus_client пишет значения в файлы каталога (по файлу
+на процесс), а /metrics суммирует их по всем воркерам. Каталог должен быть пустым
+при старте сервера (см. Dockerfile). Без переменной метрики хранятся в памяти процесса.
+"""
+
+import os
+from typing import Any, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+# От единиц миллисекунд (ML, запись в БД) до десятков секунд (вызовы LLM)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+ANALYZE_STAGE_SECONDS = Histogram(
+    "analyze_stage_seconds",
+    "Длительность этапа обработки заявки",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+ANALYZE_COALESCED = Counter(
+    "analyze_coalesced",
+    "Обработки, получившие результат одновременного вызова с тем же текстом (single-flight)",
+    ["scope"],
+)
+ANALYZE_TIER = Counter(
+    "analyze_tier",
+    "Заявки по уровням обработки (маршрутизация по классу, уверенности и длине текста)",
+    ["tier"],
+)
+ANALYZE_TIER_SECONDS = Histogram(
+    "analyze_tier_seconds",
+    "Длительность получения резюме и полей на уровне обработки",
+    ["tier"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds",
+    "Длительность обработки HTTP-запроса",
+    ["endpoint", "method", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "llm_tokens",
+    "Токены LLM по полю usage ответов (tier — уровень маршрутизации клиента)",
+    ["model", "tier", "kind"],
+)
+LLM_FAILURES = Counter(
+    "llm_failures",
+    "Неудачные вызовы LLM (после всех повторов)",
+    ["reason"],
+)
+LLM_JSON_PARSE_FAILURES = Counter(
+    "llm_json_parse_failures",
+    "Ответы LLM, которые не удалось разобрать как JSON",
+    ["prompt"],
+)
+LLM_INPUT_REDUCTIONS = Counter(
+    "llm_input_reductions",
+    "Тексты клиента, сокращённые под бюджет токенов промпта",
+    ["prompt", "method"],
+)
+LLM_JSON_REPAIRS = Counter(
+    "llm_json_repairs",
+    "Повторные запросы на исправление неразборчивого JSON-ответа LLM",
+    ["prompt", "result"],
+)
+LLM_CACHE_REQUESTS = Counter(
+    "llm_cache_requests",
+    "Обращения к кэшу ответов LLM",
+    ["prompt", "result"],
+)
+
+
+def record_llm_usage(model: str, usage: Optional[Any], tier: str = "full") -> None:
+    """Учесть токены из поля usage ответа (если API его вернул)."""
+    if usage is None:
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        value = getattr(usage, kind, None)
+        if value:
+            LLM_TOKENS.labels(model=model, tier=tier, kind=kind.split("_")[0]).inc(value)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Текст метрик в формате Prometheus и Content-Type ответа."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,55 @@
+"""
+Замер этапов обработки запроса.
+
+Каждый этап попадает в гистограмму analyze_stage_seconds и, если для текущего
+HTTP-запроса включён сбор (start_request_timing), — в словарь длительностей запроса,
+из которого строится заголовок Server-Timing. Словарь хранится в contextvars:
+задачи, отправленные в пул потоков через contextvars.copy_context().run, пишут в него же.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Iterator, Optional
+
+from .registry import ANALYZE_STAGE_SECONDS
+
+_request_timings: ContextVar[Optional[dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+def start_request_timing() -> dict[str, float]:
+    """Начать сбор длительностей этапов для текущего запроса (в потоке обработки)."""
+    timings: dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Замерить этап: гистограмма + длительность в текущем запросе (сумма при повторах)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        ANALYZE_STAGE_SECONDS.labels(stage=stage).observe(elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def timed(stage: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Обёртка над fn, замеряющая каждый вызов как этап stage."""
+
+    @wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with stage_timer(stage):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def server_timing_header(timings: dict[str, float]) -> str:
+    """Значение заголовка Server-Timing: "ml;dur=0.8, llm_summary;dur=412.3" (мс)."""
+    return ", ".join(f"{stage};dur={seconds * 1e3:.1f}" for stage, seconds in timings.items())
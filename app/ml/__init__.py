@@ -1,5 +1,33 @@
 """Модуль ML: классификация текста заявок."""
 
+import importlib
+from typing import Any
+
+from .compact import CompactModel
 from .model import MLModel
+from .registry import ModelRegistry
+
+# Обучение тянет pandas и sklearn; импортируется при первом обращении, а не при старте воркера
+_LAZY = {
+    "StreamingTrainer": ".streaming",
+    "csv_chunks": ".streaming",
+    "requests_chunks": ".streaming",
+    "train_tfidf": ".training",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY:
+        return getattr(importlib.import_module(_LAZY[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-__all__ = ["MLModel"]
+__all__ = [
+    "MLModel",
+    "CompactModel",
+    "ModelRegistry",
+    "StreamingTrainer",
+    "csv_chunks",
+    "requests_chunks",
+    "train_tfidf",
+]
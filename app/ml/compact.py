@@ -0,0 +1,149 @@
+"""
+Компактное представление обученной модели для инференса без sklearn Pipeline.
+
+Из TfidfVectorizer + LogisticRegression выгружаются массивы NumPy (словарь, idf,
+коэффициенты) и параметры токенизации; предсказание — словарный поиск и скалярные
+произведения, без распаковки и обхода пайплайна.
+"""
+
+import json
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+
+META_FILE = "meta.json"
+ARRAYS = ("terms", "idf", "coef", "intercept", "classes")
+
+
+class CompactModel:
+    """Инференс TF-IDF + логистической регрессии на массивах NumPy."""
+
+    def __init__(self, arrays: dict[str, np.ndarray], meta: dict[str, Any]) -> None:
+        self.terms = arrays["terms"]
+        self.idf = arrays["idf"]
+        self.coef = arrays["coef"]
+        self.intercept = arrays["intercept"]
+        self.classes_ = arrays["classes"]
+        self.meta = meta
+        self.vocabulary = {str(term): i for i, term in enumerate(self.terms)}
+        self._token_re = re.compile(meta["token_pattern"])
+        self._ngram_range = tuple(meta["ngram_range"])
+
+    @classmethod
+    def from_pipeline(cls, pipeline) -> "CompactModel":
+        """
+        Построить из обученного Pipeline([("tfidf", TfidfVectorizer), ("clf", LogisticRegression)]).
+        ValueError, если конфигурация пайплайна не поддерживается.
+        """
+        steps = list(pipeline.named_steps.values())
+        if len(steps) != 2:
+            raise ValueError("Ожидается пайплайн из двух шагов: TfidfVectorizer и LogisticRegression")
+        vec, clf = steps
+        if type(vec).__name__ != "TfidfVectorizer" or type(clf).__name__ != "LogisticRegression":
+            raise ValueError(
+                f"Неподдерживаемый пайплайн: {type(vec).__name__} + {type(clf).__name__}"
+            )
+        if (
+            vec.analyzer != "word"
+            or vec.tokenizer is not None
+            or vec.preprocessor is not None
+            or vec.strip_accents is not None
+            or (vec.stop_words is not None and tuple(vec.ngram_range) != (1, 1))
+        ):
+            raise ValueError("Неподдерживаемые параметры TfidfVectorizer для компактной модели")
+
+        terms = np.array(
+            sorted(vec.vocabulary_, key=vec.vocabulary_.get), dtype=np.str_
+        )
+        idf = vec.idf_ if vec.use_idf else np.ones(len(terms))
+        # multi_class="ovr" (или liblinear в старых версиях sklearn) — нормированные сигмоиды
+        multi_class = getattr(clf, "multi_class", "auto")
+        ovr = multi_class == "ovr" or (multi_class == "auto" and clf.solver == "liblinear")
+        arrays = {
+            "terms": terms,
+            "idf": np.asarray(idf, dtype=np.float64),
+            "coef": np.ascontiguousarray(clf.coef_, dtype=np.float64),
+            "intercept": np.asarray(clf.intercept_, dtype=np.float64),
+            "classes": np.asarray(clf.classes_).astype(np.str_),
+        }
+        meta = {
+            "lowercase": bool(vec.lowercase),
+            "token_pattern": vec.token_pattern,
+            "ngram_range": list(vec.ngram_range),
+            "binary": bool(vec.binary),
+            "sublinear_tf": bool(vec.sublinear_tf),
+            "norm": vec.norm,
+            "ovr": bool(ovr),
+        }
+        return cls(arrays, meta)
+
+    def save(self, path: Path) -> None:
+        """Сохранить в каталог: по .npy на массив + meta.json."""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name, arr in zip(ARRAYS, (self.terms, self.idf, self.coef, self.intercept, self.classes_)):
+            np.save(path / f"{name}.npy", arr, allow_pickle=False)
+        (path / META_FILE).write_text(json.dumps(self.meta, ensure_ascii=False), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Path, mmap_mode: Optional[str] = None) -> "CompactModel":
+        """Загрузить из каталога, созданного save()."""
+        path = Path(path)
+        meta = json.loads((path / META_FILE).read_text(encoding="utf-8"))
+        arrays = {
+            name: np.load(path / f"{name}.npy", mmap_mode=mmap_mode, allow_pickle=False)
+            for name in ARRAYS
+        }
+        return cls(arrays, meta)
+
+    def _features(self, text: str) -> tuple[np.ndarray, np.ndarray]:
+        """Индексы и TF-IDF веса признаков текста (как TfidfVectorizer.transform)."""
+        if self.meta["lowercase"]:
+            text = text.lower()
+        tokens = self._token_re.findall(text)
+        lo, hi = self._ngram_range
+        grams: list[str] = []
+        for n in range(lo, hi + 1):
+            if n == 1:
+                grams.extend(tokens)
+            else:
+                grams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+
+        counts = Counter(
+            idx for idx in (self.vocabulary.get(g) for g in grams) if idx is not None
+        )
+        if not counts:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float64)
+        idx = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        if self.meta["binary"]:
+            tf = np.ones_like(tf)
+        elif self.meta["sublinear_tf"]:
+            tf = np.log(tf) + 1.0
+        values = tf * self.idf[idx]
+        norm = self.meta["norm"]
+        if norm == "l2":
+            values /= np.sqrt(np.dot(values, values))
+        elif norm == "l1":
+            values /= np.abs(values).sum()
+        return idx, values
+
+    def predict_proba(self, texts: list[str]) -> np.ndarray:
+        """Вероятности классов, shape (len(texts), n_classes) — как LogisticRegression.predict_proba."""
+        scores = np.empty((len(texts), self.coef.shape[0]), dtype=np.float64)
+        for row, text in enumerate(texts):
+            idx, values = self._features(text)
+            scores[row] = self.coef[:, idx] @ values + self.intercept
+
+        if scores.shape[1] == 1:
+            pos = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return np.column_stack([1.0 - pos, pos])
+        if self.meta["ovr"]:
+            proba = 1.0 / (1.0 + np.exp(-scores))
+            return proba / proba.sum(axis=1, keepdims=True)
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        return scores / scores.sum(axis=1, keepdims=True)
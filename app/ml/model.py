@@ -1,23 +1,64 @@
 """Класс ML-модели: обучение и предсказание типа заявки."""
 
+import logging
+import os
+import shutil
+import threading
+import time
 from pathlib import Path
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, NamedTuple, Optional
 
 import joblib
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score, classification_report
-from sklearn.model_selection import train_test_split
-from sklearn.pipeline import Pipeline
+import numpy as np
+
+from .compact import CompactModel
+from .registry import ModelRegistry
+
+if TYPE_CHECKING:
+    # Только для аннотаций: sklearn загружается при распаковке Pipeline или при обучении
+    from sklearn.pipeline import Pipeline
+
+    from .streaming import ChunkSource
+
+logger = logging.getLogger(__name__)
+
+
+class LoadedModel(NamedTuple):
+    """Загруженная модель: заменяется целиком одной ссылкой при горячей перезагрузке."""
+
+    classifier: Any          # CompactModel или Pipeline: predict_proba и classes_
+    kind: str                # "compact" | "pipeline"
+    version: Optional[str]   # версия из реестра (None — модель не из реестра)
+    signature: Any           # по нему фоновый поток замечает новую версию
 
 
 class MLModel:
     """Пайплайн классификации текста (TfidfVectorizer + LogisticRegression)."""
 
-    def __init__(self, model_path: Path) -> None:
+    def __init__(
+        self,
+        model_path: Path,
+        use_compact: bool = True,
+        mmap_mode: Optional[str] = None,
+        registry: Optional[ModelRegistry] = None,
+        reload_interval: float = 0,
+    ) -> None:
         self.model_path = Path(model_path)
-        self._pipeline: Optional[Pipeline] = None
+        self.use_compact = use_compact
+        # mmap_mode="r": массивы модели отображаются из файлов, страницы общие для всех воркеров
+        self.mmap_mode = mmap_mode
+        # Активная версия реестра важнее model_path; пустой реестр — используется model_path
+        self.registry = registry
+        self.reload_interval = reload_interval
+        self._state: Optional[LoadedModel] = None
+        self._pipeline: Optional["Pipeline"] = None
+        self._watch_pid: Optional[int] = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def compact_path(self) -> Path:
+        """Каталог компактного представления рядом с .pkl (text_clf.pkl -> text_clf.compact/)."""
+        return self.model_path.with_suffix(".compact")
 
     def train(
         self,
@@ -31,56 +72,235 @@ class MLModel:
         Обучить модель на размеченных данных.
         Возвращает словарь с метриками (accuracy, report).
         """
-        df = pd.read_csv(data_path)
-        X = df[text_column].astype(str)
-        y = df[label_column]
+        # Зависимости обучения (pandas, sklearn) импортируются только здесь
+        from .training import train_tfidf
 
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=test_size, random_state=random_state, stratify=y
-        )
+        pipeline, metrics = train_tfidf(data_path, text_column, label_column, test_size, random_state)
 
-        pipeline = Pipeline([
-            ("tfidf", TfidfVectorizer()),
-            ("clf", LogisticRegression(max_iter=1000)),
-        ])
-        pipeline.fit(X_train, y_train)
+        self.model_path.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(pipeline, self.model_path)
+        self._pipeline = pipeline
+        self._state = LoadedModel(pipeline, "pipeline", None, None)
+        try:
+            compact = CompactModel.from_pipeline(pipeline)
+            compact.save(self.compact_path)
+            if self.use_compact:
+                self._state = LoadedModel(compact, "compact", None, None)
+        except ValueError as e:
+            logger.warning("Компактная модель не выгружена: %s", e)
 
-        y_pred = pipeline.predict(X_test)
-        accuracy = accuracy_score(y_test, y_pred)
-        report = classification_report(y_test, y_pred)
+        return metrics
+
+    def train_streaming(
+        self,
+        source: "ChunkSource",
+        n_features: int = 2 ** 20,
+        n_jobs: int = 1,
+        epochs: int = 1,
+        test_size: float = 0.2,
+        random_state: int = 42,
+    ) -> dict[str, Any]:
+        """
+        Обучить модель порциями (HashingVectorizer + SGDClassifier.partial_fit),
+        не загружая корпус в память. source — csv_chunks(...) или requests_chunks(...).
+        Возвращает метрики на потоковой отложенной выборке (accuracy, report, confusion_matrix).
+        """
+        from .streaming import StreamingTrainer
+
+        trainer = StreamingTrainer(
+            n_features=n_features,
+            n_jobs=n_jobs,
+            epochs=epochs,
+            test_size=test_size,
+            random_state=random_state,
+        )
+        pipeline, metrics = trainer.fit(source)
 
         self.model_path.parent.mkdir(parents=True, exist_ok=True)
         joblib.dump(pipeline, self.model_path)
         self._pipeline = pipeline
-
-        return {
-            "accuracy": accuracy,
-            "classification_report": report,
-        }
+        self._state = LoadedModel(pipeline, "pipeline", None, None)
+        # Компактное представление поддерживает только TF-IDF — прежнее больше не соответствует модели
+        shutil.rmtree(self.compact_path, ignore_errors=True)
+        return metrics
 
     def load(self) -> "MLModel":
-        """Загрузить модель с диска."""
-        if not self.model_path.exists():
-            raise FileNotFoundError(f"Модель не найдена: {self.model_path}. Сначала выполните обучение.")
-        self._pipeline = joblib.load(self.model_path)
+        """
+        Загрузить модель с диска: активную версию реестра или model_path.
+        При use_compact и актуальном компактном представлении Pipeline не распаковывается.
+        """
+        with self._load_lock:
+            self._state = self._load_state()
+            self._pipeline = None
         return self
 
+    def _resolve(self) -> tuple[Path, Optional[str]]:
+        """Путь к .pkl и версия: активная версия реестра или model_path."""
+        if self.registry is not None:
+            version = self.registry.active_version()
+            if version is not None:
+                return self.registry.model_path(version), version
+        return self.model_path, None
+
+    def _signature(self, path: Path, version: Optional[str]) -> Any:
+        """Версия и время изменения файлов: меняется при активации версии или перезаписи .pkl."""
+        compact_meta = path.with_suffix(".compact") / "meta.json"
+        return (
+            version,
+            path.stat().st_mtime_ns,
+            compact_meta.stat().st_mtime_ns if compact_meta.exists() else None,
+        )
+
+    def _load_state(self) -> LoadedModel:
+        path, version = self._resolve()
+        if not path.exists():
+            raise FileNotFoundError(f"Модель не найдена: {path}. Сначала выполните обучение.")
+        signature = self._signature(path, version)
+        compact_path = path.with_suffix(".compact")
+        if self.use_compact and self._compact_is_fresh(path, compact_path):
+            return LoadedModel(CompactModel.load(compact_path, mmap_mode=self.mmap_mode), "compact", version, signature)
+        return LoadedModel(joblib.load(path, mmap_mode=self.mmap_mode), "pipeline", version, signature)
+
+    def ensure_watching(self) -> None:
+        """
+        Фоновая проверка новой версии раз в reload_interval секунд (поток на процесс —
+        после fork воркера gunicorn запускается заново). При reload_interval <= 0 выключена.
+        """
+        if self.reload_interval <= 0 or self._watch_pid == os.getpid():
+            return
+        with self._load_lock:
+            if self._watch_pid == os.getpid():
+                return
+            threading.Thread(target=self._watch, name="ml-model-reload", daemon=True).start()
+            self._watch_pid = os.getpid()
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(self.reload_interval)
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                # Например, .pkl перезаписывается прямо сейчас — попробуем в следующий раз
+                logger.warning("Перезагрузка модели не удалась, остаётся текущая: %s", e)
+
+    def reload_if_changed(self) -> bool:
+        """
+        Загрузить новую модель, если сменилась активная версия или файлы модели.
+        Новая модель загружается рядом со старой и подменяется одной ссылкой:
+        предсказания, уже получившие старую, досчитываются на ней. Возвращает True при замене.
+        """
+        state = self._state
+        path, version = self._resolve()
+        if state is not None and path.exists() and self._signature(path, version) == state.signature:
+            return False
+        new_state = self._load_state()
+        with self._load_lock:
+            self._state = new_state
+            self._pipeline = None
+        logger.info(
+            "Модель перезагружена: %s (%s)",
+            new_state.version or path, new_state.kind,
+        )
+        return True
+
     @property
-    def pipeline(self) -> Pipeline:
-        """Пайплайн (загружается при первом обращении)."""
-        if self._pipeline is None:
+    def is_loaded(self) -> bool:
+        """Модель загружена в память процесса."""
+        return self._state is not None
+
+    @property
+    def loaded_kind(self) -> Optional[str]:
+        """Что используется для предсказаний: "compact", "pipeline" или None (не загружена)."""
+        return self._state.kind if self._state is not None else None
+
+    @property
+    def version(self) -> Optional[str]:
+        """Версия загруженной модели из реестра (None — модель не из реестра или не загружена)."""
+        return self._state.version if self._state is not None else None
+
+    def _compact_is_fresh(self, model_path: Path, compact_path: Path) -> bool:
+        """Компактное представление есть и не старее .pkl."""
+        meta = compact_path / "meta.json"
+        if not meta.exists():
+            return False
+        if meta.stat().st_mtime < model_path.stat().st_mtime:
+            logger.warning("Компактная модель %s старее %s — используется Pipeline", compact_path, model_path)
+            return False
+        return True
+
+    def _loaded(self) -> LoadedModel:
+        """Текущая модель (загружается при первом обращении); одна ссылка на весь вызов."""
+        state = self._state
+        if state is None:
             self.load()
+            state = self._state
+        return state
+
+    @property
+    def loaded_model(self) -> LoadedModel:
+        """Текущая загруженная модель (после горячей перезагрузки — другой объект)."""
+        return self._loaded()
+
+    @property
+    def pipeline(self) -> "Pipeline":
+        """Пайплайн sklearn текущей модели (загружается при первом обращении)."""
+        state = self._loaded()
+        if state.kind == "pipeline":
+            return state.classifier
+        if self._pipeline is None:
+            path, _ = self._resolve()
+            self._pipeline = joblib.load(path, mmap_mode=self.mmap_mode)
         return self._pipeline
 
+    def vectorize(self, text: str) -> tuple[np.ndarray, np.ndarray, LoadedModel]:
+        """
+        Признаки текста из векторизатора модели: индексы, веса с L2-нормой и модель,
+        в пространстве которой они посчитаны (у другой версии модели — другие признаки).
+        """
+        state = self._loaded()
+        clf = state.classifier
+        if state.kind == "compact":
+            idx, values = clf._features(text)
+        else:
+            row = clf[:-1].transform([text]).tocsr()
+            idx, values = row.indices.astype(np.intp), row.data.astype(np.float64)
+        norm = float(np.sqrt(np.dot(values, values))) if len(values) else 0.0
+        if norm > 0:
+            values = values / norm
+        order = np.argsort(idx)
+        return idx[order], values[order], state
+
     def predict(self, text: str) -> dict[str, Any]:
         """
         Предсказать класс заявки.
-        Возвращает {"label": str, "confidence": float или None}.
-        """
-        pl = self.pipeline
-        # predict ожидает итерируемый объект
-        label = pl.predict([text])[0]
-        proba = None
-        if hasattr(pl, "predict_proba"):
-            proba = float(pl.predict_proba([text])[0].max())
-        return {"label": str(label), "confidence": proba}
+        Возвращает {"label": str, "confidence": float или None, "model_version": str или None}.
+        """
+        state = self._loaded()
+        clf = state.classifier
+        if not hasattr(clf, "predict_proba"):
+            return {"label": str(clf.predict([text])[0]), "confidence": None, "model_version": state.version}
+        # Один проход: класс — argmax вероятностей
+        proba = clf.predict_proba([text])[0]
+        best = int(proba.argmax())
+        return {
+            "label": str(clf.classes_[best]),
+            "confidence": float(proba[best]),
+            "model_version": state.version,
+        }
+
+    def predict_many(self, texts: list[str]) -> list[dict[str, Any]]:
+        """
+        Предсказать классы для списка заявок одним векторизованным проходом пайплайна.
+        Возвращает список {"label", "confidence", "model_version"} в порядке texts.
+        """
+        if not texts:
+            return []
+        state = self._loaded()
+        clf = state.classifier
+        probas = clf.predict_proba(list(texts))
+        classes = clf.classes_
+        best = probas.argmax(axis=1)
+        return [
+            {"label": str(classes[i]), "confidence": float(row[i]), "model_version": state.version}
+            for row, i in zip(probas, best)
+        ]
@@ -0,0 +1,124 @@
+"""
+Реестр версий модели.
+
+Структура каталога:
+  versions/<версия>/text_clf.pkl        — Pipeline
+  versions/<версия>/text_clf.compact/   — компактное представление (если есть)
+  versions/<версия>/manifest.json       — метрики, хеш обучающих данных, время создания
+  active.json                           — {"version": ...}: какая версия обслуживает запросы
+
+Версия публикуется целиком до переключения active.json, а сам active.json заменяется
+атомарно (os.replace), поэтому воркеры никогда не видят наполовину записанную модель.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+MANIFEST_FILE = "manifest.json"
+ACTIVE_FILE = "active.json"
+MODEL_FILE = "text_clf.pkl"
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 файла (читается порциями)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_json_atomic(path: Path, data: dict[str, Any]) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+class ModelRegistry:
+    """Версионированные артефакты модели и указатель на активную версию."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+
+    @property
+    def versions_dir(self) -> Path:
+        return self.root / "versions"
+
+    def model_path(self, version: str) -> Path:
+        """Путь к .pkl версии (компактная модель — рядом, с суффиксом .compact)."""
+        return self.versions_dir / version / MODEL_FILE
+
+    def publish(
+        self,
+        model_path: Path,
+        metrics: Optional[dict[str, Any]] = None,
+        data_hash: Optional[str] = None,
+        params: Optional[dict[str, Any]] = None,
+        activate: bool = True,
+    ) -> str:
+        """
+        Скопировать обученную модель (и её .compact/) в новую версию, записать манифест;
+        при activate — сделать версию активной. Возвращает идентификатор версии.
+        """
+        model_path = Path(model_path)
+        created = datetime.now(timezone.utc)
+        version = created.strftime("%Y%m%d-%H%M%S")
+        suffix = 1
+        while (self.versions_dir / version).exists():
+            suffix += 1
+            version = f"{created.strftime('%Y%m%d-%H%M%S')}-{suffix}"
+
+        # Сначала во временный каталог, затем переименование — версия появляется целиком
+        tmp_dir = self.versions_dir / f".{version}.tmp"
+        tmp_dir.mkdir(parents=True)
+        shutil.copy2(model_path, tmp_dir / MODEL_FILE)
+        compact = model_path.with_suffix(".compact")
+        if compact.is_dir():
+            shutil.copytree(compact, tmp_dir / Path(MODEL_FILE).with_suffix(".compact"))
+        manifest = {
+            "version": version,
+            "created_at": created.isoformat().replace("+00:00", "Z"),
+            "model_sha256": file_sha256(model_path),
+            "data_hash": data_hash,
+            "metrics": metrics or {},
+            "params": params or {},
+        }
+        _write_json_atomic(tmp_dir / MANIFEST_FILE, manifest)
+        os.replace(tmp_dir, self.versions_dir / version)
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version: str) -> None:
+        """Сделать версию активной (в т.ч. откат на предыдущую)."""
+        if not self.model_path(version).exists():
+            raise FileNotFoundError(f"Версия модели не найдена: {version}")
+        _write_json_atomic(self.root / ACTIVE_FILE, {"version": version})
+
+    def active_version(self) -> Optional[str]:
+        """Активная версия или None (реестр пуст или не создан)."""
+        try:
+            data = json.loads((self.root / ACTIVE_FILE).read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        version = data.get("version")
+        return version if version and self.model_path(version).exists() else None
+
+    def manifest(self, version: str) -> dict[str, Any]:
+        return json.loads((self.versions_dir / version / MANIFEST_FILE).read_text(encoding="utf-8"))
+
+    def versions(self) -> list[dict[str, Any]]:
+        """Манифесты всех версий, от старых к новым."""
+        if not self.versions_dir.exists():
+            return []
+        return [
+            self.manifest(path.name)
+            for path in sorted(self.versions_dir.iterdir())
+            if path.is_dir() and not path.name.startswith(".") and (path / MANIFEST_FILE).exists()
+        ]
@@ -0,0 +1,220 @@
+"""
+Потоковое (out-of-core) обучение классификатора заявок.
+
+Данные читаются порциями (CSV через pandas chunksize или таблица requests через
+keyset-выборку), векторизуются HashingVectorizer — без словаря, который пришлось бы
+строить по всему корпусу, — и подаются в SGDClassifier.partial_fit. Отложенная выборка
+определяется хешем текста, поэтому оценка тоже идёт потоком, без хранения holdout
+в памяти. Память ограничена размером порции и матрицей весов
+(n_features × число классов) и не зависит от объёма данных.
+"""
+
+import logging
+import zlib
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed, effective_n_jobs
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+
+logger = logging.getLogger(__name__)
+
+# Источник данных: функция без аргументов, возвращающая итератор порций (тексты, метки)
+ChunkSource = Callable[[], Iterator[tuple[list[str], list[str]]]]
+
+
+def csv_chunks(
+    data_path: Path,
+    text_column: str = "text",
+    label_column: str = "label",
+    chunk_size: int = 10_000,
+) -> ChunkSource:
+    """Порции (тексты, метки) из CSV; файл перечитывается при каждом проходе."""
+
+    def source() -> Iterator[tuple[list[str], list[str]]]:
+        for chunk in pd.read_csv(
+            data_path, usecols=[text_column, label_column], chunksize=chunk_size, dtype=str
+        ):
+            chunk = chunk.dropna()
+            yield chunk[text_column].tolist(), chunk[label_column].tolist()
+
+    return source
+
+
+def requests_chunks(database_url: str, chunk_size: int = 10_000, digest: Optional[Any] = None) -> ChunkSource:
+    """
+    Порции (тексты, метки) из таблицы requests: обработанные заявки с меткой, по возрастанию id.
+    Метки в таблице — предсказания модели, если их не исправляли вручную. Первый полный проход
+    фиксирует набор строк: следующие проходы не видят заявок, добавленных во время обучения.
+    digest (объект hashlib) обновляется id и метками строк первого прохода — хэш данных версии модели.
+    """
+    from sqlalchemy import select
+
+    from app.db import Request, get_engine, get_session_factory
+    from app.db.models import STATUS_DONE
+
+    max_id: Optional[int] = None
+
+    def source() -> Iterator[tuple[list[str], list[str]]]:
+        nonlocal max_id
+        first = max_id is None
+        engine = get_engine(database_url)
+        session_factory = get_session_factory(engine)
+        last_id = 0
+        try:
+            while True:
+                conditions = [Request.id > last_id, Request.label.is_not(None), Request.status == STATUS_DONE]
+                if not first:
+                    conditions.append(Request.id <= max_id)
+                session = session_factory()
+                try:
+                    rows = session.execute(
+                        select(Request.id, Request.raw_text, Request.label)
+                        .where(*conditions)
+                        .order_by(Request.id)
+                        .limit(chunk_size)
+                    ).all()
+                finally:
+                    session.close()
+                if not rows:
+                    if first:
+                        max_id = last_id
+                    return
+                last_id = rows[-1].id
+                if first and digest is not None:
+                    for row in rows:
+                        digest.update(f"{row.id}\t{row.label}\n".encode("utf-8"))
+                yield [row.raw_text for row in rows], [row.label for row in rows]
+        finally:
+            engine.dispose()
+
+    return source
+
+
+def is_holdout(text: str, test_size: float, random_state: int) -> bool:
+    """Детерминированное разбиение по хешу текста: одинаковое в каждом проходе и процессе."""
+    bucket = zlib.crc32(f"{random_state}:{text}".encode("utf-8")) % 10_000
+    return bucket < test_size * 10_000
+
+
+def classification_report_from_confusion(confusion: np.ndarray, classes: list[str]) -> str:
+    """Отчёт в формате sklearn.metrics.classification_report по матрице ошибок."""
+    support = confusion.sum(axis=1)
+    predicted = confusion.sum(axis=0)
+    correct = np.diag(confusion)
+    precision = np.divide(correct, predicted, out=np.zeros(len(classes)), where=predicted > 0)
+    recall = np.divide(correct, support, out=np.zeros(len(classes)), where=support > 0)
+    denom = precision + recall
+    f1 = np.divide(2 * precision * recall, denom, out=np.zeros(len(classes)), where=denom > 0)
+
+    width = max(len(c) for c in classes + ["weighted avg"])
+    lines = [f"{'':>{width}}  precision    recall  f1-score   support", ""]
+    for i, name in enumerate(classes):
+        lines.append(f"{name:>{width}}  {precision[i]:9.2f} {recall[i]:9.2f} {f1[i]:9.2f} {support[i]:9d}")
+    total = int(support.sum())
+    accuracy = correct.sum() / total if total else 0.0
+    lines.append("")
+    lines.append(f"{'accuracy':>{width}}  {'':9} {'':9} {accuracy:9.2f} {total:9d}")
+    weights = support / total if total else np.zeros(len(classes))
+    for name, p, r, f in (
+        ("macro avg", precision.mean(), recall.mean(), f1.mean()),
+        ("weighted avg", precision @ weights, recall @ weights, f1 @ weights),
+    ):
+        lines.append(f"{name:>{width}}  {p:9.2f} {r:9.2f} {f:9.2f} {total:9d}")
+    return "\n".join(lines)
+
+
+class StreamingTrainer:
+    """HashingVectorizer + SGDClassifier(log_loss), обучаемые порциями через partial_fit."""
+
+    def __init__(
+        self,
+        n_features: int = 2 ** 20,
+        n_jobs: int = 1,
+        epochs: int = 1,
+        test_size: float = 0.2,
+        random_state: int = 42,
+        alpha: float = 1e-5,
+    ) -> None:
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features, alternate_sign=False, ngram_range=(1, 2), norm="l2"
+        )
+        self.n_jobs = effective_n_jobs(n_jobs)
+        self.epochs = max(1, epochs)
+        self.test_size = test_size
+        self.random_state = random_state
+        self.alpha = alpha
+
+    def _transform(self, texts: list[str], parallel: Optional[Parallel]) -> sparse.csr_matrix:
+        """Векторизация порции; при n_jobs > 1 — частями в нескольких процессах."""
+        if parallel is None or len(texts) < 2 * self.n_jobs:
+            return self.vectorizer.transform(texts)
+        step = -(-len(texts) // self.n_jobs)
+        parts = parallel(
+            delayed(self.vectorizer.transform)(texts[i:i + step]) for i in range(0, len(texts), step)
+        )
+        return sparse.vstack(parts, format="csr")
+
+    def _split(self, texts: list[str], labels: list[str], holdout: bool) -> tuple[list[str], list[str]]:
+        pairs = [
+            (t, y) for t, y in zip(texts, labels)
+            if is_holdout(t, self.test_size, self.random_state) == holdout
+        ]
+        return [t for t, _ in pairs], [y for _, y in pairs]
+
+    def fit(self, source: ChunkSource) -> tuple[Pipeline, dict[str, Any]]:
+        """Обучить на порциях из source; вернуть Pipeline и метрики на отложенной выборке."""
+        # Первый проход — только множество классов (partial_fit требует его заранее)
+        classes = sorted({label for _, labels in source() for label in labels})
+        if len(classes) < 2:
+            raise ValueError("Для обучения нужно минимум два класса")
+
+        clf = SGDClassifier(
+            loss="log_loss",
+            alpha=self.alpha,
+            random_state=self.random_state,
+            n_jobs=self.n_jobs,
+        )
+        rng = np.random.default_rng(self.random_state)
+        parallel = Parallel(n_jobs=self.n_jobs) if self.n_jobs != 1 else None
+        train_rows = 0
+        with parallel if parallel is not None else nullcontext():
+            for epoch in range(self.epochs):
+                for texts, labels in source():
+                    texts, labels = self._split(texts, labels, holdout=False)
+                    if not texts:
+                        continue
+                    order = rng.permutation(len(texts))
+                    X = self._transform([texts[i] for i in order], parallel)
+                    clf.partial_fit(X, np.asarray(labels, dtype=object)[order], classes=classes)
+                    if epoch == 0:
+                        train_rows += len(texts)
+                logger.info("Эпоха %d/%d: %d обучающих строк", epoch + 1, self.epochs, train_rows)
+
+            index = {label: i for i, label in enumerate(classes)}
+            confusion = np.zeros((len(classes), len(classes)), dtype=np.int64)
+            for texts, labels in source():
+                texts, labels = self._split(texts, labels, holdout=True)
+                if not texts:
+                    continue
+                predicted = clf.predict(self._transform(texts, parallel))
+                for true, pred in zip(labels, predicted):
+                    confusion[index[true], index[pred]] += 1
+
+        test_rows = int(confusion.sum())
+        pipeline = Pipeline([("hashing", self.vectorizer), ("clf", clf)])
+        return pipeline, {
+            "accuracy": float(np.trace(confusion) / test_rows) if test_rows else 0.0,
+            "classification_report": classification_report_from_confusion(confusion, classes),
+            "confusion_matrix": confusion.tolist(),
+            "classes": classes,
+            "train_rows": train_rows,
+            "test_rows": test_rows,
+        }
+
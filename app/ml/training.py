@@ -0,0 +1,45 @@
+"""
+Обучение классификатора заявок (TfidfVectorizer + LogisticRegression) на размеченном CSV.
+
+Вынесено из model.py: pandas и sklearn.model_selection/metrics нужны только для обучения,
+а процессы, которые лишь обслуживают запросы, их не импортируют.
+"""
+
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, classification_report
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+
+
+def train_tfidf(
+    data_path: Path,
+    text_column: str = "text",
+    label_column: str = "label",
+    test_size: float = 0.2,
+    random_state: int = 42,
+) -> tuple[Pipeline, dict[str, Any]]:
+    """Обучить Pipeline на data_path; вернуть его и метрики на отложенной выборке (accuracy, report)."""
+    df = pd.read_csv(data_path)
+    X = df[text_column].astype(str)
+    y = df[label_column]
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, random_state=random_state, stratify=y
+    )
+
+    pipeline = Pipeline([
+        ("tfidf", TfidfVectorizer()),
+        ("clf", LogisticRegression(max_iter=1000)),
+    ])
+    pipeline.fit(X_train, y_train)
+
+    y_pred = pipeline.predict(X_test)
+    return pipeline, {
+        "accuracy": accuracy_score(y_test, y_pred),
+        "classification_report": classification_report(y_test, y_pred),
+    }
@@ -0,0 +1,5 @@
+"""Модуль NLP: локальное извлечение полей заявки правилами."""
+
+from .rules import NUMBER_RE, RULE_FIELDS, RuleExtractor
+
+__all__ = ["NUMBER_RE", "RULE_FIELDS", "RuleExtractor"]
@@ -0,0 +1,175 @@
+"""
+Извлечение полей заявки правилами (без LLM): сумма долга, число кредиторов, просрочка.
+
+Для каждого поля возвращается значение и уверенность 0..1. Уверенность высокая,
+когда формулировка однозначна ("долг 850 тыс. руб", "5 кредиторов", "есть просрочка"),
+и низкая при нескольких противоречащих кандидатах — такие поля лучше отдать LLM.
+"""
+
+import re
+from typing import Any, Optional
+
+# Поля, которые умеют извлекать правила (notes остаётся за LLM)
+RULE_FIELDS = ("total_debt", "creditors_count", "has_overdue")
+
+NUMBER_WORDS = {
+    "один": 1, "одного": 1, "одна": 1, "одной": 1, "одном": 1, "одним": 1,
+    "два": 2, "две": 2, "двух": 2, "двум": 2, "двумя": 2,
+    "три": 3, "трёх": 3, "трех": 3, "трём": 3, "трем": 3, "тремя": 3,
+    "четыре": 4, "четырёх": 4, "четырех": 4, "четырём": 4, "четырем": 4, "четырьмя": 4,
+    "пять": 5, "пяти": 5, "пятью": 5,
+    "шесть": 6, "шести": 6, "шестью": 6,
+    "семь": 7, "семи": 7, "семью": 7,
+    "восемь": 8, "восьми": 8, "восемью": 8, "восьмью": 8,
+    "девять": 9, "девяти": 9, "девятью": 9,
+    "десять": 10, "десяти": 10, "десятью": 10,
+}
+
+_NUMBER_WORD_RE = "|".join(sorted(NUMBER_WORDS, key=len, reverse=True))
+
+# Число: "850000", "850 000" (в т.ч. неразрывный/узкий пробел), "1,5", "1.5"
+_NUMBER = r"(?P<num>\d{1,3}(?:[   ]\d{3})+|\d+(?:[.,]\d+)?)"
+# Числа текста для сравнения заявок (дубликат с другой суммой или сроком — не дубликат)
+NUMBER_RE = re.compile(_NUMBER)
+_MULTIPLIER = (
+    r"(?P<mult>млрд\.?|миллиард\w*|млн\.?|миллион\w*|тыс\.?|тысяч\w*|т\.\s?р\.?|тр\b|к\b)"
+)
+_CURRENCY = r"(?P<cur>₽|руб\w*\.?|р\.|rub\b)"
+MONEY_RE = re.compile(
+    rf"{_NUMBER}\s*(?:{_MULTIPLIER})?\s*(?:{_CURRENCY})?",
+    re.IGNORECASE,
+)
+MULTIPLIERS = (
+    ("млрд", 1_000_000_000), ("миллиард", 1_000_000_000),
+    ("млн", 1_000_000), ("миллион", 1_000_000),
+    ("тыс", 1_000), ("т.", 1_000), ("тр", 1_000), ("к", 1_000),
+)
+
+DEBT_CONTEXT_RE = re.compile(r"долг|задолженн|должен|должна|сумм|кредит|займ|ипотек", re.IGNORECASE)
+TOTAL_CONTEXT_RE = re.compile(r"общ|всего|итого|в сумме|суммарн", re.IGNORECASE)
+# Сумма относится к одному продукту («по ипотеке 2 млн») — может быть не весь долг
+PARTIAL_CONTEXT_RE = re.compile(r"по\s+ипотек|ипотека|по\s+кредиту\b|по\s+карт", re.IGNORECASE)
+
+CREDITORS_RE = re.compile(
+    rf"(?<!\w)(?P<count>\d{{1,3}}|{_NUMBER_WORD_RE})\s+"
+    r"(?:(?:разн\w+|кредитн\w+|микрофинансов\w+)\s+)?"
+    r"(?P<kind>кредитор\w*|банк(?:а|ов|ах|ам|ами|е|и)?\b|мфо\b|микрозайм\w*|организаци\w*)",
+    re.IGNORECASE,
+)
+
+OVERDUE_NEGATIVE_RE = re.compile(
+    r"без\s+просроч|просроч\w*\s+(?:нет|не\s+было|отсутству)|нет\s+просроч|"
+    r"не\s+допуска\w*\s+просроч|плачу\s+(?:вовремя|исправно|в\s+срок)|плат[её]ж\w*\s+вовремя",
+    re.IGNORECASE,
+)
+OVERDUE_POSITIVE_RE = re.compile(
+    r"просроч|не\s+(?:могу|смогу|в\s+состоянии)\s+(?:платить|оплачивать|погашать)|"
+    r"перестал\w*\s+(?:платить|оплачивать|погашать)|(?:платить|платёж\w*|платеж\w*)\s+(?:не\s+могу|перестал\w*)|"
+    r"не\s+плачу|не\s+платил\w*|коллектор",
+    re.IGNORECASE,
+)
+
+
+def _parse_number(raw: str) -> float:
+    return float(re.sub(r"[   ]", "", raw).replace(",", "."))
+
+
+def _multiplier(raw: Optional[str]) -> int:
+    if not raw:
+        return 1
+    raw = raw.lower()
+    for prefix, factor in MULTIPLIERS:
+        if raw.startswith(prefix):
+            return factor
+    return 1
+
+
+class RuleExtractor:
+    """Детерминированный разбор суммы долга, числа кредиторов и просрочки."""
+
+    # Сколько символов вокруг суммы смотреть в поиске слов «долг», «общая» и т.п.
+    CONTEXT_WINDOW = 40
+
+    def extract(self, text: str) -> dict[str, dict[str, Any]]:
+        """
+        Извлечь поля из текста.
+        Возвращает {поле: {"value": ..., "confidence": float}} только для найденных полей.
+        """
+        result: dict[str, dict[str, Any]] = {}
+        for name in RULE_FIELDS:
+            found = getattr(self, f"_{name}")(text)
+            if found is not None:
+                result[name] = {"value": found[0], "confidence": found[1]}
+        return result
+
+    def _context(self, text: str, start: int, end: int) -> str:
+        return text[max(0, start - self.CONTEXT_WINDOW):end + self.CONTEXT_WINDOW]
+
+    def _total_debt(self, text: str) -> Optional[tuple[int, float]]:
+        candidates: list[tuple[int, float, bool]] = []
+        for m in MONEY_RE.finditer(text):
+            # Голое число без множителя и валюты ("5 кредиторов", "6 месяцев") — не сумма
+            if not m.group("mult") and not m.group("cur") and len(re.sub(r"\D", "", m.group("num"))) < 5:
+                continue
+            value = int(round(_parse_number(m.group("num")) * _multiplier(m.group("mult"))))
+            if value < 1000:
+                continue
+            context = self._context(text, m.start(), m.end())
+            confidence = 0.5
+            if m.group("mult") or m.group("cur"):
+                confidence += 0.2
+            if DEBT_CONTEXT_RE.search(context):
+                confidence += 0.2
+            is_total = bool(TOTAL_CONTEXT_RE.search(context))
+            if not is_total and PARTIAL_CONTEXT_RE.search(context):
+                confidence = min(confidence, 0.6)
+            candidates.append((value, round(confidence, 2), is_total))
+        if not candidates:
+            return None
+
+        totals = [c for c in candidates if c[2]]
+        if totals:
+            value, confidence, _ = max(totals, key=lambda c: c[1])
+            return value, confidence
+        values = {c[0] for c in candidates}
+        if len(values) == 1:
+            return candidates[0][0], max(c[1] for c in candidates)
+        # Несколько разных сумм без слова «общая»: это могут быть отдельные долги — решает LLM
+        value, confidence, _ = max(candidates, key=lambda c: c[1])
+        return value, min(confidence, 0.4)
+
+    def _creditors_count(self, text: str) -> Optional[tuple[int, float]]:
+        found: list[tuple[int, float]] = []
+        for m in CREDITORS_RE.finditer(text):
+            raw = m.group("count").lower()
+            count = int(raw) if raw.isdigit() else NUMBER_WORDS[raw]
+            if count <= 0 or count > 100:
+                continue
+            kind = m.group("kind").lower()
+            # «5 кредиторов» — прямо; «три банка» — обычно все кредиторы, но не обязательно
+            found.append((count, 0.9 if kind.startswith("кредитор") else 0.75))
+        if not found:
+            return None
+        counts = {c for c, _ in found}
+        if len(counts) == 1:
+            return found[0][0], max(conf for _, conf in found)
+        best = max(found, key=lambda c: (c[1], c[0]))
+        return best[0], 0.4
+
+    def _has_overdue(self, text: str) -> Optional[tuple[bool, float]]:
+        negative = [m.span() for m in OVERDUE_NEGATIVE_RE.finditer(text)]
+        # «просроч» внутри «без просрочек» — часть отрицания, а не отдельное упоминание
+        positive = [
+            m.span()
+            for m in OVERDUE_POSITIVE_RE.finditer(text)
+            if not any(start <= m.start() < end for start, end in negative)
+        ]
+        if not negative and not positive:
+            return None
+        if not positive:
+            return False, 0.85
+        if not negative:
+            return True, 0.85
+        # «Раньше платил без просрочек, сейчас просрочка 3 месяца»: обычно важнее последнее
+        # упоминание, но уверенность ниже порога — поле уточнит LLM
+        return positive[-1][0] > negative[-1][0], 0.5
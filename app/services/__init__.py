@@ -1,5 +1,9 @@
 """Сервисный слой: оркестрация ML, LLM и БД."""
 
 from .analyzer import RequestAnalyzerService
+from .dedup import DuplicateIndex
+from .jobs import JobWorkerPool
+from .routing import RoutingPolicy
+from .singleflight import SingleFlight
 
-__all__ = ["RequestAnalyzerService"]
+__all__ = ["RequestAnalyzerService", "DuplicateIndex", "JobWorkerPool", "RoutingPolicy", "SingleFlight"]
@@ -1,10 +1,26 @@
 """Сервис обработки заявки: ML-классификация + LLM резюме/поля + сохранение в БД."""
 
-from typing import Any, Optional
+import contextvars
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Iterator, Optional
 
-from app.db import Request, get_session_factory
+from app.db import Request, WriteBehindWriter, get_session_factory
 from app.ml import MLModel
-from app.llm import LLMClient
+from app.llm import LLMClientBase, SUMMARY_FALLBACK
+from app.metrics import ANALYZE_STAGE_SECONDS, ANALYZE_TIER, ANALYZE_TIER_SECONDS, stage_timer, timed
+from app.nlp import RULE_FIELDS, RuleExtractor
+
+from .dedup import DEDUP_ACTIONS, DuplicateIndex
+from .routing import LLM_TIERS, RoutingPolicy, template_summary
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+LLM_MODES = ("sequential", "parallel", "single")
 
 
 class RequestAnalyzerService:
@@ -13,17 +29,86 @@ class RequestAnalyzerService:
     def __init__(
         self,
         ml_model: MLModel,
-        llm_client: LLMClient,
+        llm_client: Optional[LLMClientBase],
         session_factory,
+        llm_mode: str = "parallel",
+        llm_timeout: Optional[float] = None,
+        llm_max_workers: int = 8,
+        batch_concurrency: int = 4,
+        writer: Optional[WriteBehindWriter] = None,
+        rule_extractor: Optional[RuleExtractor] = None,
+        rules_min_confidence: float = 0.8,
+        dedup_index: Optional[DuplicateIndex] = None,
+        dedup_action: str = "flag",
+        single_flight: Optional[SingleFlight] = None,
+        routing: Optional[RoutingPolicy] = None,
+        light_llm_client: Optional[LLMClientBase] = None,
     ) -> None:
+        if llm_mode not in LLM_MODES:
+            raise ValueError(f"Неизвестный режим LLM: {llm_mode}. Допустимые: {', '.join(LLM_MODES)}")
+        if dedup_action not in DEDUP_ACTIONS:
+            raise ValueError(f"Неизвестное действие для дубликатов: {dedup_action}. Допустимые: {', '.join(DEDUP_ACTIONS)}")
         self.ml_model = ml_model
+        # None — режим classify: только ML-классификация, резюме и поля не формируются
         self.llm_client = llm_client
         self.session_factory = session_factory
+        # При заданном writer одиночные записи идут через буфер с групповым коммитом
+        self.writer = writer
+        self.llm_mode = llm_mode
+        self.llm_timeout = llm_timeout or None
+        # Правила извлекают поля локально; LLM спрашивается только о неуверенных полях
+        self.rule_extractor = rule_extractor
+        self.rules_min_confidence = rules_min_confidence
+        # Почти-дубликаты сохранённых заявок: reuse — взять резюме и поля оригинала без LLM,
+        # flag — обработать как обычно и только пометить duplicate_of
+        self.dedup_index = dedup_index
+        self.dedup_action = dedup_action
+        # Одновременные analyze() с одинаковым текстом ждут одну обработку и получают её результат
+        self.single_flight = single_flight
+        # Уровень обработки заявки по классу, уверенности и длине: full, light (light_llm_client —
+        # дешёвая модель с кратким резюме), template или skip (без LLM); без routing — всегда full
+        self.routing = routing
+        self.light_llm_client = light_llm_client
+        self.llm_max_workers = llm_max_workers
+        self.batch_concurrency = batch_concurrency
+        self._create_executors()
+
+    def _create_executors(self) -> None:
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if self.llm_mode != "sequential":
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.llm_max_workers, thread_name_prefix="llm"
+            )
+        # Отдельный пул для пакетной обработки: элементы пакета сами ждут self._executor
+        self._batch_executor = ThreadPoolExecutor(
+            max_workers=self.batch_concurrency, thread_name_prefix="llm-batch"
+        )
+
+    def after_fork(self) -> None:
+        """
+        Подготовить сервис, созданный в мастере gunicorn (--preload), к работе в воркере:
+        соединения пула БД, HTTP-клиент и кэш LLM, пулы потоков мастера в воркере не используются.
+        """
+        engine = self.session_factory.kw.get("bind")
+        if engine is not None:
+            # close=False: соединения родителя не закрываются из потомка, а просто забываются
+            engine.dispose(close=False)
+        for client in (self.llm_client, self.light_llm_client):
+            if client is not None:
+                client.after_fork()
+        self._create_executors()
+
+    @property
+    def classify_only(self) -> bool:
+        """Сервис без LLM-клиента (APP_MODE=classify)."""
+        return self.llm_client is None
 
     def analyze(self, text: str, save: bool = True) -> dict[str, Any]:
         """
         Обработать текст заявки.
-        Возвращает label, confidence, summary, fields; при save=True сохраняет в БД.
+        Возвращает label, confidence, summary, fields (в режиме classify — только id, label,
+        confidence, model_version); при save=True сохраняет в БД. Одновременные вызовы
+        с тем же текстом (повтор запроса, двойной клик) получают один результат и одну запись.
         """
         text = (text or "").strip()
         if not text:
@@ -34,32 +119,522 @@ class RequestAnalyzerService:
                 "summary": None,
                 "fields": None,
             }
+        if self.single_flight is None:
+            return self._analyze(text, save)
+        key = SingleFlight.key(text, save, self.classify_only)
+        return self.single_flight.do(key, lambda: self._analyze(text, save))
+
+    def _analyze(self, text: str, save: bool) -> dict[str, Any]:
+        with stage_timer("ml"):
+            ml_result = self.ml_model.predict(text)
+        if self.classify_only:
+            return self._classified(text, ml_result, save)
+        vector, duplicate = self._find_duplicate(text)
+        summary, fields, sources = self._llm_or_reuse(text, duplicate, ml_result)
+        duplicate_of = duplicate["id"] if duplicate else None
+
+        record_id = None
+        if save:
+            record_id = self._save(text, ml_result, summary, fields, duplicate_of)
+            self._index(record_id, vector, summary, duplicate_of)
+        return self._result(record_id, ml_result, summary, fields, sources, duplicate_of)
+
+    @staticmethod
+    def _result(
+        record_id: Optional[int],
+        ml_result: dict[str, Any],
+        summary: Optional[str],
+        fields: Optional[dict[str, Any]],
+        sources: dict[str, str],
+        duplicate_of: Optional[int],
+    ) -> dict[str, Any]:
+        """Результат analyze (он же событие "done" потока)."""
+        return {
+            "id": record_id,
+            "label": ml_result["label"],
+            "confidence": ml_result["confidence"],
+            "model_version": ml_result.get("model_version"),
+            "summary": summary,
+            "fields": fields,
+            "field_sources": sources,
+            "duplicate_of": duplicate_of,
+        }
+
+    def analyze_stream(self, text: str, save: bool = True) -> Iterator[tuple[str, dict[str, Any]]]:
+        """
+        Обработать заявку с выдачей результата по частям — пары (событие, данные):
+        "label" сразу после ML, "summary" — фрагменты резюме по мере генерации,
+        "fields" — извлечённые поля, "done" — итог с id сохранённой записи.
+        При пустом тексте — единственное событие "error". Одновременные вызовы с тем же текстом
+        (в том числе с analyze) выполняются один раз: ожидающий получает те же события и тот же id.
+        """
+        text = (text or "").strip()
+        if not text:
+            yield "error", {"error": "Текст заявки не может быть пустым"}
+            return
+        if self.single_flight is None:
+            yield from self._analyze_stream(text, save)
+            return
+        key = SingleFlight.key(text, save, self.classify_only)
+        yield from self.single_flight.stream(key, lambda: self._analyze_stream(text, save), self._replay)
+
+    def _replay(self, result: dict[str, Any]) -> Iterator[tuple[str, dict[str, Any]]]:
+        """События потока из готового результата analyze (для ожидающих single-flight)."""
+        yield "label", {"label": result["label"], "confidence": result["confidence"]}
+        if not self.classify_only:
+            if result["summary"]:
+                yield "summary", {"delta": result["summary"]}
+            yield "fields", {"fields": result["fields"], "field_sources": result["field_sources"]}
+        yield "done", result
+
+    def _analyze_stream(self, text: str, save: bool) -> Iterator[tuple[str, dict[str, Any]]]:
+        with stage_timer("ml"):
+            ml_result = self.ml_model.predict(text)
+        yield "label", {"label": ml_result["label"], "confidence": ml_result["confidence"]}
+        if self.classify_only:
+            yield "done", self._classified(text, ml_result, save)
+            return
+
+        vector, duplicate = self._find_duplicate(text)
+        duplicate_of = duplicate["id"] if duplicate else None
+        reuse = bool(duplicate) and self.dedup_action == "reuse"
+        tier = None if reuse else self._route(text, ml_result)
+        if tier not in LLM_TIERS or self.llm_mode == "single":
+            # Резюме не генерируется по частям: ответ оригинала-дубликата, уровень без LLM
+            # или режим single — резюме и поля приходят одним структурированным ответом
+            summary, fields, sources = self._reuse(text, duplicate) if reuse else self._run_tier(text, ml_result, tier)
+            if summary:
+                yield "summary", {"delta": summary}
+            yield "fields", {"fields": fields, "field_sources": sources}
+            record_id = None
+            if save:
+                record_id = self._save(text, ml_result, summary, fields, duplicate_of)
+                self._index(record_id, vector, summary, duplicate_of)
+            yield "done", self._result(record_id, ml_result, summary, fields, sources, duplicate_of)
+            return
+
+        # parallel — поля извлекаются одновременно с генерацией резюме, sequential — после неё
+        client = self._tier_client(tier)
+        tier_start = time.perf_counter()
+        with stage_timer("rules"):
+            rule_fields = self._rule_fields(text)
+        fields_future: Optional[Future] = None
+        if self.llm_mode == "parallel":
+            fields_future = self._submit("llm_fields", self._extract_fields, text, rule_fields, client)
 
-        ml_result = self.ml_model.predict(text)
-        summary = self.llm_client.summarize_request(text)
-        fields = self.llm_client.extract_fields(text)
+        parts: list[str] = []
+        start = time.perf_counter()
+        # Резюме и поля генерируются параллельно — общий дедлайн, как в _run_llm
+        deadline = time.monotonic() + self.llm_timeout if self.llm_timeout else None
+        try:
+            for delta in self._iter_until(client.summarize_request_stream(text), deadline):
+                parts.append(delta)
+                yield "summary", {"delta": delta}
+            summary = "".join(parts).strip()
+        except Exception as e:
+            logger.warning("LLM call summarize_request_stream failed: %s", e)
+            # Уже отправленная часть резюме заменяется запасным текстом — неполное резюме не сохраняется
+            summary = SUMMARY_FALLBACK
+            yield "summary", {"replace": summary}
+        ANALYZE_STAGE_SECONDS.labels(stage="llm_summary").observe(time.perf_counter() - start)
 
-        record_id: Optional[int] = None
+        if fields_future is not None:
+            llm_fields = self._wait(fields_future, "extract_fields", {"raw_response": None}, deadline)
+        else:
+            with stage_timer("llm_fields"):
+                llm_fields = self._extract_fields(text, rule_fields, client)
+        fields, sources = self._merge_fields(llm_fields, rule_fields)
+        ANALYZE_TIER_SECONDS.labels(tier=tier).observe(time.perf_counter() - tier_start)
+        yield "fields", {"fields": fields, "field_sources": sources}
+
+        record_id = None
         if save:
+            record_id = self._save(text, ml_result, summary, fields, duplicate_of)
+            self._index(record_id, vector, summary, duplicate_of)
+        yield "done", self._result(record_id, ml_result, summary, fields, sources, duplicate_of)
+
+    def _classified(self, text: str, ml_result: dict[str, Any], save: bool) -> dict[str, Any]:
+        """Результат режима classify: заявка сохраняется без резюме и полей."""
+        return {
+            "id": self._save(text, ml_result, None, None) if save else None,
+            "label": ml_result["label"],
+            "confidence": ml_result["confidence"],
+            "model_version": ml_result.get("model_version"),
+        }
+
+    def _save(
+        self,
+        text: str,
+        ml_result: dict[str, Any],
+        summary: Optional[str],
+        fields: Optional[dict[str, Any]],
+        duplicate_of: Optional[int] = None,
+    ) -> int:
+        """Сохранить обработанную заявку; вернуть id записи."""
+        values = {
+            "raw_text": text,
+            "label": ml_result["label"],
+            "confidence": ml_result["confidence"],
+            "model_version": ml_result.get("model_version"),
+            "summary": summary,
+            "extracted": fields,
+            "duplicate_of": duplicate_of,
+            **Request.typed_columns(fields),
+        }
+        with stage_timer("db"):
+            if self.writer is not None:
+                return self.writer.submit(**values).result()
             session = self.session_factory()
             try:
-                req = Request(
-                    raw_text=text,
-                    label=ml_result["label"],
-                    summary=summary,
-                    extracted=fields,
-                )
+                req = Request(**values)
                 session.add(req)
+                # id известен после INSERT (lastrowid) и не сбрасывается при коммите
+                # (expire_on_commit=False) — повторный SELECT через refresh не нужен
                 session.commit()
-                session.refresh(req)
-                record_id = req.id
+                return req.id
             finally:
                 session.close()
 
+    def analyze_many(
+        self,
+        texts: list[str],
+        save: bool = True,
+        with_ml: bool = True,
+        with_llm: bool = True,
+    ) -> list[dict[str, Any]]:
+        """
+        Обработать пакет заявок: одна векторизованная ML-классификация,
+        вызовы LLM с ограниченной параллельностью, сохранение одной транзакцией.
+        with_ml=False — без классификации (label None), with_llm=False — только классификация:
+        без LLM и правил, резюме и поля None, как у analyze в режиме classify. В режиме classify
+        LLM не вызывается и результат элемента — id, label, confidence, model_version.
+        Возвращает результаты в порядке texts; для ошибочных элементов — {"index", "error"}.
+        """
+        results: list[dict[str, Any]] = [{"index": i} for i in range(len(texts))]
+        valid: list[tuple[int, str]] = []
+        for i, text in enumerate(texts):
+            text = (text or "").strip() if isinstance(text, str) else ""
+            if text:
+                valid.append((i, text))
+            else:
+                results[i]["error"] = "Текст заявки не может быть пустым"
+        if not valid:
+            return results
+        if self.classify_only:
+            with_ml, with_llm = True, False
+
+        if with_ml:
+            with stage_timer("ml_batch"):
+                ml_results = self.ml_model.predict_many([text for _, text in valid])
+        else:
+            ml_results = [{"label": None, "confidence": None, "model_version": None}] * len(valid)
+        if with_llm:
+            duplicates = [self._find_duplicate(text) for _, text in valid]
+            futures = [
+                self._batch_executor.submit(self._llm_or_reuse, text, duplicate, ml_result)
+                for (_, text), (_, duplicate), ml_result in zip(valid, duplicates, ml_results)
+            ]
+        else:
+            duplicates = [(None, None)] * len(valid)
+            futures = [None] * len(valid)
+
+        done: list[dict[str, Any]] = []
+        for (i, text), ml_result, (vector, duplicate), future in zip(valid, ml_results, duplicates, futures):
+            summary, fields, sources = None, None, {}
+            try:
+                if future is not None:
+                    summary, fields, sources = future.result()
+            except Exception as e:
+                logger.exception("Batch item %d failed: %s", i, e)
+                results[i]["error"] = "Ошибка обработки заявки"
+                continue
+            done.append({
+                "index": i,
+                "text": text,
+                "ml_result": ml_result,
+                "summary": summary,
+                "fields": fields,
+                "sources": sources,
+                "vector": vector,
+                "duplicate_of": duplicate["id"] if duplicate else None,
+            })
+
+        record_ids: list[Optional[int]] = [None] * len(done)
+        if save and done:
+            with stage_timer("db_batch"):
+                session = self.session_factory()
+                try:
+                    rows = [
+                        Request(
+                            raw_text=item["text"],
+                            label=item["ml_result"]["label"],
+                            confidence=item["ml_result"]["confidence"],
+                            model_version=item["ml_result"].get("model_version"),
+                            summary=item["summary"],
+                            extracted=item["fields"],
+                            duplicate_of=item["duplicate_of"],
+                            **Request.typed_columns(item["fields"]),
+                        )
+                        for item in done
+                    ]
+                    session.add_all(rows)
+                    session.commit()
+                    record_ids = [row.id for row in rows]
+                finally:
+                    session.close()
+            for item, record_id in zip(done, record_ids):
+                self._index(record_id, item["vector"], item["summary"], item["duplicate_of"])
+
+        for item, record_id in zip(done, record_ids):
+            if self.classify_only:
+                results[item["index"]].update({
+                    "id": record_id,
+                    "label": item["ml_result"]["label"],
+                    "confidence": item["ml_result"]["confidence"],
+                    "model_version": item["ml_result"].get("model_version"),
+                })
+                continue
+            results[item["index"]].update({
+                "id": record_id,
+                "label": item["ml_result"]["label"],
+                "confidence": item["ml_result"]["confidence"],
+                "summary": item["summary"],
+                "fields": item["fields"],
+                "field_sources": item["sources"],
+                "duplicate_of": item["duplicate_of"],
+            })
+        return results
+
+    def _find_duplicate(self, text: str) -> tuple[Any, Optional[dict[str, Any]]]:
+        """Вектор текста и почти-дубликат среди сохранённых заявок (или None)."""
+        if self.dedup_index is None:
+            return None, None
+        with stage_timer("dedup"):
+            vector = self.dedup_index.vectorize(text)
+            duplicate = self.dedup_index.find(text, vector)
+        if duplicate and self._fields_conflict(text, duplicate):
+            duplicate = None
+        return vector, duplicate
+
+    def _fields_conflict(self, text: str, duplicate: dict[str, Any]) -> bool:
+        """Правила нашли в новом тексте значение поля, отличное от сохранённого у оригинала."""
+        original = duplicate["extracted"] if isinstance(duplicate["extracted"], dict) else {}
+        return any(
+            original.get(name) is not None and original.get(name) != value
+            for name, value in self._rule_fields(text).items()
+        )
+
+    def _llm_or_reuse(
+        self,
+        text: str,
+        duplicate: Optional[dict[str, Any]],
+        ml_result: dict[str, Any],
+    ) -> tuple[Optional[str], dict[str, Any], dict[str, str]]:
+        """Результат оригинала для дубликата (в режиме reuse) или обработка на уровне маршрутизации."""
+        if duplicate and self.dedup_action == "reuse":
+            return self._reuse(text, duplicate)
+        return self._run_tier(text, ml_result, self._route(text, ml_result))
+
+    def _route(self, text: str, ml_result: dict[str, Any]) -> str:
+        """Уровень обработки заявки (full без политики маршрутизации)."""
+        tier = "full"
+        if self.routing is not None:
+            tier = self.routing.route(ml_result["label"], ml_result["confidence"], text)
+        ANALYZE_TIER.labels(tier=tier).inc()
+        return tier
+
+    def _tier_client(self, tier: str) -> LLMClientBase:
+        if tier == "light" and self.light_llm_client is not None:
+            return self.light_llm_client
+        return self.llm_client
+
+    def _run_tier(
+        self,
+        text: str,
+        ml_result: dict[str, Any],
+        tier: str,
+    ) -> tuple[Optional[str], dict[str, Any], dict[str, str]]:
+        """Резюме и поля на уровне tier: LLM (full, light), шаблон по полям правил или без резюме."""
+        start = time.perf_counter()
+        try:
+            if tier in LLM_TIERS:
+                return self._run_llm(text, self._tier_client(tier))
+            summary, fields, sources = self._rules_only(text)
+            if tier == "template":
+                summary = template_summary(ml_result["label"], fields)
+            return summary, fields, sources
+        finally:
+            ANALYZE_TIER_SECONDS.labels(tier=tier).observe(time.perf_counter() - start)
+
+    def _rules_only(self, text: str) -> tuple[Optional[str], dict[str, Any], dict[str, str]]:
+        """Без LLM: резюме нет, поля — найденные правилами."""
+        rule_fields = self._rule_fields(text)
+        fields = {name: rule_fields.get(name) for name in RULE_FIELDS}
+        return None, fields, {name: "rules" for name in rule_fields}
+
+    def _reuse(self, text: str, duplicate: dict[str, Any]) -> tuple[str, dict[str, Any], dict[str, str]]:
+        """Резюме и поля оригинала; поля, найденные правилами в новом тексте, — поверх них."""
+        fields = dict(duplicate["extracted"]) if isinstance(duplicate["extracted"], dict) else {}
+        sources = {name: "duplicate" for name in RULE_FIELDS}
+        _, rule_fields, rule_sources = self._rules_only(text)
+        fields.update((name, rule_fields[name]) for name in rule_sources)
+        sources.update(rule_sources)
+        return duplicate["summary"], fields, sources
+
+    def _index(self, record_id: int, vector: Any, summary: str, duplicate_of: Optional[int]) -> None:
+        """Добавить сохранённую заявку в индекс дубликатов (только оригиналы с резюме)."""
+        if self.dedup_index is None or vector is None or duplicate_of is not None:
+            return
+        if summary and summary != SUMMARY_FALLBACK:
+            self.dedup_index.add(record_id, vector)
+
+    def _run_llm(
+        self,
+        text: str,
+        client: Optional[LLMClientBase] = None,
+    ) -> tuple[str, dict[str, Any], dict[str, str]]:
+        """
+        Резюме и поля согласно llm_mode (client — клиент уровня обработки, по умолчанию основной).
+        При сбое/таймауте вызова — частичный результат.
+        Возвращает (summary, fields, field_sources), где источник поля — "rules" или "llm".
+        """
+        with stage_timer("rules"):
+            rule_fields = self._rule_fields(text)
+        client = client or self.llm_client
+
+        if self.llm_mode == "sequential":
+            with stage_timer("llm_summary"):
+                summary = client.summarize_request(text)
+            with stage_timer("llm_fields"):
+                llm_fields = self._extract_fields(text, rule_fields, client)
+            return (summary, *self._merge_fields(llm_fields, rule_fields))
+
+        if self.llm_mode == "single":
+            if len(rule_fields) == len(RULE_FIELDS):
+                # Все поля известны из правил — достаточно запроса резюме
+                summary = self._wait(
+                    self._submit("llm_summary", client.summarize_request, text),
+                    "summarize_request",
+                    SUMMARY_FALLBACK,
+                )
+                return (summary, *self._merge_fields({"notes": None}, rule_fields))
+            combined = self._submit("llm_combined", client.analyze_request, text)
+            summary, llm_fields = self._wait(
+                combined, "analyze_request", (SUMMARY_FALLBACK, {"raw_response": None})
+            )
+            return (summary, *self._merge_fields(llm_fields, rule_fields))
+
+        deadline = time.monotonic() + self.llm_timeout if self.llm_timeout else None
+        summary_future = self._submit("llm_summary", client.summarize_request, text)
+        fields_future = self._submit("llm_fields", self._extract_fields, text, rule_fields, client)
+        # Вызовы идут параллельно, поэтому общий дедлайн равен таймауту одного вызова
+        summary = self._wait(summary_future, "summarize_request", SUMMARY_FALLBACK, deadline)
+        llm_fields = self._wait(fields_future, "extract_fields", {"raw_response": None}, deadline)
+        return (summary, *self._merge_fields(llm_fields, rule_fields))
+
+    def _submit(self, stage: str, fn, *args: Any) -> Future:
+        """Вызов в пуле LLM с замером этапа; контекст запроса (сбор Server-Timing) передаётся в поток."""
+        return self._executor.submit(contextvars.copy_context().run, timed(stage, fn), *args)
+
+    def _rule_fields(self, text: str) -> dict[str, Any]:
+        """Поля, которые правила нашли с уверенностью не ниже rules_min_confidence."""
+        if self.rule_extractor is None:
+            return {}
         return {
-            "id": record_id,
-            "label": ml_result["label"],
-            "confidence": ml_result["confidence"],
-            "summary": summary,
-            "fields": fields,
+            name: found["value"]
+            for name, found in self.rule_extractor.extract(text).items()
+            if found["confidence"] >= self.rules_min_confidence
         }
+
+    def _extract_fields(
+        self,
+        text: str,
+        rule_fields: dict[str, Any],
+        client: Optional[LLMClientBase] = None,
+    ) -> dict[str, Any]:
+        """Поля от LLM — только те, что не извлечены правилами; если извлечены все, LLM не вызывается."""
+        missing = [name for name in RULE_FIELDS if name not in rule_fields]
+        if not missing:
+            return {"notes": None}
+        client = client or self.llm_client
+        if len(missing) == len(RULE_FIELDS):
+            return client.extract_fields(text)
+        return client.extract_fields(text, keys=missing)
+
+    @staticmethod
+    def _merge_fields(
+        llm_fields: dict[str, Any],
+        rule_fields: dict[str, Any],
+    ) -> tuple[dict[str, Any], dict[str, str]]:
+        """Поля правил поверх ответа LLM и источник каждого поля."""
+        fields = {**llm_fields, **rule_fields}
+        sources = {name: "rules" if name in rule_fields else "llm" for name in RULE_FIELDS}
+        return fields, sources
+
+    def _iter_until(self, chunks: Iterator[str], deadline: Optional[float]) -> Iterator[str]:
+        """
+        Фрагменты потока LLM до дедлайна, иначе TimeoutError. Поток читается в пуле LLM, и ожидание
+        очередного фрагмента ограничено оставшимся временем; без пула (sequential) дедлайн
+        проверяется между фрагментами.
+        """
+        if deadline is None:
+            yield from chunks
+            return
+        if self._executor is None:
+            for delta in chunks:
+                if time.monotonic() > deadline:
+                    chunks.close()
+                    raise TimeoutError(f"LLM stream timed out after {self.llm_timeout}s")
+                yield delta
+            return
+
+        items: queue.Queue = queue.Queue()
+        stop = threading.Event()
+        end = object()
+
+        def pump() -> None:
+            try:
+                for delta in chunks:
+                    if stop.is_set():
+                        break
+                    items.put(delta)
+            except Exception as e:
+                items.put(e)
+            finally:
+                # Читатель ушёл по дедлайну — закрыть поток и соединение с API
+                chunks.close()
+                items.put(end)
+
+        self._executor.submit(contextvars.copy_context().run, pump)
+        try:
+            while True:
+                try:
+                    item = items.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    raise TimeoutError(f"LLM stream timed out after {self.llm_timeout}s") from None
+                if item is end:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+    def _wait(
+        self,
+        future: Future,
+        name: str,
+        fallback: Any,
+        deadline: Optional[float] = None,
+    ) -> Any:
+        """Дождаться результата вызова LLM; при таймауте или ошибке вернуть fallback."""
+        timeout = self.llm_timeout
+        if deadline is not None:
+            timeout = max(0.0, deadline - time.monotonic())
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            logger.warning("LLM call %s timed out after %ss", name, self.llm_timeout)
+        except Exception as e:
+            logger.exception("LLM call %s failed: %s", name, e)
+        return fallback
@@ -0,0 +1,212 @@
+"""
+Поиск почти-дубликатов заявок по TF-IDF векторам ML-модели.
+
+Индекс в памяти хранит разреженные векторы последних сохранённых заявок и обратный
+индекс «признак -> id заявок». Кандидаты отбираются по нескольким самым весомым
+признакам нового текста, для них считается точный косинус; совпадение выше порога
+дополнительно проверяется по пересечению слов исходных текстов (словарь модели
+небольшой, и похожие по нему векторы ещё не значат одинаковый текст) и по числам:
+повтор заявки с новой суммой долга или сроком просрочки — не дубликат.
+
+При старте индекс заполняется из таблицы requests, затем догружает новые строки
+(id больше последнего известного) — в том числе сохранённые другими воркерами.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+import numpy as np
+from sqlalchemy import select
+
+from app.db import Request
+from app.db.models import STATUS_DONE
+from app.llm import SUMMARY_FALLBACK
+from app.ml import MLModel
+from app.nlp import NUMBER_RE
+
+logger = logging.getLogger(__name__)
+
+DEDUP_ACTIONS = ("reuse", "flag")
+
+# Минимальная доля общих слов (Жаккар) у текстов, признанных дубликатами по косинусу
+VERIFY_MIN_JACCARD = 0.5
+
+_WORD_RE = re.compile(r"\w\w+")
+
+
+def _words(text: str) -> set[str]:
+    return set(_WORD_RE.findall(text.lower()))
+
+
+def _numbers(text: str) -> set[str]:
+    return {re.sub(r"\s", "", m.group()) for m in NUMBER_RE.finditer(text)}
+
+
+class DuplicateIndex:
+    """Индекс ближайших соседей по косинусу разреженных TF-IDF векторов."""
+
+    def __init__(
+        self,
+        ml_model: MLModel,
+        session_factory,
+        threshold: float = 0.9,
+        max_size: int = 10_000,
+        min_features: int = 5,
+        prefilter_terms: int = 8,
+        sync_interval: float = 5.0,
+    ) -> None:
+        self.ml_model = ml_model
+        self.session_factory = session_factory
+        self.threshold = threshold
+        self.max_size = max_size
+        # Короткие тексты (мало признаков из словаря) слишком легко «совпадают» — не индексируются
+        self.min_features = min_features
+        self.prefilter_terms = prefilter_terms
+        self.sync_interval = sync_interval
+        self._entries: OrderedDict[int, tuple[np.ndarray, np.ndarray]] = OrderedDict()
+        self._postings: dict[int, list[int]] = {}
+        self._space: Any = None      # модель, в пространстве признаков которой построен индекс
+        self._last_id = 0
+        self._last_sync = 0.0
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def rebuild(self) -> None:
+        """Заполнить индекс последними max_size подходящими заявками из БД."""
+        space = self.ml_model.loaded_model
+        with self._lock:
+            self._entries.clear()
+            self._postings.clear()
+            self._space = space
+            self._last_id = 0
+        rows = self._load_rows(newest=True)
+        for row in reversed(rows):
+            self._add_text(row.id, row.raw_text, space)
+        with self._lock:
+            self._last_id = max(self._last_id, rows[0].id if rows else 0)
+            self._last_sync = time.monotonic()
+        logger.info("Индекс дубликатов: %d заявок", len(self._entries))
+
+    def sync(self) -> None:
+        """Догрузить заявки, сохранённые после последней синхронизации (id > последнего)."""
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            space = self.ml_model.loaded_model
+            if space is not self._space:
+                # Сменилась модель (горячая перезагрузка) — старые векторы несовместимы
+                self.rebuild()
+                return
+            rows = self._load_rows(newest=False)
+            for row in rows:
+                self._add_text(row.id, row.raw_text, space)
+            with self._lock:
+                if rows:
+                    self._last_id = max(self._last_id, rows[-1].id)
+                self._last_sync = time.monotonic()
+        finally:
+            self._sync_lock.release()
+
+    def _load_rows(self, newest: bool) -> list:
+        """Заявки, пригодные как оригиналы: обработаны, с резюме, не дубликаты."""
+        query = select(Request.id, Request.raw_text).where(
+            Request.status == STATUS_DONE,
+            Request.duplicate_of.is_(None),
+            Request.summary.is_not(None),
+            Request.summary != SUMMARY_FALLBACK,
+        )
+        if newest:
+            query = query.order_by(Request.id.desc())
+        else:
+            query = query.where(Request.id > self._last_id).order_by(Request.id)
+        session = self.session_factory()
+        try:
+            return session.execute(query.limit(self.max_size)).all()
+        finally:
+            session.close()
+
+    def vectorize(self, text: str) -> tuple[np.ndarray, np.ndarray, Any]:
+        return self.ml_model.vectorize(text)
+
+    def _add_text(self, record_id: int, text: str, space: Any) -> None:
+        idx, values, text_space = self.ml_model.vectorize(text)
+        if text_space is space:
+            self.add(record_id, (idx, values, text_space))
+
+    def add(self, record_id: int, vector: tuple[np.ndarray, np.ndarray, Any]) -> None:
+        """Добавить сохранённую заявку (вектор из vectorize); старые вытесняются по max_size."""
+        idx, values, space = vector
+        if len(idx) < self.min_features:
+            return
+        with self._lock:
+            if space is not self._space or record_id in self._entries:
+                return
+            self._entries[record_id] = (idx, values)
+            for feature in idx.tolist():
+                self._postings.setdefault(feature, []).append(record_id)
+            while len(self._entries) > self.max_size:
+                old_id, (old_idx, _) = self._entries.popitem(last=False)
+                for feature in old_idx.tolist():
+                    posting = self._postings.get(feature)
+                    if posting:
+                        try:
+                            posting.remove(old_id)
+                        except ValueError:
+                            pass
+                        if not posting:
+                            del self._postings[feature]
+
+    def find(self, text: str, vector: tuple[np.ndarray, np.ndarray, Any]) -> Optional[dict[str, Any]]:
+        """
+        Ближайшая сохранённая заявка с косинусом не ниже threshold (с похожим текстом и теми же числами):
+        {"id", "similarity", "summary", "extracted"} или None. vector — результат vectorize(text).
+        """
+        idx, values, space = vector
+        if time.monotonic() - self._last_sync > self.sync_interval or space is not self._space:
+            self.sync()
+        if len(idx) < self.min_features:
+            return None
+
+        best_id, best_score = None, 0.0
+        with self._lock:
+            if space is not self._space:
+                return None
+            # Префильтр: кандидаты — заявки, у которых есть хотя бы один из самых весомых признаков
+            top = idx[np.argsort(values)[::-1][:self.prefilter_terms]]
+            candidates: set[int] = set()
+            for feature in top.tolist():
+                candidates.update(self._postings.get(feature, ()))
+            for record_id in candidates:
+                c_idx, c_values = self._entries[record_id]
+                _, qi, ci = np.intersect1d(idx, c_idx, assume_unique=True, return_indices=True)
+                score = float(values[qi] @ c_values[ci])
+                if score > best_score:
+                    best_id, best_score = record_id, score
+        if best_id is None or best_score < self.threshold:
+            return None
+
+        session = self.session_factory()
+        try:
+            row = session.get(Request, best_id)
+        finally:
+            session.close()
+        if row is None or not row.summary:
+            return None
+        a, b = _words(text), _words(row.raw_text)
+        if not a or len(a & b) / len(a | b) < VERIFY_MIN_JACCARD:
+            return None
+        if _numbers(text) != _numbers(row.raw_text):
+            return None
+        return {
+            "id": row.id,
+            "similarity": round(best_score, 4),
+            "summary": row.summary,
+            "extracted": row.extracted,
+        }
@@ -0,0 +1,181 @@
+"""
+Асинхронная обработка заявок: очередь задач в таблице requests и пул фоновых потоков.
+
+POST /api/jobs сохраняет строку со status=pending и сразу возвращает id; воркеры
+забирают задачи из БД, выполняют RequestAnalyzerService и записывают результат.
+Внешний брокер не нужен: после перезапуска pending-задачи и задачи с истёкшей
+арендой (воркер упал посреди обработки) подбираются снова.
+"""
+
+import logging
+import os
+import threading
+from datetime import timedelta
+from typing import Any, Optional
+
+from sqlalchemy import or_, select, update
+
+from app.db import Request
+from app.db.models import STATUS_DONE, STATUS_FAILED, STATUS_PENDING, STATUS_RUNNING, utcnow
+
+from .analyzer import RequestAnalyzerService
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorkerPool:
+    """Пул потоков, обрабатывающих задачи из таблицы requests."""
+
+    def __init__(
+        self,
+        analyzer: RequestAnalyzerService,
+        session_factory,
+        workers: int = 2,
+        poll_interval: float = 1.0,
+        lease_seconds: float = 300.0,
+    ) -> None:
+        self.analyzer = analyzer
+        self.session_factory = session_factory
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self) -> None:
+        """Запустить потоки в текущем процессе (повторно — после fork воркера gunicorn)."""
+        if self.workers <= 0 or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+            self._pid = os.getpid()
+            logger.info("Job worker pool started: %d thread(s), pid %d", self.workers, self._pid)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Остановить потоки (текущая задача дорабатывается)."""
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._pid = None
+
+    def submit(self, text: str) -> int:
+        """Поставить заявку в очередь; вернуть id задачи (= id строки requests)."""
+        session = self.session_factory()
+        try:
+            req = Request(raw_text=text, status=STATUS_PENDING)
+            session.add(req)
+            session.commit()
+            job_id = req.id
+        finally:
+            session.close()
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: int) -> Optional[dict[str, Any]]:
+        """Статус задачи и результат (для status=done) или None, если задачи нет."""
+        session = self.session_factory()
+        try:
+            req = session.get(Request, job_id)
+            if req is None:
+                return None
+            job: dict[str, Any] = {"id": req.id, "status": req.status}
+            if req.status == STATUS_DONE:
+                job["result"] = {
+                    "label": req.label,
+                    "confidence": req.confidence,
+                    "summary": req.summary,
+                    "fields": req.extracted,
+                }
+            elif req.status == STATUS_FAILED:
+                job["error"] = req.error
+            return job
+        finally:
+            session.close()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self._claim()
+            except Exception as e:
+                logger.exception("Failed to claim job: %s", e)
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._process(*job)
+
+    def _claim(self) -> Optional[tuple[int, str]]:
+        """
+        Взять следующую задачу: pending или running с истёкшей арендой.
+        Условный UPDATE по id гарантирует, что задачу возьмёт только один поток/процесс.
+        """
+        now = utcnow()
+        expired = now - timedelta(seconds=self.lease_seconds)
+        claimable = or_(
+            Request.status == STATUS_PENDING,
+            (Request.status == STATUS_RUNNING) & (Request.claimed_at < expired),
+        )
+        session = self.session_factory()
+        try:
+            while True:
+                row = session.execute(
+                    select(Request.id, Request.raw_text)
+                    .where(claimable)
+                    .order_by(Request.id)
+                    .limit(1)
+                ).first()
+                if row is None:
+                    return None
+                claimed = session.execute(
+                    update(Request)
+                    .where(Request.id == row.id, claimable)
+                    .values(status=STATUS_RUNNING, claimed_at=now)
+                )
+                session.commit()
+                if claimed.rowcount == 1:
+                    return row.id, row.raw_text
+                # Задачу перехватил другой воркер — берём следующую
+        finally:
+            session.close()
+
+    def _process(self, job_id: int, text: str) -> None:
+        try:
+            result = self.analyzer.analyze(text, save=False)
+            if "error" in result:
+                values = {"status": STATUS_FAILED, "error": result["error"]}
+            else:
+                values = {
+                    "status": STATUS_DONE,
+                    "label": result["label"],
+                    "confidence": result["confidence"],
+                    "model_version": result["model_version"],
+                    # В режиме classify резюме и полей нет
+                    "duplicate_of": result.get("duplicate_of"),
+                    "summary": result.get("summary"),
+                    "extracted": result.get("fields"),
+                    **Request.typed_columns(result.get("fields")),
+                    "error": None,
+                }
+        except Exception as e:
+            logger.exception("Job %d failed: %s", job_id, e)
+            values = {"status": STATUS_FAILED, "error": str(e)}
+
+        session = self.session_factory()
+        try:
+            session.execute(update(Request).where(Request.id == job_id).values(**values))
+            session.commit()
+        finally:
+            session.close()
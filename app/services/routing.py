@@ -0,0 +1,107 @@
+"""
+Маршрутизация заявок по уровням обработки: класс ML, уверенность классификатора и длина
+текста определяют, какая модель и какие промпты обрабатывают заявку и нужно ли резюме LLM.
+
+Уровни (tier):
+  full     — основная модель (LLM_MODEL): резюме и поля, как без маршрутизации;
+  light    — дешёвая модель (LLM_LIGHT_MODEL): краткое резюме (1–2 предложения) и поля;
+  template — без LLM: поля правилами, резюме по шаблону из класса и полей;
+  skip     — без LLM и без резюме: класс и поля правил.
+
+Правила (LLM_ROUTES) проверяются по порядку, первое подходящее задаёт уровень, иначе —
+уровень по умолчанию. Правило: метка[:мин. уверенность[:макс. длина текста в символах]]=уровень,
+метка * — любая:
+  консультация:0.85:600=template,консультация:0.6=light,*:0:300=light
+"""
+
+from typing import Any, NamedTuple, Optional
+
+TIERS = ("full", "light", "template", "skip")
+# Уровни, на которых вызывается LLM
+LLM_TIERS = ("full", "light")
+
+ANY_LABEL = "*"
+
+
+class Route(NamedTuple):
+    """Правило маршрутизации; label None — любая метка, max_chars None — без ограничения длины."""
+
+    label: Optional[str]
+    min_confidence: float
+    max_chars: Optional[int]
+    tier: str
+
+    def matches(self, label: Optional[str], confidence: Optional[float], length: int) -> bool:
+        if self.label is not None and label != self.label:
+            return False
+        # Без классификации (пакет with_ml=false) подходят только правила без порога уверенности
+        if self.min_confidence > 0 and (confidence is None or confidence < self.min_confidence):
+            return False
+        return self.max_chars is None or length <= self.max_chars
+
+
+def parse_routes(spec: str) -> list[Route]:
+    """Правила из строки LLM_ROUTES (через запятую); ValueError при ошибке в правиле."""
+    routes = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        condition, sep, tier = item.rpartition("=")
+        tier = tier.strip().lower()
+        if not sep or tier not in TIERS:
+            raise ValueError(f"Неверное правило маршрутизации: {item}. Уровни: {', '.join(TIERS)}")
+        parts = [part.strip() for part in condition.split(":")]
+        if len(parts) > 3 or not parts[0]:
+            raise ValueError(f"Неверное правило маршрутизации: {item}")
+        try:
+            min_confidence = float(parts[1]) if len(parts) > 1 and parts[1] else 0.0
+            max_chars = int(parts[2]) if len(parts) > 2 and parts[2] else None
+        except ValueError:
+            raise ValueError(f"Неверное правило маршрутизации: {item}") from None
+        label = None if parts[0] == ANY_LABEL else parts[0]
+        routes.append(Route(label, min_confidence, max_chars, tier))
+    return routes
+
+
+class RoutingPolicy:
+    """Выбор уровня обработки заявки по правилам; без подходящего правила — default_tier."""
+
+    def __init__(self, routes: list[Route], default_tier: str = "full") -> None:
+        if default_tier not in TIERS:
+            raise ValueError(f"Неизвестный уровень обработки: {default_tier}. Допустимые: {', '.join(TIERS)}")
+        self.routes = routes
+        self.default_tier = default_tier
+
+    @classmethod
+    def from_spec(cls, spec: str, default_tier: str = "full") -> "RoutingPolicy":
+        return cls(parse_routes(spec), default_tier)
+
+    @property
+    def tiers(self) -> set[str]:
+        """Уровни, которые может выбрать политика."""
+        return {route.tier for route in self.routes} | {self.default_tier}
+
+    def route(self, label: Optional[str], confidence: Optional[float], text: str) -> str:
+        for route in self.routes:
+            if route.matches(label, confidence, len(text)):
+                return route.tier
+        return self.default_tier
+
+
+def template_summary(label: Optional[str], fields: dict[str, Any]) -> str:
+    """Резюме без LLM: категория заявки и найденные правилами сумма долга, кредиторы, просрочка."""
+    facts = []
+    if fields.get("total_debt") is not None:
+        facts.append(f"долг {fields['total_debt']:,} руб.".replace(",", " "))
+    if fields.get("creditors_count") is not None:
+        facts.append(f"кредиторов: {fields['creditors_count']}")
+    if fields.get("has_overdue") is True:
+        facts.append("есть просрочка")
+    elif fields.get("has_overdue") is False:
+        facts.append("просрочки нет")
+    category = f"Категория: {label.replace('_', ' ')}." if label else "Категория не определена."
+    if not facts:
+        return f"{category} Сумма долга, кредиторы и просрочка в тексте не найдены."
+    text = "; ".join(facts)
+    return f"{category} {text[0].upper()}{text[1:]}."
@@ -0,0 +1,299 @@
+"""
+Single-flight: одновременные обработки одинакового текста выполняются один раз.
+
+Внутри процесса первый поток (лидер) выполняет обработку, остальные ждут его Future.
+Между воркерами gunicorn лидер процесса дополнительно берёт блокировку — строку
+inflight_analyses в общей БД (INSERT по первичному ключу удаётся только одному процессу).
+Лидеры других процессов опрашивают строку и получают записанный в неё результат;
+результат хранится result_ttl секунд, блокировка умершего воркера истекает через lease_seconds.
+В течение result_ttl и отдельный повторный вызов с тем же ключом в другом процессе получает
+этот результат. Блокировка — две записи в БД на вызов, поэтому включается явно (session_factory).
+Потоковые вызовы (stream) объединяются так же: ожидающие получают события лидера по мере их выдачи.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Iterator, Optional
+
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+
+from app.db import InflightAnalysis
+from app.llm.cache import normalize_text
+from app.metrics import ANALYZE_COALESCED
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """Идущий вызов: Future его результата и события, уже выданные потоковым лидером."""
+
+    def __init__(self) -> None:
+        self.future: Future = Future()
+        self.events: list[tuple[str, Any]] = []
+        self.followers = 0
+        self.cond = threading.Condition()
+        self.future.add_done_callback(self._wake)
+
+    def publish(self, event: tuple[str, Any]) -> None:
+        with self.cond:
+            self.events.append(event)
+            self.cond.notify_all()
+
+    def _wake(self, _future: Future) -> None:
+        with self.cond:
+            self.cond.notify_all()
+
+
+class SingleFlight:
+    """Объединение одновременных одинаковых вызовов в процессе и (при session_factory) между процессами."""
+
+    def __init__(
+        self,
+        session_factory=None,
+        wait_timeout: float = 90.0,
+        lease_seconds: float = 120.0,
+        result_ttl: float = 5.0,
+        poll_interval: float = 0.1,
+    ) -> None:
+        self.session_factory = session_factory
+        # Дольше ждущий вызов не ждёт и выполняет обработку сам
+        self.wait_timeout = wait_timeout
+        self.lease_seconds = lease_seconds
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._calls: dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text: str, *params: Any) -> str:
+        """Ключ вызова: нормализованный текст (как в кэше LLM) и параметры, влияющие на результат."""
+        payload = json.dumps([normalize_text(text), *params], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Результат fn(): свой или общий с уже идущим вызовом с тем же ключом."""
+        flight, leader = self._join(key)
+        if not leader:
+            try:
+                # Копия: результат лидера отдаётся нескольким запросам
+                return copy.deepcopy(flight.future.result(timeout=self.wait_timeout))
+            except FutureTimeoutError:
+                logger.warning("Single-flight wait timed out after %ss, running separately", self.wait_timeout)
+                return fn()
+        try:
+            result = self._shared(key, fn) if self.session_factory is not None else fn()
+        except BaseException as e:
+            flight.future.set_exception(e)
+            raise
+        else:
+            flight.future.set_result(result)
+            return result
+        finally:
+            self._leave(key)
+
+    def stream(
+        self,
+        key: str,
+        fn: Callable[[], Iterator[tuple[str, Any]]],
+        replay: Callable[[Any], Iterator[tuple[str, Any]]],
+    ) -> Iterator[tuple[str, Any]]:
+        """
+        Потоковый вариант do: fn() выдаёт события (имя, данные), результат вызова — данные
+        последнего события. Ожидающий получает события лидера по мере их выдачи; если результат
+        получен от do или другого процесса, события строятся из него через replay(result).
+        """
+        flight, leader = self._join(key)
+        if not leader:
+            yield from self._follow(flight, fn, replay)
+            return
+        source = self._shared_stream(key, fn, replay) if self.session_factory is not None else fn()
+        last = None
+        consumer = True
+        try:
+            for event in source:
+                flight.publish(event)
+                last = event
+                if not consumer:
+                    continue
+                try:
+                    yield event
+                except GeneratorExit:
+                    if not flight.followers:
+                        raise
+                    # Клиент лидера отключился — обработка доводится до конца для ожидающих
+                    consumer = False
+        except BaseException as e:
+            if isinstance(e, GeneratorExit):
+                e = RuntimeError("Single-flight leader stream was closed")
+            flight.future.set_exception(e)
+            raise
+        else:
+            flight.future.set_result(last[1] if last else None)
+        finally:
+            source.close()
+            self._leave(key)
+
+    def _join(self, key: str) -> tuple[_Flight, bool]:
+        """Идущий вызов с ключом key (False) или новый, где текущий поток — лидер (True)."""
+        with self._lock:
+            flight = self._calls.get(key)
+            if flight is None:
+                flight = self._calls[key] = _Flight()
+                return flight, True
+            flight.followers += 1
+        ANALYZE_COALESCED.labels(scope="process").inc()
+        return flight, False
+
+    def _leave(self, key: str) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def _follow(
+        self,
+        flight: _Flight,
+        fn: Callable[[], Iterator[tuple[str, Any]]],
+        replay: Callable[[Any], Iterator[tuple[str, Any]]],
+    ) -> Iterator[tuple[str, Any]]:
+        """События лидера по мере их выдачи; без них (лидер — do) — построенные из его результата."""
+        deadline = time.monotonic() + self.wait_timeout
+        sent = 0
+        while True:
+            with flight.cond:
+                while sent == len(flight.events) and not flight.future.done():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    flight.cond.wait(remaining)
+                events = flight.events[sent:]
+                finished = flight.future.done()
+            if not events and not finished:
+                if sent:
+                    raise TimeoutError(f"Single-flight wait timed out after {self.wait_timeout}s")
+                logger.warning("Single-flight wait timed out after %ss, running separately", self.wait_timeout)
+                yield from fn()
+                return
+            for event in events:
+                yield copy.deepcopy(event)
+            sent += len(events)
+            if finished:
+                break
+        # Ошибка лидера передаётся ожидающим, как в do
+        result = flight.future.result()
+        if not sent:
+            yield from replay(copy.deepcopy(result))
+
+    def _owner(self) -> str:
+        # pid берётся при вызове: объект создаётся в мастере gunicorn до fork
+        return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+    def _shared(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Вызов под блокировкой в БД: выполнить самому или дождаться результата другого процесса."""
+        owner = self._owner()
+        acquired, result = self._acquire(key, owner)
+        if not acquired:
+            return fn() if result is None else result
+        try:
+            result = fn()
+        except BaseException:
+            self._finish(key, owner, None)
+            raise
+        self._finish(key, owner, result)
+        return result
+
+    def _shared_stream(
+        self,
+        key: str,
+        fn: Callable[[], Iterator[tuple[str, Any]]],
+        replay: Callable[[Any], Iterator[tuple[str, Any]]],
+    ) -> Iterator[tuple[str, Any]]:
+        """Потоковый вызов под блокировкой в БД; результат другого процесса выдаётся через replay."""
+        owner = self._owner()
+        acquired, result = self._acquire(key, owner)
+        if not acquired:
+            yield from (fn() if result is None else replay(result))
+            return
+        last = None
+        try:
+            for event in fn():
+                last = event
+                yield event
+        except BaseException:
+            self._finish(key, owner, None)
+            raise
+        self._finish(key, owner, last[1] if last else None)
+
+    def _acquire(self, key: str, owner: str) -> tuple[bool, Any]:
+        """
+        Взять блокировку в БД: (True, None) — взята; (False, результат) — результат другого процесса;
+        (False, None) — блокировка недоступна или ожидание истекло, выполнять без неё.
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            try:
+                acquired, row = self._try_acquire(key, owner)
+            except Exception as e:
+                # Без блокировки обработка всё равно должна пройти
+                logger.warning("Single-flight lock unavailable: %s", e)
+                return False, None
+            if acquired:
+                return True, None
+            if row is not None and row.result is not None:
+                ANALYZE_COALESCED.labels(scope="worker").inc()
+                return False, row.result
+            if time.monotonic() >= deadline:
+                logger.warning("Single-flight wait timed out after %ss, running separately", self.wait_timeout)
+                return False, None
+            time.sleep(self.poll_interval)
+
+    def _try_acquire(self, key: str, owner: str) -> tuple[bool, Optional[InflightAnalysis]]:
+        """(True, None) — блокировка взята; (False, строка) — обработка идёт или завершена в другом месте."""
+        now = time.time()
+        session = self.session_factory()
+        try:
+            row = session.get(InflightAnalysis, key)
+            if row is not None and row.expires_at > now:
+                return False, row
+            if row is not None:
+                # Истёкшая строка: аренда умершего воркера или устаревший результат
+                session.expunge(row)
+                session.execute(
+                    delete(InflightAnalysis).where(InflightAnalysis.key == key, InflightAnalysis.expires_at <= now)
+                )
+            session.add(InflightAnalysis(key=key, owner=owner, expires_at=now + self.lease_seconds))
+            try:
+                session.commit()
+            except IntegrityError:
+                # Другой процесс вставил строку между SELECT и INSERT
+                session.rollback()
+                return False, None
+            return True, None
+        finally:
+            session.close()
+
+    def _finish(self, key: str, owner: str, result: Any) -> None:
+        """Опубликовать результат для ожидающих (None — снять блокировку) и удалить истёкшие строки."""
+        now = time.time()
+        session = self.session_factory()
+        try:
+            mine = (InflightAnalysis.key == key, InflightAnalysis.owner == owner)
+            if result is None:
+                session.execute(delete(InflightAnalysis).where(*mine))
+            else:
+                session.execute(
+                    update(InflightAnalysis).where(*mine).values(result=result, expires_at=now + self.result_ttl)
+                )
+            session.execute(delete(InflightAnalysis).where(InflightAnalysis.expires_at <= now))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.warning("Single-flight lock release failed: %s", e)
+        finally:
+            session.close()
@@ -0,0 +1,121 @@
+"""
+Конфигурация gunicorn: gunicorn -c gunicorn.conf.py wsgi:app
+
+Запрос к /api/analyze почти всё время ждёт LLM, поэтому число воркеров задаётся по CPU
+(процессор нужен только ML, JSON и SQLite), а число потоков воркера — по LLM_MAX_CONCURRENCY:
+потоков хватает, чтобы занять все слоты LLM процесса, и столько же остаётся запросам без LLM
+(кэш, дубликаты, правила, /api/requests). Значения GUNICORN_* из окружения или .env
+переопределяют расчёт.
+
+Класс воркера (GUNICORN_WORKER_CLASS):
+  gthread — по умолчанию: пул потоков, подходит для обычной нагрузки (с LLM_CLIENT=async потоки
+            делят один пул соединений с API);
+  gevent  — тысячи одновременных долгих соединений (SSE /api/analyze/stream); нужен пакет gevent,
+            стандартная библиотека патчится до загрузки приложения, клиент LLM по умолчанию sync.
+
+preload_app: модель, индекс дубликатов и движок БД создаются один раз в мастере; post_fork
+сбрасывает в воркере то, что нельзя наследовать через fork: пул соединений SQLAlchemy,
+HTTP-клиент и соединение кэша LLM, пулы потоков сервиса, — и запускает потоки фоновых задач
+и проверки новой версии модели.
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+# Те же .env, что читает Settings: расчёт ниже должен видеть LLM_MAX_CONCURRENCY и LLM_MODE
+load_dotenv()
+
+
+def _int(name: str, default: int) -> int:
+    value = os.environ.get(name, "").strip()
+    return int(value) if value else default
+
+
+def _cpu_count() -> int:
+    # Доступные процессу CPU (taskset/cpuset контейнера), а не все CPU хоста
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread").strip().lower()
+if worker_class == "gevent":
+    # С preload_app приложение загружается в мастере: патч нужен до импорта wsgi,
+    # иначе созданные при загрузке блокировки и пулы останутся блокирующими
+    from gevent import monkey
+
+    monkey.patch_all()
+    # Поток event loop асинхронного клиента под gevent не нужен: sync-клиент и так не блокирует
+    os.environ.setdefault("LLM_CLIENT", "sync")
+
+cpu_count = _cpu_count()
+classify_only = os.environ.get("APP_MODE", "full").strip().lower() == "classify"
+llm_concurrency = _int("LLM_MAX_CONCURRENCY", 8)
+# В режиме parallel запрос занимает два слота LLM (резюме и поля), в single и sequential — один
+llm_calls_per_request = 2 if os.environ.get("LLM_MODE", "parallel").strip().lower() == "parallel" else 1
+
+if classify_only:
+    # Только ML: нагрузка на CPU, GIL ограничивает процесс одним ядром
+    workers = _int("GUNICORN_WORKERS", 0) or max(2, cpu_count + 1)
+    threads = _int("GUNICORN_THREADS", 0) or 2
+else:
+    workers = _int("GUNICORN_WORKERS", 0) or max(2, cpu_count)
+    threads = _int("GUNICORN_THREADS", 0) or max(4, 2 * max(1, llm_concurrency // llm_calls_per_request))
+# gevent: одновременных соединений на воркер (вместо потоков)
+worker_connections = _int("GUNICORN_WORKER_CONNECTIONS", 0) or max(100, 4 * threads)
+
+bind = os.environ.get("GUNICORN_BIND") or f"0.0.0.0:{os.environ.get('PORT', '8082')}"
+preload_app = True
+# wsgi.py не запускает фоновые потоки в мастере — их запускает post_fork в каждом воркере
+os.environ["APP_PRELOADED"] = "1"
+# gthread отмечается живым из главного цикла, а не из потока запроса: долгий вызов LLM
+# не приводит к перезапуску воркера; timeout ограничивает зависший воркер целиком
+timeout = _int("GUNICORN_TIMEOUT", 120)
+# При перезапуске запросы, ждущие LLM, успевают завершиться
+graceful_timeout = _int("GUNICORN_GRACEFUL_TIMEOUT", 60)
+keepalive = _int("GUNICORN_KEEPALIVE", 5)
+# Файл heartbeat воркеров — в памяти: на overlay-ФС контейнера fsync может блокировать воркер
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+
+def on_starting(server):
+    multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def when_ready(server):
+    concurrency = f"threads={threads}" if worker_class == "gthread" else f"worker_connections={worker_connections}"
+    server.log.info(
+        "worker_class=%s workers=%d %s (cpu=%d, LLM_MAX_CONCURRENCY=%d per worker)",
+        worker_class,
+        workers,
+        concurrency,
+        cpu_count,
+        llm_concurrency,
+    )
+
+
+def post_fork(server, worker):
+    if not server.cfg.preload_app:
+        return
+    # Приложение уже загружено мастером: wsgi() возвращает тот же объект без повторной загрузки
+    app = server.app.wsgi()
+    analyzer = app.extensions.get("analyzer")
+    if analyzer is not None:
+        analyzer.after_fork()
+    if "job_pool" in app.extensions:
+        from app.main import start_background
+
+        start_background(app)
+
+
+def child_exit(server, worker):
+    # Файлы метрик-gauge завершившегося воркера больше не учитываются на /metrics
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
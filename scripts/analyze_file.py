@@ -0,0 +1,267 @@
+"""
+Пакетная обработка архива заявок из JSONL или CSV без HTTP.
+
+Файл читается потоком порциями по --chunk-size; каждая порция обрабатывается
+RequestAnalyzerService.analyze_many (ML + правила + LLM, либо только ML / только LLM)
+в пуле из --processes процессов, внутри каждого — --threads одновременных заявок.
+Результаты дописываются в выходной JSONL в порядке входа (по строке на заявку)
+и сохраняются в БД (если не указан --no-db).
+
+Выходной файл служит контрольной точкой: при повторном запуске с тем же --output
+уже записанные заявки пропускаются, недописанная последняя строка отбрасывается.
+Порция, сохранённая в БД, но не успевшая попасть в файл до сбоя, после перезапуска
+будет обработана снова (повтор распознаётся как почти-дубликат при DEDUP_ENABLED=1).
+
+Запуск из корня проекта:
+  python scripts/analyze_file.py archive.jsonl --output results.jsonl
+  python scripts/analyze_file.py archive.csv --output results.jsonl --processes 4 --threads 8
+  python scripts/analyze_file.py archive.jsonl --output labels.jsonl --mode ml --no-db
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.config import Settings
+from app.db import get_engine, init_db
+from app.main import create_analyzer
+
+MODES = ("full", "ml", "llm")
+
+# Сервис процесса-обработчика (создаётся один раз в initializer пула или в главном процессе)
+_analyzer = None
+
+
+def detect_format(path: Path, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    return "csv" if path.suffix.lower() == ".csv" else "jsonl"
+
+
+def iter_records(path: Path, fmt: str, text_field: str, id_field: str) -> Iterator[dict[str, Any]]:
+    """Записи {"line": номер, "text": ..., "id": ...} в порядке файла (line — с нуля)."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            for line, row in enumerate(csv.DictReader(f)):
+                yield {"line": line, "text": row.get(text_field) or "", "id": row.get(id_field)}
+            return
+        for line, raw in enumerate(f):
+            raw = raw.strip()
+            if not raw:
+                # Пустые строки тоже нумеруются, чтобы номер совпадал с позицией в файле
+                yield {"line": line, "text": "", "id": None}
+                continue
+            try:
+                item = json.loads(raw)
+            except json.JSONDecodeError:
+                yield {"line": line, "text": "", "id": None, "error": "Некорректный JSON"}
+                continue
+            if isinstance(item, str):
+                item = {text_field: item}
+            if not isinstance(item, dict):
+                # Список, число, null — ошибка записи, а не всего запуска
+                yield {"line": line, "text": "", "id": None, "error": "Строка JSONL должна быть объектом или строкой"}
+                continue
+            yield {"line": line, "text": item.get(text_field) or "", "id": item.get(id_field)}
+
+
+def count_records(path: Path, fmt: str) -> int:
+    with open(path, encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            return sum(1 for _ in csv.DictReader(f))
+        return sum(1 for _ in f)
+
+
+def resume_offset(output: Path) -> int:
+    """Сколько записей уже в выходном файле; обрезать недописанную последнюю строку."""
+    if not output.exists():
+        return 0
+    done = 0
+    valid_end = 0
+    with open(output, "rb") as f:
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            try:
+                json.loads(raw)
+            except json.JSONDecodeError:
+                break
+            done += 1
+            valid_end += len(raw)
+    with open(output, "r+b") as f:
+        f.truncate(valid_end)
+    return done
+
+
+def prepare_schema() -> None:
+    """Создать/дополнить таблицы один раз до запуска процессов (иначе они гонятся за DDL)."""
+    config = Settings()
+    engine = get_engine(config.database_url, sqlite_busy_timeout_ms=config.db_busy_timeout_ms)
+    init_db(engine)
+    engine.dispose()
+
+
+def init_worker(threads: int) -> None:
+    """Initializer процесса пула: свой сервис (соединения с БД, модель, LLM-клиент)."""
+    global _analyzer
+    config = Settings()
+    config.batch_concurrency = threads
+    _analyzer = create_analyzer(config)
+
+
+def process_chunk(records: list[dict[str, Any]], save: bool, mode: str) -> list[dict[str, Any]]:
+    texts = [r["text"] if "error" not in r else "" for r in records]
+    try:
+        results = _analyzer.analyze_many(
+            texts, save=save, with_ml=mode != "llm", with_llm=mode != "ml"
+        )
+    except Exception as e:
+        results = [{"index": i, "error": f"Ошибка обработки порции: {e}"} for i in range(len(records))]
+    out = []
+    for record, result in zip(records, results):
+        result.pop("index", None)
+        if "error" in record:
+            result["error"] = record["error"]
+        out.append({"line": record["line"], "source_id": record["id"], **result})
+    return out
+
+
+def chunks(records: Iterator[dict[str, Any]], size: int) -> Iterator[list[dict[str, Any]]]:
+    chunk: list[dict[str, Any]] = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def format_eta(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}ч{minutes:02d}м" if hours else f"{minutes}м{secs:02d}с"
+
+
+class Progress:
+    """Пропускная способность и ETA по обработанным в этом запуске записям."""
+
+    def __init__(self, total: Optional[int], skipped: int, interval: float) -> None:
+        self.total = total
+        self.skipped = skipped
+        self.interval = interval
+        self.processed = 0
+        self.errors = 0
+        self.started = time.monotonic()
+        self._last_report = self.started
+
+    def update(self, results: list[dict[str, Any]], force: bool = False) -> None:
+        self.processed += len(results)
+        self.errors += sum(1 for r in results if "error" in r)
+        now = time.monotonic()
+        if not force and now - self._last_report < self.interval:
+            return
+        self._last_report = now
+        elapsed = now - self.started
+        rate = self.processed / elapsed if elapsed > 0 else 0.0
+        done = self.skipped + self.processed
+        line = f"{done}"
+        if self.total:
+            line += f"/{self.total} ({done / self.total:.1%})"
+            if rate > 0:
+                line += f"   ETA {format_eta((self.total - done) / rate)}"
+        print(f"{line}   {rate:.1f} заявок/с   ошибок {self.errors}", flush=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Пакетная обработка заявок из JSONL/CSV")
+    parser.add_argument("input", type=Path, help="Входной файл .jsonl или .csv")
+    parser.add_argument("--output", type=Path, required=True, help="Выходной JSONL (и контрольная точка)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), default=None, help="Формат входа (по расширению)")
+    parser.add_argument("--text-field", default="text", help="Поле/колонка с текстом")
+    parser.add_argument("--id-field", default="id", help="Поле/колонка с внешним id (копируется в source_id)")
+    parser.add_argument("--mode", choices=MODES, default="full", help="full, ml (без LLM) или llm (без ML)")
+    parser.add_argument("--processes", type=int, default=1, help="Процессов-обработчиков")
+    parser.add_argument("--threads", type=int, default=4, help="Одновременных заявок в процессе")
+    parser.add_argument("--chunk-size", type=int, default=32, help="Заявок в порции (одна транзакция БД)")
+    parser.add_argument("--no-db", action="store_true", help="Не сохранять результаты в БД")
+    parser.add_argument("--restart", action="store_true", help="Начать заново, перезаписав --output")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="Период вывода прогресса, с")
+    args = parser.parse_args()
+
+    if not args.input.exists():
+        print(f"Ошибка: файл не найден: {args.input}")
+        sys.exit(1)
+    fmt = detect_format(args.input, args.format)
+    if args.restart and args.output.exists():
+        args.output.unlink()
+    skipped = resume_offset(args.output)
+    total = count_records(args.input, fmt)
+    if skipped:
+        print(f"Продолжение: {skipped} заявок уже обработано")
+    if skipped >= total:
+        print("Все заявки уже обработаны")
+        return
+
+    records = iter_records(args.input, fmt, args.text_field, args.id_field)
+    for _ in range(skipped):
+        next(records, None)
+
+    save = not args.no_db
+    progress = Progress(total, skipped, args.progress_interval)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    pool: Optional[ProcessPoolExecutor] = None
+    if args.processes > 1:
+        prepare_schema()
+        pool = ProcessPoolExecutor(
+            max_workers=args.processes, initializer=init_worker, initargs=(args.threads,)
+        )
+    else:
+        init_worker(args.threads)
+
+    # Не больше двух порций в очереди на процесс: память не растёт с размером файла
+    max_inflight = max(2, args.processes * 2)
+    inflight: deque[Future] = deque()
+
+    def write(out, results: list[dict[str, Any]]) -> None:
+        for result in results:
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out.flush()
+        progress.update(results)
+
+    try:
+        with open(args.output, "a", encoding="utf-8") as out:
+            for chunk in chunks(records, args.chunk_size):
+                if pool is None:
+                    write(out, process_chunk(chunk, save, args.mode))
+                    continue
+                inflight.append(pool.submit(process_chunk, chunk, save, args.mode))
+                # Запись строго в порядке входа: ждём самую старую порцию
+                while len(inflight) >= max_inflight:
+                    write(out, inflight.popleft().result())
+            while inflight:
+                write(out, inflight.popleft().result())
+    except KeyboardInterrupt:
+        print("\nПрервано: записанные результаты сохранены, повторный запуск продолжит с этого места")
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        sys.exit(130)
+    if pool is not None:
+        pool.shutdown()
+    progress.update([], force=True)
+    print(f"Готово: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Бенчмарк записи в SQLite под конкурентной нагрузкой, как у gunicorn:
+несколько процессов по несколько потоков вставляют заявки в таблицу requests.
+
+Сравниваются:
+  baseline     — движок по умолчанию (rollback journal), commit + refresh на каждую вставку;
+  wal          — WAL, synchronous=NORMAL, busy_timeout, без refresh;
+  write_behind — как wal, плюс групповой коммит через WriteBehindWriter.
+
+Запуск из корня проекта:
+  python scripts/bench_db.py
+  python scripts/bench_db.py --processes 2 --threads 4 --rows 300
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.db import Request, WriteBehindWriter, get_engine, get_session_factory, init_db
+
+SAMPLE_TEXT = "Хочу подать на банкротство, долг около 850000 рублей, 5 кредиторов, есть просрочка."
+SAMPLE_FIELDS = {"total_debt": 850000, "creditors_count": 5, "has_overdue": True, "notes": "—"}
+
+VARIANTS = ("baseline", "wal", "write_behind")
+
+
+def make_engine(variant: str, url: str):
+    if variant == "baseline":
+        return get_engine(url)
+    return get_engine(url, sqlite_wal=True, sqlite_busy_timeout_ms=5000, pool_size=8, max_overflow=8)
+
+
+def worker_process(variant: str, url: str, threads: int, rows: int, out: mp.Queue) -> None:
+    engine = make_engine(variant, url)
+    session_factory = get_session_factory(engine)
+    writer = WriteBehindWriter(session_factory, interval_ms=10) if variant == "write_behind" else None
+    errors = [0]
+    latencies: list[float] = []
+    lock = threading.Lock()
+
+    def insert_one() -> None:
+        values = {"raw_text": SAMPLE_TEXT, "label": "подача_заявления", "summary": "—", "extracted": SAMPLE_FIELDS}
+        if writer is not None:
+            writer.submit(**values).result()
+            return
+        session = session_factory()
+        try:
+            req = Request(**values)
+            session.add(req)
+            session.commit()
+            if variant == "baseline":
+                session.refresh(req)
+        finally:
+            session.close()
+
+    def run_thread() -> None:
+        local = []
+        for _ in range(rows):
+            t0 = time.perf_counter()
+            try:
+                insert_one()
+            except Exception:
+                with lock:
+                    errors[0] += 1
+                continue
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+
+    pool = [threading.Thread(target=run_thread) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    out.put({"errors": errors[0], "latencies": latencies})
+
+
+def run_variant(variant: str, processes: int, threads: int, rows: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        init_db(make_engine(variant, url))
+        out: mp.Queue = mp.Queue()
+        ctx_procs = [
+            mp.Process(target=worker_process, args=(variant, url, threads, rows, out))
+            for _ in range(processes)
+        ]
+        t0 = time.perf_counter()
+        for p in ctx_procs:
+            p.start()
+        parts = [out.get() for _ in ctx_procs]
+        for p in ctx_procs:
+            p.join()
+        elapsed = time.perf_counter() - t0
+
+    latencies = sorted(x for part in parts for x in part["latencies"])
+    errors = sum(part["errors"] for part in parts)
+    ok = len(latencies)
+    result = {
+        "variant": variant,
+        "rows_ok": ok,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_s": round(ok / elapsed, 1),
+        "p50_ms": round(latencies[ok // 2] * 1e3, 2) if ok else None,
+        "p99_ms": round(latencies[min(ok - 1, int(ok * 0.99))] * 1e3, 2) if ok else None,
+    }
+    print(
+        f"{variant:<13} {result['rows_per_s']:>9.1f} rows/s   errors {errors:<4} "
+        f"p50 {result['p50_ms']} ms   p99 {result['p99_ms']} ms"
+    )
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк вставок в SQLite")
+    parser.add_argument("--processes", type=int, default=2, help="Число процессов (воркеров gunicorn)")
+    parser.add_argument("--threads", type=int, default=4, help="Потоков на процесс")
+    parser.add_argument("--rows", type=int, default=200, help="Вставок на поток")
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument("--output", type=Path, default=None, help="Сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    print(f"{args.processes} процесс(а) × {args.threads} потока × {args.rows} вставок\n")
+    results = [run_variant(v, args.processes, args.threads, args.rows) for v in args.variants]
+    if args.output:
+        args.output.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
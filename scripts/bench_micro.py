@@ -0,0 +1,144 @@
+"""
+Микро-бенчмарки горячих участков обработки заявки:
+  ml_predict        — MLModel.predict на текстах из размеченного CSV;
+  db_insert         — сохранение заявки (RequestAnalyzerService._save) во временную SQLite с WAL;
+  extract_fields_*  — сборка промпта и разбор JSON-ответа в extract_fields
+                      (ответ LLM подставляется без сети; варианты: чистый JSON и JSON в ```-блоке).
+
+Результаты сохраняются в JSON; с --compare выводится изменение относительно прошлого прогона.
+
+Запуск из корня проекта (модель должна быть обучена):
+  python scripts/bench_micro.py --output data/bench/micro.json
+  python scripts/bench_micro.py --compare data/bench/micro.json
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.db import get_engine, get_session_factory, init_db
+from app.llm import LLMClientBase
+from app.ml import MLModel
+from app.services import RequestAnalyzerService
+
+FIELDS_JSON = json.dumps(
+    {"total_debt": 850000, "creditors_count": 5, "has_overdue": True, "notes": "Просрочка по всем кредитам"},
+    ensure_ascii=False,
+)
+
+
+class CannedLLMClient(LLMClientBase):
+    """Клиент без сети: complete возвращает заранее заданный ответ."""
+
+    def __init__(self, answer: str) -> None:
+        self.model = "bench"
+        self.cache = None
+        self.answer = answer
+
+    def complete(
+        self,
+        prompt: str,
+        temperature: float = 0.3,
+        max_tokens: Optional[int] = None,
+        response_format: Optional[dict] = None,
+    ) -> Optional[str]:
+        return self.answer
+
+
+def bench(name: str, fn: Callable[[int], object], repeat: int) -> dict:
+    """Вызвать fn(i) repeat раз; вернуть среднее и перцентили в микросекундах."""
+    timings = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        fn(i)
+        timings.append(time.perf_counter() - t0)
+    timings.sort()
+    result = {
+        "name": name,
+        "repeat": repeat,
+        "mean_us": round(sum(timings) / repeat * 1e6, 2),
+        "p50_us": round(timings[repeat // 2] * 1e6, 2),
+        "p99_us": round(timings[min(repeat - 1, int(repeat * 0.99))] * 1e6, 2),
+    }
+    print(f"{name:<24} mean {result['mean_us']:10.1f} µs   p50 {result['p50_us']:10.1f} µs   p99 {result['p99_us']:10.1f} µs")
+    return result
+
+
+def run(model_path: Path, data_path: Path, repeat: int) -> list[dict]:
+    with open(data_path, encoding="utf-8", newline="") as f:
+        texts = [row["text"] for row in csv.DictReader(f)]
+
+    model = MLModel(model_path)
+    model.load()
+    results = [bench("ml_predict", lambda i: model.predict(texts[i % len(texts)]), repeat)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = get_engine(f"sqlite:///{Path(tmp) / 'bench.db'}", sqlite_wal=True, sqlite_busy_timeout_ms=5000)
+        init_db(engine)
+        service = RequestAnalyzerService(
+            model, CannedLLMClient(FIELDS_JSON), get_session_factory(engine), llm_mode="sequential"
+        )
+        ml_result = {"label": "консультация", "confidence": 0.9}
+        fields = json.loads(FIELDS_JSON)
+        results.append(bench(
+            "db_insert",
+            lambda i: service._save(texts[i % len(texts)], ml_result, "Резюме", fields),
+            max(1, repeat // 5),
+        ))
+        engine.dispose()
+
+    for name, answer in (
+        ("extract_fields_json", FIELDS_JSON),
+        ("extract_fields_fenced", f"```json\n{FIELDS_JSON}\n```"),
+    ):
+        client = CannedLLMClient(answer)
+        results.append(bench(name, lambda i: client.extract_fields(texts[i % len(texts)]), repeat))
+    return results
+
+
+def compare(results: list[dict], baseline_path: Path) -> None:
+    baseline = {item["name"]: item for item in json.loads(baseline_path.read_text(encoding="utf-8"))}
+    print(f"\nСравнение с {baseline_path} (mean):")
+    for item in results:
+        before = baseline.get(item["name"])
+        if not before:
+            continue
+        change = (item["mean_us"] - before["mean_us"]) / before["mean_us"] * 100
+        print(f"{item['name']:<24} {before['mean_us']:10.1f} → {item['mean_us']:10.1f} µs   {change:+6.1f}%")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Микро-бенчмарки ML, БД и разбора ответа LLM")
+    parser.add_argument("--model", type=Path, default=None, help="Путь к text_clf.pkl")
+    parser.add_argument("--data", type=Path, default=None, help="CSV с текстами (колонка text)")
+    parser.add_argument("--repeat", type=int, default=1000, help="Число вызовов на бенчмарк")
+    parser.add_argument("--output", type=Path, default=None, help="Сохранить результаты в JSON")
+    parser.add_argument("--compare", type=Path, default=None, help="JSON прошлого прогона для сравнения")
+    args = parser.parse_args()
+
+    model_path = args.model or ROOT / os.getenv("ML_MODEL_PATH", "data/models/text_clf.pkl")
+    data_path = args.data or ROOT / os.getenv("LABELED_DATA_PATH", "data/labeled/labeled_requests.csv")
+    if not model_path.exists():
+        print(f"Ошибка: модель не найдена: {model_path}. Сначала выполните scripts/train_model.py")
+        sys.exit(1)
+
+    results = run(model_path, data_path, args.repeat)
+    if args.compare:
+        compare(results, args.compare)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
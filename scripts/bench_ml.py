@@ -0,0 +1,103 @@
+"""
+Микро-бенчмарк инференса ML-модели: старый путь (predict + predict_proba),
+один проход predict_proba по Pipeline и компактная модель на NumPy.
+
+Запуск из корня проекта (модель должна быть обучена):
+  python scripts/bench_ml.py
+  python scripts/bench_ml.py --model data/models/text_clf.pkl --repeat 2000
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import joblib
+import numpy as np
+
+from app.ml import CompactModel
+
+
+def load_texts(data_path: Path, text_column: str = "text") -> list[str]:
+    with open(data_path, encoding="utf-8", newline="") as f:
+        return [row[text_column] for row in csv.DictReader(f)]
+
+
+def bench(name: str, fn, texts: list[str], repeat: int) -> dict:
+    """Вызвать fn(text) repeat раз по кругу texts; вернуть среднее и p99 в микросекундах."""
+    timings = np.empty(repeat)
+    for i in range(repeat):
+        text = texts[i % len(texts)]
+        t0 = time.perf_counter()
+        fn(text)
+        timings[i] = time.perf_counter() - t0
+    result = {
+        "name": name,
+        "mean_us": float(timings.mean() * 1e6),
+        "p50_us": float(np.percentile(timings, 50) * 1e6),
+        "p99_us": float(np.percentile(timings, 99) * 1e6),
+    }
+    print(f"{name:<28} mean {result['mean_us']:9.1f} µs   p50 {result['p50_us']:9.1f} µs   p99 {result['p99_us']:9.1f} µs")
+    return result
+
+
+def run(model_path: Path, data_path: Path, repeat: int) -> list[dict]:
+    t0 = time.perf_counter()
+    pipeline = joblib.load(model_path)
+    print(f"joblib.load Pipeline: {(time.perf_counter() - t0) * 1e3:.1f} ms")
+    compact_path = model_path.with_suffix(".compact")
+    if not compact_path.exists():
+        CompactModel.from_pipeline(pipeline).save(compact_path)
+    t0 = time.perf_counter()
+    compact = CompactModel.load(compact_path)
+    print(f"CompactModel.load:    {(time.perf_counter() - t0) * 1e3:.1f} ms\n")
+
+    texts = load_texts(data_path)
+    diff = np.abs(pipeline.predict_proba(texts) - compact.predict_proba(texts)).max()
+    print(f"Макс. расхождение вероятностей Pipeline/компактной модели: {diff:.2e}\n")
+
+    def old_path(text):
+        label = pipeline.predict([text])[0]
+        proba = float(pipeline.predict_proba([text])[0].max())
+        return label, proba
+
+    def single_pass(text):
+        proba = pipeline.predict_proba([text])[0]
+        best = int(proba.argmax())
+        return pipeline.classes_[best], float(proba[best])
+
+    def compact_path_fn(text):
+        proba = compact.predict_proba([text])[0]
+        best = int(proba.argmax())
+        return compact.classes_[best], float(proba[best])
+
+    return [
+        bench("predict + predict_proba", old_path, texts, repeat),
+        bench("predict_proba (1 проход)", single_pass, texts, repeat),
+        bench("CompactModel", compact_path_fn, texts, repeat),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк инференса ML-модели")
+    parser.add_argument("--model", type=Path, default=None, help="Путь к text_clf.pkl")
+    parser.add_argument("--data", type=Path, default=None, help="CSV с текстами (колонка text)")
+    parser.add_argument("--repeat", type=int, default=1000, help="Число вызовов на вариант")
+    args = parser.parse_args()
+
+    model_path = args.model or ROOT / os.getenv("ML_MODEL_PATH", "data/models/text_clf.pkl")
+    data_path = args.data or ROOT / os.getenv("LABELED_DATA_PATH", "data/labeled/labeled_requests.csv")
+    if not model_path.exists():
+        print(f"Ошибка: модель не найдена: {model_path}. Сначала выполните scripts/train_model.py")
+        sys.exit(1)
+    run(model_path, data_path, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
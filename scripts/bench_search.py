@@ -0,0 +1,189 @@
+"""
+Бенчмарк полнотекстового поиска: заполняет временную SQLite синтетическими заявками
+(по умолчанию 1 млн строк; вставка идёт через триггеры FTS, как в работающем сервисе)
+и сравнивает задержку search_requests (FTS5, bm25, snippet) с LIKE '%…%' по raw_text и summary.
+
+Запуск из корня проекта:
+  python scripts/bench_search.py
+  python scripts/bench_search.py --rows 200000 --output data/bench/search.json
+  python scripts/bench_search.py --db data/bench/search.db --keep   # повторные прогоны без заполнения
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import text
+
+from app.db import get_engine, get_session_factory, init_db, search_requests
+
+BANKS = [
+    "Сбербанк", "ВТБ", "Альфа-Банк", "Тинькофф", "Газпромбанк", "Россельхозбанк", "Совкомбанк",
+    "Почта Банк", "Хоум Кредит", "Ренессанс Кредит", "ОТП Банк", "МТС Банк", "Райффайзенбанк",
+    "Росбанк", "Уралсиб", "Открытие", "Промсвязьбанк", "Русский Стандарт", "Восточный", "Кредит Европа",
+]
+CITIES = ["Москвы", "Санкт-Петербурга", "Казани", "Новосибирска", "Екатеринбурга", "Самары", "Перми", "Омска"]
+DEBTS = [
+    "кредит наличными", "кредитная карта", "микрозайм", "ипотека", "автокредит", "долг по ЖКХ",
+    "налоговая задолженность", "поручительство", "потребительский кредит", "рассрочка",
+]
+SITUATIONS = [
+    "Просрочка {months} месяцев, звонят коллекторы.",
+    "Платежи не вношу с прошлого года, банк подал в суд.",
+    "Возбуждено исполнительное производство, арестован расчётный счёт.",
+    "Потерял работу, платить нечем, хочу списать долги.",
+    "Есть единственное жильё и автомобиль, боюсь их потерять.",
+    "Подскажите, какие документы нужны для заявления в арбитражный суд {city}.",
+    "Хочу пройти внесудебное банкротство через МФЦ.",
+    "Финансовый управляющий уже назначен, нужна консультация по торгам.",
+]
+SUMMARIES = [
+    "Клиент сообщает о долгах перед {n} кредиторами, просит оценить перспективы банкротства.",
+    "Требуется подготовка документов для подачи заявления о банкротстве.",
+    "Клиент готов подать заявление; основная проблема — {debt}.",
+]
+
+# (название, запрос): от частых слов до редких сочетаний
+QUERIES = [
+    ("частое слово", "банкротство"),
+    ("банк", "Сбербанк"),
+    ("словоформа", "ипотека"),
+    ("два слова", "арбитражный суд Казани"),
+    ("редкое сочетание", "Уралсиб автокредит МФЦ"),
+    ("ё/е", "расчетный счет"),
+    # Меньше RANK_MAX_DOCS строк — ранжирование bm25
+    ("город", "Омска"),
+    ("редкое слово", "2500000"),
+]
+
+
+def synth_row(rng: random.Random) -> tuple[str, str]:
+    debts = rng.sample(DEBTS, rng.randint(1, 3))
+    banks = rng.sample(BANKS, rng.randint(1, 3))
+    situation = rng.choice(SITUATIONS).format(months=rng.randint(2, 24), city=rng.choice(CITIES))
+    raw = (
+        f"Долг около {rng.randint(50, 5000) * 1000} рублей: {', '.join(debts)}. "
+        f"Кредиторы: {', '.join(banks)}. {situation}"
+    )
+    summary = rng.choice(SUMMARIES).format(n=len(banks), debt=debts[0])
+    return raw, summary
+
+
+def fill(engine, rows: int, batch: int = 10_000, seed: int = 42) -> float:
+    """Вставить rows синтетических заявок пачками; вернуть строк/с (с обновлением FTS-индекса)."""
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    done = 0
+    while done < rows:
+        size = min(batch, rows - done)
+        values = [
+            {"raw_text": raw, "summary": summary, "label": "консультация", "status": "done"}
+            for raw, summary in (synth_row(rng) for _ in range(size))
+        ]
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO requests (raw_text, summary, label, status) "
+                    "VALUES (:raw_text, :summary, :label, :status)"
+                ),
+                values,
+            )
+        done += size
+        if done % 100_000 == 0 or done == rows:
+            print(f"  вставлено {done}", flush=True)
+    return rows / (time.perf_counter() - start)
+
+
+def timed(fn, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        found = fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return {"p50_ms": round(statistics.median(timings), 2), "max_ms": round(max(timings), 2), "found": found}
+
+
+def like_search(session, query: str, limit: int) -> int:
+    """Наивный вариант: все слова через LIKE по обеим колонкам (полный просмотр таблицы)."""
+    conditions, params = [], {"limit": limit}
+    for i, word in enumerate(query.split()):
+        conditions.append(f"(raw_text LIKE :w{i} OR summary LIKE :w{i})")
+        params[f"w{i}"] = f"%{word}%"
+    sql = f"SELECT id FROM requests WHERE {' AND '.join(conditions)} ORDER BY id DESC LIMIT :limit"
+    return len(session.execute(text(sql), params).all())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Задержка полнотекстового поиска FTS5 против LIKE")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Строк в таблице")
+    parser.add_argument("--db", type=Path, default=None, help="Файл БД (по умолчанию временный)")
+    parser.add_argument("--keep", action="store_true", help="Не заполнять, если в --db уже есть строки")
+    parser.add_argument("--repeat", type=int, default=20, help="Повторов каждого FTS-запроса")
+    parser.add_argument("--like-repeat", type=int, default=3, help="Повторов каждого LIKE-запроса (0 — пропустить)")
+    parser.add_argument("--limit", type=int, default=20, help="Размер страницы")
+    parser.add_argument("--output", type=Path, default=None, help="Сохранить отчёт в JSON")
+    args = parser.parse_args()
+
+    tmp = None
+    if args.db is None:
+        tmp = tempfile.TemporaryDirectory()
+        db_path = Path(tmp.name) / "search.db"
+    else:
+        db_path = args.db
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+    engine = get_engine(f"sqlite:///{db_path}", sqlite_wal=True, sqlite_busy_timeout_ms=5000)
+    init_db(engine)
+
+    report: dict = {"rows": args.rows}
+    with engine.connect() as conn:
+        existing = conn.execute(text("SELECT count(*) FROM requests")).scalar()
+    if not (args.keep and existing):
+        print(f"Заполнение {args.rows} строк...")
+        report["insert_rows_per_s"] = round(fill(engine, args.rows))
+        print(f"Вставка с FTS-триггерами: {report['insert_rows_per_s']} строк/с")
+    else:
+        report["rows"] = existing
+    with engine.connect() as conn:
+        conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+    report["db_size_mb"] = round(db_path.stat().st_size / 2 ** 20, 1)
+
+    session = get_session_factory(engine)()
+    report["queries"] = []
+    # LIKE в SQLite не различает регистр только для латиницы и не знает словоформ — «найдено» отличается
+    print(f"\n{'запрос':<40} {'FTS p50':>9} {'FTS max':>9} {'найдено':>8} {'LIKE p50':>9} {'найдено':>8}")
+    try:
+        for name, query in QUERIES:
+            fts = timed(lambda: len(search_requests(session, query, limit=args.limit)), args.repeat)
+            item = {"name": name, "query": query, "fts": fts}
+            like_p50, like_found = "—", "—"
+            if args.like_repeat > 0:
+                item["like"] = timed(lambda: like_search(session, query, args.limit), args.like_repeat)
+                like_p50, like_found = f"{item['like']['p50_ms']:.1f}", item["like"]["found"]
+            report["queries"].append(item)
+            print(
+                f"{name + ': ' + query:<40} {fts['p50_ms']:>9.2f} {fts['max_ms']:>9.2f} {fts['found']:>8} "
+                f"{like_p50:>9} {like_found:>8}"
+            )
+    finally:
+        session.close()
+        engine.dispose()
+        if tmp is not None:
+            tmp.cleanup()
+
+    print(f"\nРазмер БД: {report['db_size_mb']} МБ")
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
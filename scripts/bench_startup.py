@@ -0,0 +1,78 @@
+"""
+Холодный старт воркера: время импорта app.main, create_app(), первого запроса /api/analyze
+и пиковый RSS процесса. Каждый прогон — в новом интерпретаторе (как запуск воркера),
+результат — медиана по прогонам. Показывает, какие тяжёлые пакеты оказались загружены.
+
+Режим задаётся окружением (APP_MODE, LLM-настройки, DATABASE_URL):
+  APP_MODE=classify python scripts/bench_startup.py
+  API_KEY=... python scripts/bench_startup.py --runs 5 --output data/bench/startup.json
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = ("pandas", "sklearn", "scipy", "openai", "httpx")
+
+# Выполняется в дочернем интерпретаторе; печатает одну строку JSON
+CHILD = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+from app.main import create_app
+t1 = time.perf_counter()
+app = create_app()
+t2 = time.perf_counter()
+response = app.test_client().post("/api/analyze", json={{"text": {text!r}}})
+t3 = time.perf_counter()
+print(json.dumps({{
+    "import_s": t1 - t0,
+    "create_app_s": t2 - t1,
+    "first_request_s": t3 - t2,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "status": response.status_code,
+    "modules": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+TEXT = "Долг по кредитам 500000 рублей перед пятью банками, просрочка три месяца"
+
+
+def run_once() -> dict:
+    code = CHILD.format(root=str(ROOT), text=TEXT, heavy=HEAVY_MODULES)
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "ошибка запуска")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Время холодного старта и RSS воркера")
+    parser.add_argument("--runs", type=int, default=5, help="Число прогонов (медиана)")
+    parser.add_argument("--output", type=Path, default=None, help="Сохранить отчёт в JSON")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    report = {
+        key: round(statistics.median(run[key] for run in runs), 3)
+        for key in ("import_s", "create_app_s", "first_request_s", "rss_mb")
+    }
+    report["status"] = runs[-1]["status"]
+    report["modules"] = runs[-1]["modules"]
+    print(
+        f"import {report['import_s']:.2f} с   create_app {report['create_app_s']:.2f} с   "
+        f"первый запрос {report['first_request_s']:.3f} с   RSS {report['rss_mb']:.0f} МБ"
+    )
+    print(f"загружены: {', '.join(report['modules']) or '—'}   статус ответа {report['status']}")
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
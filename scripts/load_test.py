@@ -0,0 +1,182 @@
+"""
+Нагрузочный тест HTTP API: воспроизводит корпус заявок с заданной частотой (RPS)
+и считает p50/p95/p99 задержки, пропускную способность и долю ошибок.
+
+Нагрузка открытая: запросы отправляются по расписанию (i / rps) независимо от того,
+успели ли ответить предыдущие, а задержка отсчитывается от запланированного момента —
+медленный сервер не «притормаживает» генератор и не занижает перцентили.
+
+Корпус — JSONL с полем "text" в каждой строке (--input) или тексты из размеченного CSV.
+
+Пример (без сети, с заглушкой LLM):
+  python scripts/mock_llm.py --latency-ms 400 --jitter-ms 150 --error-rate 0.02 &
+  OPENAI_BASE_URL=http://127.0.0.1:8090/v1 API_KEY=mock gunicorn -c gunicorn.conf.py -b 127.0.0.1:8082 wsgi:app &
+  python scripts/load_test.py --rps 10 --duration 30 --output data/bench/load.json
+  python scripts/load_test.py --endpoint /api/analyze/stream --rps 5 --requests 100
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def load_corpus(input_path: Optional[Path]) -> list[str]:
+    """Тексты из JSONL (поле text) или из размеченного CSV проекта."""
+    if input_path is not None:
+        texts = []
+        with open(input_path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                item = json.loads(line)
+                text = item.get("text") if isinstance(item, dict) else item
+                if isinstance(text, str) and text.strip():
+                    texts.append(text)
+        return texts
+    data_path = ROOT / os.getenv("LABELED_DATA_PATH", "data/labeled/labeled_requests.csv")
+    with open(data_path, encoding="utf-8", newline="") as f:
+        return [row["text"] for row in csv.DictReader(f)]
+
+
+def percentile(sorted_values: list[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class LoadResult:
+    """Накопитель результатов запросов (потокобезопасный)."""
+
+    def __init__(self) -> None:
+        self.latencies: list[float] = []
+        self.first_byte: list[float] = []
+        self.statuses: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, status: str, latency: Optional[float], ttfb: Optional[float] = None) -> None:
+        with self._lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if latency is not None:
+                self.latencies.append(latency)
+            if ttfb is not None:
+                self.first_byte.append(ttfb)
+
+
+def send(url: str, text: str, scheduled: float, timeout: float, stream: bool, result: LoadResult) -> None:
+    body = json.dumps({"text": text}, ensure_ascii=False).encode("utf-8")
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    ttfb = None
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            if stream:
+                resp.read(1)
+                ttfb = time.perf_counter() - scheduled
+                rest = resp.read().decode("utf-8", errors="replace")
+                status = "error_event" if "event: error" in rest else str(resp.status)
+            else:
+                resp.read()
+                status = str(resp.status)
+    except urllib.error.HTTPError as e:
+        status = str(e.code)
+    except Exception as e:
+        status = type(e).__name__
+    latency = time.perf_counter() - scheduled
+    ok = status.isdigit() and 200 <= int(status) < 300
+    result.add(status, latency if ok else None, ttfb if ok else None)
+
+
+def run(
+    url: str,
+    texts: list[str],
+    rps: float,
+    total: int,
+    concurrency: int,
+    timeout: float,
+) -> dict[str, Any]:
+    stream = url.rstrip("/").endswith("/stream")
+    result = LoadResult()
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="load")
+    start = time.perf_counter()
+    for i in range(total):
+        scheduled = start + i / rps
+        pause = scheduled - time.perf_counter()
+        if pause > 0:
+            time.sleep(pause)
+        executor.submit(send, url, texts[i % len(texts)], scheduled, timeout, stream, result)
+    executor.shutdown(wait=True)
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(result.latencies)
+    ok = len(latencies)
+    report: dict[str, Any] = {
+        "url": url,
+        "target_rps": rps,
+        "requests": total,
+        "ok": ok,
+        "error_rate": round(1 - ok / total, 4) if total else 0.0,
+        "statuses": result.statuses,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(ok / elapsed, 2) if elapsed else None,
+        "concurrency": concurrency,
+    }
+    for q in (50, 95, 99):
+        value = percentile(latencies, q)
+        report[f"p{q}_ms"] = round(value * 1e3, 1) if value is not None else None
+    if stream:
+        first_byte = sorted(result.first_byte)
+        for q in (50, 95, 99):
+            value = percentile(first_byte, q)
+            report[f"ttfb_p{q}_ms"] = round(value * 1e3, 1) if value is not None else None
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Нагрузочный тест /api/analyze")
+    parser.add_argument("--url", default="http://127.0.0.1:8082", help="Адрес приложения")
+    parser.add_argument("--endpoint", default="/api/analyze", help="Путь: /api/analyze или /api/analyze/stream")
+    parser.add_argument("--input", type=Path, default=None, help="JSONL с полем text (по умолчанию — размеченный CSV)")
+    parser.add_argument("--rps", type=float, default=5.0, help="Целевая частота запросов")
+    parser.add_argument("--duration", type=float, default=20.0, help="Длительность, секунды")
+    parser.add_argument("--requests", type=int, default=None, help="Число запросов (вместо --duration)")
+    parser.add_argument("--concurrency", type=int, default=64, help="Максимум одновременных запросов")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Таймаут запроса, секунды")
+    parser.add_argument("--output", type=Path, default=None, help="Сохранить отчёт в JSON")
+    args = parser.parse_args()
+
+    texts = load_corpus(args.input)
+    if not texts:
+        print("Ошибка: корпус пуст")
+        sys.exit(1)
+    total = args.requests or max(1, int(args.rps * args.duration))
+    url = args.url.rstrip("/") + args.endpoint
+    print(f"{url}: {total} запросов, {args.rps} RPS, корпус {len(texts)} текстов\n")
+
+    report = run(url, texts, args.rps, total, args.concurrency, args.timeout)
+    print(
+        f"ok {report['ok']}/{report['requests']}   ошибки {report['error_rate']:.2%}   "
+        f"{report['throughput_rps']} rps\n"
+        f"p50 {report['p50_ms']} ms   p95 {report['p95_ms']} ms   p99 {report['p99_ms']} ms"
+    )
+    if "ttfb_p50_ms" in report:
+        print(f"TTFB p50 {report['ttfb_p50_ms']} ms   p95 {report['ttfb_p95_ms']} ms   p99 {report['ttfb_p99_ms']} ms")
+    print(f"статусы: {report['statuses']}")
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Локальная заглушка OpenAI-совместимого API для нагрузочных тестов без сети и ключа.
+
+Отвечает на POST /v1/chat/completions (в т.ч. stream=true) с настраиваемой
+задержкой, разбросом и долей ошибок. На промпты, где просят JSON, возвращает
+JSON с полями заявки (и summary для объединённого запроса), на остальные — текст резюме
+(на просьбу о резюме в 1–2 предложения — его первое предложение).
+С response_format=json_schema ключи ответа берутся из схемы и JSON всегда корректен;
+без него доля ответов может быть «шумной» (JSON в пояснениях и markdown) или обрезанной.
+
+Запуск из корня проекта:
+  python scripts/mock_llm.py --port 8090 --latency-ms 400 --jitter-ms 150 --error-rate 0.02
+  python scripts/mock_llm.py --noisy-rate 0.3 --broken-rate 0.1 --no-structured
+  python scripts/mock_llm.py --latency-ms 400 --model-latency gpt-4.1-nano=150   # дешёвая модель быстрее
+
+Приложение направляется на заглушку через .env:
+  OPENAI_BASE_URL=http://127.0.0.1:8090/v1
+  API_KEY=mock
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+
+SUMMARY_TEXT = (
+    "Клиент сообщает о задолженности перед несколькими кредиторами и просрочке платежей. "
+    "Просит оценить возможность банкротства физического лица. "
+    "Требуется уточнить состав долгов и имущество."
+)
+BRIEF_SUMMARY_TEXT = SUMMARY_TEXT.split(". ")[0] + "."
+FIELDS = {"total_debt": 850000, "creditors_count": 5, "has_overdue": True, "notes": "mock"}
+
+
+class MockConfig:
+    """Параметры поведения заглушки (общие для всех потоков сервера)."""
+
+    def __init__(
+        self,
+        latency_ms: float = 300.0,
+        jitter_ms: float = 100.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        stream_chunks: int = 20,
+        noisy_rate: float = 0.0,
+        broken_rate: float = 0.0,
+        structured: bool = True,
+        model_latency_ms: Optional[dict[str, float]] = None,
+    ) -> None:
+        self.latency = latency_ms / 1000.0
+        # Задержка отдельных моделей (имя модели -> секунды), остальные — latency
+        self.model_latency = {model: ms / 1000.0 for model, ms in (model_latency_ms or {}).items()}
+        self.jitter = jitter_ms / 1000.0
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.stream_chunks = max(1, stream_chunks)
+        self.noisy_rate = noisy_rate
+        self.broken_rate = broken_rate
+        # False — отвечать 400 на запросы с response_format, как модели без structured outputs
+        self.structured = structured
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def latency_for(self, model: str) -> float:
+        return self.model_latency.get(model, self.latency)
+
+    def delay(self, model: str = "") -> float:
+        latency = self.latency_for(model)
+        return max(0.0, random.gauss(latency, self.jitter)) if self.jitter else latency
+
+    def failure(self) -> Optional[int]:
+        """HTTP-код ошибки для текущего запроса или None."""
+        roll = random.random()
+        with self._lock:
+            self.requests += 1
+            if roll < self.rate_limit_rate:
+                self.errors += 1
+                return 429
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.errors += 1
+                return 500
+        return None
+
+
+def build_answer(prompt: str, response_format: Optional[dict[str, Any]] = None) -> str:
+    """Ответ в формате, который ожидает LLMClientBase для данного промпта (или схемы response_format)."""
+    schema = (response_format or {}).get("json_schema", {}).get("schema")
+    if schema is not None:
+        keys = list(schema.get("properties", {}))
+    elif "JSON" in prompt:
+        keys = [key for key in ("summary", *FIELDS) if f'"{key}"' in prompt]
+    else:
+        return BRIEF_SUMMARY_TEXT if "1–2 предложения" in prompt else SUMMARY_TEXT
+    summary = BRIEF_SUMMARY_TEXT if "1–2 предложения" in prompt else SUMMARY_TEXT
+    data = {key: summary if key == "summary" else FIELDS[key] for key in keys if key == "summary" or key in FIELDS}
+    return json.dumps(data, ensure_ascii=False)
+
+
+def distort(answer: str, config: MockConfig) -> str:
+    """JSON-ответ без structured outputs: с долей noisy_rate — в пояснениях, broken_rate — обрезан."""
+    roll = random.random()
+    if roll < config.noisy_rate:
+        return f"Конечно! Вот результат анализа:\n```json\n{answer}\n```\nЕсли нужно, уточню детали."
+    if roll < config.noisy_rate + config.broken_rate:
+        return answer[: len(answer) // 2]
+    return answer
+
+
+def make_handler(config: MockConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+            pass
+
+        def _send_json(self, status: int, payload: dict[str, Any]) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if status == 429:
+                self.send_header("Retry-After", "1")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            if self.path.rstrip("/").endswith("/stats"):
+                self._send_json(200, {"requests": config.requests, "errors": config.errors})
+                return
+            self._send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError:
+                self._send_json(400, {"error": {"message": "invalid JSON"}})
+                return
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+
+            model = body.get("model", "mock")
+            time.sleep(config.delay(model))
+            status = config.failure()
+            if status is not None:
+                self._send_json(status, {"error": {"message": "mock failure", "code": status}})
+                return
+
+            response_format = body.get("response_format")
+            if response_format is not None and not config.structured:
+                self._send_json(400, {"error": {
+                    "message": "response_format is not supported by this model",
+                    "type": "invalid_request_error",
+                    "param": "response_format",
+                }})
+                return
+            messages = body.get("messages") or [{}]
+            prompt = str(messages[-1].get("content", ""))
+            answer = build_answer(prompt, response_format)
+            if response_format is None and "JSON" in prompt:
+                answer = distort(answer, config)
+            usage = {
+                "prompt_tokens": len(str(messages)) // 4,
+                "completion_tokens": len(answer) // 4,
+                "total_tokens": (len(str(messages)) + len(answer)) // 4,
+            }
+            if body.get("stream"):
+                include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+                self._stream(answer, model, usage if include_usage else None)
+                return
+            self._send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": answer},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+        def _stream(self, answer: str, model: str, usage: Optional[dict]) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            step = max(1, len(answer) // config.stream_chunks)
+            chunk_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            # Время генерации распределяется между фрагментами (первый приходит сразу после задержки)
+            pause = config.latency_for(model) / config.stream_chunks
+            for i in range(0, len(answer), step):
+                self._event({
+                    "id": chunk_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": answer[i:i + step]}, "finish_reason": None}],
+                })
+                time.sleep(pause)
+            self._event({
+                "id": chunk_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            })
+            if usage is not None:
+                # Как у OpenAI при stream_options.include_usage: отдельный фрагмент без choices
+                self._event({
+                    "id": chunk_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [],
+                    "usage": usage,
+                })
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+        def _event(self, payload: dict[str, Any]) -> None:
+            self.wfile.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+    return Handler
+
+
+def serve(host: str, port: int, config: MockConfig) -> ThreadingHTTPServer:
+    """Запустить сервер в фоновом потоке; вернуть его (shutdown() для остановки)."""
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-llm", daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Заглушка OpenAI-совместимого API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Средняя задержка ответа")
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="Стандартное отклонение задержки")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Доля ответов 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Доля ответов 429")
+    parser.add_argument("--stream-chunks", type=int, default=20, help="Фрагментов в потоковом ответе")
+    parser.add_argument("--noisy-rate", type=float, default=0.0, help="Доля JSON-ответов с пояснениями и markdown")
+    parser.add_argument("--broken-rate", type=float, default=0.0, help="Доля обрезанных JSON-ответов")
+    parser.add_argument("--no-structured", action="store_true", help="Отвечать 400 на response_format")
+    parser.add_argument(
+        "--model-latency",
+        action="append",
+        default=[],
+        metavar="MODEL=MS",
+        help="Своя средняя задержка модели (можно повторять)",
+    )
+    args = parser.parse_args()
+    model_latency = {}
+    for item in args.model_latency:
+        model, _, ms = item.rpartition("=")
+        if not model:
+            parser.error(f"--model-latency: ожидается MODEL=MS, получено {item}")
+        model_latency[model] = float(ms)
+
+    config = MockConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        stream_chunks=args.stream_chunks,
+        noisy_rate=args.noisy_rate,
+        broken_rate=args.broken_rate,
+        structured=not args.no_structured,
+        model_latency_ms=model_latency,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    server.daemon_threads = True
+    print(f"Mock LLM: http://{args.host}:{args.port}/v1 (статистика: GET /v1/stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
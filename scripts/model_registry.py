@@ -0,0 +1,60 @@
+"""
+Управление реестром версий модели.
+
+Запуск из корня проекта:
+  python scripts/model_registry.py list
+  python scripts/model_registry.py activate 20260301-120000   # откат или переключение версии
+
+Работающие воркеры подхватывают новую активную версию в течение ML_RELOAD_INTERVAL секунд.
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.ml import ModelRegistry
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Реестр версий ML-модели")
+    parser.add_argument("--registry", type=Path, default=None, help="Каталог реестра (по умолчанию MODEL_REGISTRY_PATH)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="Показать версии")
+    activate = sub.add_parser("activate", help="Сделать версию активной")
+    activate.add_argument("version")
+    args = parser.parse_args()
+
+    registry_path = args.registry or ROOT / os.getenv("MODEL_REGISTRY_PATH", "data/models/registry")
+    if not registry_path.is_absolute():
+        registry_path = ROOT / registry_path
+    registry = ModelRegistry(registry_path)
+
+    if args.command == "activate":
+        try:
+            registry.activate(args.version)
+        except FileNotFoundError as e:
+            print(f"Ошибка: {e}")
+            sys.exit(1)
+        print(f"Активная версия: {args.version}")
+        return
+
+    active = registry.active_version()
+    versions = registry.versions()
+    if not versions:
+        print(f"Реестр пуст: {registry_path}")
+        return
+    for manifest in versions:
+        mark = "*" if manifest["version"] == active else " "
+        accuracy = manifest.get("metrics", {}).get("accuracy")
+        accuracy = f"{accuracy:.4f}" if isinstance(accuracy, (int, float)) else "—"
+        data_hash = (manifest.get("data_hash") or "—")[:12]
+        print(f"{mark} {manifest['version']:<20} {manifest['created_at']:<28} accuracy {accuracy}   data {data_hash}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,9 +9,17 @@
 
 Или с указанием путей (опционально):
   python scripts/train_model.py --data data/labeled/labeled_requests.csv --output data/models/text_clf.pkl
+
+Потоковое обучение на больших корпусах (память не зависит от объёма данных):
+  python scripts/train_model.py --streaming --chunk-size 50000 --n-jobs 4
+  python scripts/train_model.py --streaming --source db --database-url sqlite:///./data/app.db
+
+Публикация новой версии в реестр (работающие воркеры подхватят её без перезапуска):
+  python scripts/train_model.py --register
 """
 
 import argparse
+import hashlib
 import os
 import sys
 from pathlib import Path
@@ -21,7 +29,8 @@ ROOT = Path(__file__).resolve().parent.parent
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from app.ml import MLModel
+from app.ml import MLModel, ModelRegistry, csv_chunks, requests_chunks
+from app.ml.registry import file_sha256
 
 
 def main() -> None:
@@ -50,7 +59,62 @@ def main() -> None:
         default="label",
         help="Имя колонки с меткой",
     )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Потоковое обучение порциями (HashingVectorizer + SGDClassifier)",
+    )
+    parser.add_argument(
+        "--source",
+        choices=("csv", "db"),
+        default="csv",
+        help="Источник для --streaming: CSV или таблица requests",
+    )
+    parser.add_argument(
+        "--database-url",
+        type=str,
+        default=None,
+        help="БД для --source db (по умолчанию DATABASE_URL)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=10_000,
+        help="Строк в порции при --streaming",
+    )
+    parser.add_argument(
+        "--n-jobs",
+        type=int,
+        default=1,
+        help="Процессов для векторизации и обучения при --streaming (-1 — все ядра)",
+    )
+    parser.add_argument(
+        "--epochs",
+        type=int,
+        default=5,
+        help="Проходов по данным при --streaming",
+    )
+    parser.add_argument(
+        "--n-features",
+        type=int,
+        default=2 ** 20,
+        help="Размер пространства признаков HashingVectorizer",
+    )
+    parser.add_argument(
+        "--register",
+        action="store_true",
+        help="Опубликовать модель новой активной версией в реестре",
+    )
+    parser.add_argument(
+        "--registry",
+        type=Path,
+        default=None,
+        help="Каталог реестра (по умолчанию MODEL_REGISTRY_PATH)",
+    )
     args = parser.parse_args()
+    registry_path = args.registry or ROOT / os.getenv("MODEL_REGISTRY_PATH", "data/models/registry")
+    if not registry_path.is_absolute():
+        registry_path = ROOT / registry_path
 
     data_path = args.data or ROOT / os.getenv("LABELED_DATA_PATH", "data/labeled/labeled_requests.csv")
     model_path = args.output or ROOT / os.getenv("ML_MODEL_PATH", "data/models/text_clf.pkl")
@@ -60,6 +124,24 @@ def main() -> None:
     if not model_path.is_absolute():
         model_path = ROOT / model_path
 
+    if args.streaming and args.source == "db":
+        database_url = args.database_url or os.getenv("DATABASE_URL", "sqlite:///./data/app.db")
+        print(f"Данные: таблица requests ({database_url})")
+        print(f"Модель будет сохранена: {model_path}")
+        model = MLModel(model_path)
+        # Хэш id и меток прочитанных строк: версия модели ссылается на конкретный набор данных
+        data_digest = hashlib.sha256()
+        metrics = model.train_streaming(
+            requests_chunks(database_url, chunk_size=args.chunk_size, digest=data_digest),
+            n_features=args.n_features,
+            n_jobs=args.n_jobs,
+            epochs=args.epochs,
+        )
+        print_metrics(metrics, model)
+        if args.register:
+            register(registry_path, model, metrics, data_digest.hexdigest(), {"source": "db", "streaming": True})
+        return
+
     if not data_path.exists():
         print(f"Ошибка: файл с данными не найден: {data_path}")
         print("Убедитесь, что data/labeled/labeled_requests.csv существует.")
@@ -69,17 +151,57 @@ def main() -> None:
     print(f"Модель будет сохранена: {model_path}")
 
     model = MLModel(model_path)
-    metrics = model.train(
-        data_path,
-        text_column=args.text_column,
-        label_column=args.label_column,
+    if args.streaming:
+        metrics = model.train_streaming(
+            csv_chunks(
+                data_path,
+                text_column=args.text_column,
+                label_column=args.label_column,
+                chunk_size=args.chunk_size,
+            ),
+            n_features=args.n_features,
+            n_jobs=args.n_jobs,
+            epochs=args.epochs,
+        )
+    else:
+        metrics = model.train(
+            data_path,
+            text_column=args.text_column,
+            label_column=args.label_column,
+        )
+    print_metrics(metrics, model)
+    if args.register:
+        register(
+            registry_path,
+            model,
+            metrics,
+            file_sha256(data_path),
+            {"source": str(data_path), "streaming": args.streaming},
+        )
+
+
+def register(registry_path: Path, model: MLModel, metrics: dict, data_hash, params: dict) -> None:
+    manifest_metrics = {
+        key: metrics[key]
+        for key in ("accuracy", "classification_report", "confusion_matrix", "classes", "train_rows", "test_rows")
+        if key in metrics
+    }
+    version = ModelRegistry(registry_path).publish(
+        model.model_path, metrics=manifest_metrics, data_hash=data_hash, params=params
     )
+    print(f"Версия {version} опубликована и активирована в {registry_path}")
+
 
+def print_metrics(metrics: dict, model: MLModel) -> None:
     print("\n--- Результаты обучения ---")
+    if "train_rows" in metrics:
+        print(f"Строк: обучение {metrics['train_rows']}, проверка {metrics['test_rows']}")
     print(f"Accuracy: {metrics['accuracy']:.4f}")
     print("\nClassification report:")
     print(metrics["classification_report"])
-    print(f"\nМодель сохранена: {model_path}")
+    print(f"\nМодель сохранена: {model.model_path}")
+    if model.compact_path.exists():
+        print(f"Компактная модель для инференса: {model.compact_path}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,31 @@
+from pathlib import Path
+
+import joblib
+import pytest
+
+from app.db import get_engine, get_session_factory, init_db
+from app.ml import MLModel, train_tfidf
+
+ROOT = Path(__file__).resolve().parent.parent
+LABELED_CSV = ROOT / "data" / "labeled" / "labeled_requests.csv"
+
+
+@pytest.fixture(scope="session")
+def pipeline():
+    pipeline, _ = train_tfidf(LABELED_CSV)
+    return pipeline
+
+
+@pytest.fixture
+def ml_model(pipeline, tmp_path):
+    path = tmp_path / "text_clf.pkl"
+    joblib.dump(pipeline, path)
+    return MLModel(path, use_compact=False).load()
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = get_engine(f"sqlite:///{tmp_path / 'app.db'}", sqlite_wal=True, sqlite_busy_timeout_ms=5000)
+    init_db(engine)
+    yield get_session_factory(engine)
+    engine.dispose()
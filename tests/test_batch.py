@@ -0,0 +1,59 @@
+from sqlalchemy import func, select
+
+from app.db import Request
+from app.llm import SUMMARY_FALLBACK
+from app.services import RequestAnalyzerService
+
+
+class FakeLLM:
+    """Клиент LLM без сети: ошибка для текстов со словом «сбой»."""
+
+    def summarize_request(self, text):
+        if "сбой" in text:
+            raise RuntimeError("LLM unavailable")
+        return f"Резюме: {text}"
+
+    def extract_fields(self, text, keys=None):
+        return {"total_debt": 100, "creditors_count": None, "has_overdue": None, "notes": None}
+
+
+def _count(session_factory):
+    session = session_factory()
+    try:
+        return session.scalar(select(func.count()).select_from(Request))
+    finally:
+        session.close()
+
+
+def test_failed_item_does_not_fail_batch(ml_model, session_factory):
+    service = RequestAnalyzerService(ml_model, FakeLLM(), session_factory, llm_mode="sequential")
+    results = service.analyze_many(["Долг 300 тыс.", "сбой", "  ", None, "Хочу банкротство"])
+
+    assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+    assert results[1]["error"] == "Ошибка обработки заявки"
+    assert results[2]["error"] == results[3]["error"] == "Текст заявки не может быть пустым"
+    for ok in (results[0], results[4]):
+        assert "error" not in ok
+        assert ok["id"] is not None
+        assert ok["summary"].startswith("Резюме:")
+        assert ok["fields"]["total_debt"] == 100
+    # Сохраняются только успешные элементы
+    assert _count(session_factory) == 2
+
+
+def test_parallel_mode_falls_back_per_item(ml_model, session_factory):
+    service = RequestAnalyzerService(ml_model, FakeLLM(), session_factory, llm_mode="parallel")
+    results = service.analyze_many(["сбой", "Долг 300 тыс."], save=False)
+    # Сбой одного вызова — запасное резюме у этого элемента, поля от второго вызова
+    assert results[0]["summary"] == SUMMARY_FALLBACK
+    assert results[0]["fields"]["total_debt"] == 100
+    assert results[1]["summary"] == "Резюме: Долг 300 тыс."
+    assert all(r["id"] is None for r in results)
+    assert _count(session_factory) == 0
+
+
+def test_classification_only_batch(ml_model, session_factory):
+    service = RequestAnalyzerService(ml_model, FakeLLM(), session_factory)
+    results = service.analyze_many(["сбой", "Долг 300 тыс."], with_llm=False)
+    assert all(r["label"] is not None and r["summary"] is None and r["fields"] is None for r in results)
+    assert _count(session_factory) == 2
@@ -0,0 +1,69 @@
+from app.llm import PromptBudget, TokenBudgets, count_tokens
+from app.llm.budget import GAP_MARKER, compress_text, split_chunks
+
+FILLER = "Клиент подробно описывает свою жизненную ситуацию и переживания."
+IMPORTANT = "Общий долг 1,2 млн руб перед 5 банками."
+TEXT = " ".join([FILLER] * 5 + [IMPORTANT] + [FILLER] * 5)
+
+
+def test_text_within_budget_is_unchanged():
+    assert compress_text(IMPORTANT, 1000) == IMPORTANT
+
+
+def test_compression_keeps_numbers_and_marks_gaps():
+    budget = count_tokens(IMPORTANT) + count_tokens(FILLER) + 10
+    compressed = compress_text(TEXT, budget)
+    assert count_tokens(compressed) <= budget
+    assert IMPORTANT in compressed
+    assert compressed.startswith(FILLER)
+    assert GAP_MARKER in compressed
+    assert f"{GAP_MARKER} {GAP_MARKER}" not in compressed
+
+
+def test_scorer_decides_which_sentences_stay():
+    text = "Первое предложение. Второе предложение про ипотеку. Третье предложение."
+    compressed = compress_text(text, count_tokens("Второе предложение про ипотеку.") + 5,
+                               scorer=lambda s: 1.0 if "ипотек" in s else 0.0)
+    assert compressed == f"{GAP_MARKER} Второе предложение про ипотеку. {GAP_MARKER}"
+
+
+def test_single_long_sentence_is_truncated():
+    compressed = compress_text("а" * 3000, 100)
+    assert count_tokens(compressed) <= 100
+
+
+def test_split_chunks_respects_budget_and_sentence_order():
+    chunks = split_chunks(TEXT, 60)
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 60 for chunk in chunks)
+    assert " ".join(chunks) == TEXT
+
+
+def test_budgets_fit_and_max_tokens():
+    budgets = TokenBudgets({"summary": PromptBudget(50, 200), "fields": PromptBudget(0, 0)})
+    assert count_tokens(budgets.fit("summary", TEXT)) <= 50
+    # Нулевой или незаданный бюджет — без ограничения
+    assert budgets.fit("fields", TEXT) == TEXT
+    assert budgets.fit("combined", TEXT) == TEXT
+    assert budgets.max_tokens("summary") == 200
+    assert budgets.max_tokens("fields") is None
+    assert budgets.max_tokens("combined") is None
+
+
+def test_map_chunks_only_above_threshold():
+    budgets = TokenBudgets({"map": PromptBudget(60, 100)}, map_reduce_tokens=count_tokens(TEXT))
+    assert budgets.map_chunks(TEXT) is None
+    assert TokenBudgets({"map": PromptBudget(60, 100)}).map_chunks(TEXT) is None
+
+    budgets = TokenBudgets({"map": PromptBudget(60, 100)}, map_reduce_tokens=50)
+    chunks = budgets.map_chunks(TEXT)
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 60 for chunk in chunks)
+
+
+def test_map_chunks_count_is_limited():
+    long_text = " ".join([TEXT] * 10)
+    budgets = TokenBudgets({"map": PromptBudget(60, 100)}, map_reduce_tokens=50, map_max_chunks=3)
+    chunks = budgets.map_chunks(long_text)
+    assert len(chunks) <= 3
+    assert IMPORTANT in " ".join(chunks)
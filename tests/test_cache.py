@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.llm import MemoryLRUCache, SQLiteCache, create_cache
+from app.llm import cache as cache_module
+from app.llm.cache import make_cache_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1_000_000.0)
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_cache(request, tmp_path, clock):
+    def make(max_size=2, ttl=60):
+        cache = create_cache(request.param, max_size, ttl, tmp_path / "llm_cache.sqlite")
+        # Вытеснение в SQLite проверяется на каждой записи
+        cache.EVICT_EVERY = 1
+        return cache
+
+    return make
+
+
+def _tick(clock):
+    clock.value += 1
+
+
+def test_get_returns_copy_of_stored_value(make_cache):
+    cache = make_cache()
+    cache.set("a", {"fields": {"total_debt": 100}})
+    value = cache.get("a")
+    value["fields"]["total_debt"] = 0
+    assert cache.get("a") == {"fields": {"total_debt": 100}}
+    assert cache.get("missing") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 1, 1)
+
+
+def test_lru_evicts_least_recently_used(make_cache, clock):
+    cache = make_cache(max_size=2)
+    cache.set("a", 1)
+    _tick(clock)
+    cache.set("b", 2)
+    _tick(clock)
+    # Чтение делает «a» недавно использованным — вытесняется «b»
+    assert cache.get("a") == 1
+    _tick(clock)
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["size"] == 2
+
+
+def test_ttl_expires_entries(make_cache, clock):
+    cache = make_cache(ttl=60)
+    cache.set("a", 1)
+    clock.value += 59
+    assert cache.get("a") == 1
+    clock.value += 2
+    assert cache.get("a") is None
+
+
+def test_zero_ttl_never_expires(make_cache, clock):
+    cache = make_cache(ttl=0)
+    cache.set("a", 1)
+    clock.value += 10 ** 9
+    assert cache.get("a") == 1
+
+
+def test_sqlite_cache_is_shared_between_instances(tmp_path, clock):
+    path = tmp_path / "llm_cache.sqlite"
+    SQLiteCache(path).set("a", [1, 2])
+    other = SQLiteCache(path)
+    assert other.get("a") == [1, 2]
+    assert other.stats()["hits"] == 1
+
+
+def test_create_cache_backends(tmp_path):
+    assert create_cache("none", 10, 60) is None
+    assert isinstance(create_cache("memory", 10, 60), MemoryLRUCache)
+    with pytest.raises(ValueError):
+        create_cache("sqlite", 10, 60)
+    with pytest.raises(ValueError):
+        create_cache("redis", 10, 60)
+
+
+def test_cache_key_normalizes_text_and_includes_params():
+    key = make_cache_key("gpt", "v1", "Долг  300 тыс.\n", 0.2)
+    assert key == make_cache_key("gpt", "v1", "Долг 300 тыс.", 0.2)
+    assert key != make_cache_key("gpt", "v2", "Долг 300 тыс.", 0.2)
+    assert key != make_cache_key("gpt", "v1", "Долг 300 тыс.", 0.0)
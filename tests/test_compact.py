@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+from app.ml import CompactModel
+
+from .conftest import LABELED_CSV
+
+TEXTS = [
+    "Не могу платить по кредитам, три банка, общий долг 800 тысяч. Что делать?",
+    "Какие документы нужны для банкротства? Справки из банков уже есть.",
+    "Готов подать заявление в арбитражный суд, нужна помощь с госпошлиной.",
+    "Совсем короткий текст",
+    "",
+]
+
+
+def _assert_parity(pipeline):
+    compact = CompactModel.from_pipeline(pipeline)
+    np.testing.assert_allclose(compact.predict_proba(TEXTS), pipeline.predict_proba(TEXTS), rtol=1e-9, atol=1e-12)
+    assert list(compact.classes_) == [str(c) for c in pipeline.classes_]
+
+
+def test_parity_with_trained_pipeline(pipeline):
+    _assert_parity(pipeline)
+
+
+@pytest.mark.parametrize(
+    "vectorizer, classifier",
+    [
+        (TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True), LogisticRegression(max_iter=1000)),
+        (TfidfVectorizer(binary=True, norm="l1"), LogisticRegression(max_iter=1000, C=10)),
+        (TfidfVectorizer(use_idf=False), LogisticRegression(max_iter=1000)),
+    ],
+)
+def test_parity_with_vectorizer_options(vectorizer, classifier):
+    df = pd.read_csv(LABELED_CSV)
+    pipeline = Pipeline([("tfidf", vectorizer), ("clf", classifier)]).fit(df["text"], df["label"])
+    _assert_parity(pipeline)
+
+
+def test_parity_binary():
+    df = pd.read_csv(LABELED_CSV)
+    df = df[df["label"].isin(sorted(df["label"].unique())[:2])]
+    pipeline = Pipeline([("tfidf", TfidfVectorizer()), ("clf", LogisticRegression(solver="liblinear"))])
+    _assert_parity(pipeline.fit(df["text"], df["label"]))
+
+
+def test_save_load_roundtrip(pipeline, tmp_path):
+    compact = CompactModel.from_pipeline(pipeline)
+    compact.save(tmp_path / "model.compact")
+    loaded = CompactModel.load(tmp_path / "model.compact", mmap_mode="r")
+    np.testing.assert_allclose(loaded.predict_proba(TEXTS), compact.predict_proba(TEXTS))
+
+
+def test_unsupported_pipeline():
+    pipeline = Pipeline([("tfidf", TfidfVectorizer(analyzer="char")), ("clf", LogisticRegression())])
+    with pytest.raises(ValueError):
+        CompactModel.from_pipeline(pipeline)
@@ -0,0 +1,49 @@
+import pytest
+
+from app.db import Request
+from app.services import DuplicateIndex
+
+ORIGINAL = (
+    "Здравствуйте. Не могу платить по кредитам уже полгода, три банка и микрозаймы, общий долг "
+    "1 200 000 рублей, звонят коллекторы. Хочу понять, могу ли оформить банкротство."
+)
+
+
+@pytest.fixture
+def index(ml_model, session_factory):
+    session = session_factory()
+    session.add(Request(raw_text=ORIGINAL, summary="Клиент просит оценить банкротство.", extracted={"total_debt": 1_200_000}))
+    session.commit()
+    session.close()
+    index = DuplicateIndex(ml_model, session_factory, threshold=0.9)
+    index.rebuild()
+    return index
+
+
+def _find(index, text):
+    return index.find(text, index.vectorize(text))
+
+
+def test_same_text_is_duplicate(index):
+    found = _find(index, ORIGINAL + " Спасибо.")
+    assert found is not None
+    assert found["id"] == 1
+    assert found["similarity"] >= index.threshold
+    assert found["extracted"] == {"total_debt": 1_200_000}
+
+
+def test_changed_amount_is_not_duplicate(index):
+    assert _find(index, ORIGINAL.replace("1 200 000", "3 500 000")) is None
+
+
+def test_unrelated_text_is_not_duplicate(index):
+    text = "Подскажите, какие документы нужны для заявления о банкротстве в арбитражный суд и сколько стоит процедура."
+    assert _find(index, text) is None
+
+
+def test_threshold(index):
+    text = ORIGINAL.replace("полгода", "год")
+    similarity = _find(index, text)
+    assert similarity is not None
+    index.threshold = min(1.0, similarity["similarity"] + 0.001)
+    assert _find(index, text) is None
@@ -0,0 +1,60 @@
+import time
+from datetime import timedelta
+
+from sqlalchemy import update
+
+from app.db import Request
+from app.db.models import STATUS_DONE, STATUS_PENDING, STATUS_RUNNING, utcnow
+from app.services import JobWorkerPool, RequestAnalyzerService
+
+
+def _pool(ml_model, session_factory, workers=0, **kwargs):
+    # Режим classify: задачи обрабатываются без LLM
+    analyzer = RequestAnalyzerService(ml_model, None, session_factory)
+    return JobWorkerPool(analyzer, session_factory, workers=workers, **kwargs)
+
+
+def test_claim_takes_pending_jobs_once_in_order(ml_model, session_factory):
+    pool = _pool(ml_model, session_factory)
+    first, second = pool.submit("Долг 300 тыс. руб"), pool.submit("Хочу банкротство")
+
+    assert pool._claim() == (first, "Долг 300 тыс. руб")
+    assert pool.get(first)["status"] == STATUS_RUNNING
+    # Задача с действующей арендой повторно не выдаётся
+    assert pool._claim() == (second, "Хочу банкротство")
+    assert pool._claim() is None
+
+
+def test_expired_lease_is_claimed_again(ml_model, session_factory):
+    pool = _pool(ml_model, session_factory, lease_seconds=60)
+    job_id = pool.submit("Долг 300 тыс. руб")
+    assert pool._claim() is not None
+    assert pool._claim() is None
+
+    # Воркер упал посреди обработки: аренда истекла
+    session = session_factory()
+    session.execute(
+        update(Request).where(Request.id == job_id).values(claimed_at=utcnow() - timedelta(seconds=61))
+    )
+    session.commit()
+    session.close()
+    assert pool._claim() == (job_id, "Долг 300 тыс. руб")
+
+
+def test_worker_processes_submitted_job(ml_model, session_factory):
+    pool = _pool(ml_model, session_factory, workers=1, poll_interval=0.05)
+    pool.ensure_started()
+    try:
+        job_id = pool.submit("Долг 300 тыс. руб, хочу банкротство")
+        deadline = time.monotonic() + 5
+        while pool.get(job_id)["status"] in (STATUS_PENDING, STATUS_RUNNING):
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+    finally:
+        pool.stop(timeout=5)
+
+    job = pool.get(job_id)
+    assert job["status"] == STATUS_DONE
+    assert job["result"]["label"] is not None
+    assert job["result"]["summary"] is None
+    assert pool.get(job_id + 1) is None
@@ -0,0 +1,49 @@
+import pytest
+
+from app.services.routing import Route, RoutingPolicy, parse_routes, template_summary
+
+
+def test_parse_routes():
+    assert parse_routes("консультация:0.85:600=template, консультация:0.6=light, *:0:300=light") == [
+        Route("консультация", 0.85, 600, "template"),
+        Route("консультация", 0.6, None, "light"),
+        Route(None, 0.0, 300, "light"),
+    ]
+    assert parse_routes("") == []
+
+
+@pytest.mark.parametrize("spec", ["консультация", "консультация=cheap", "a:b=light", "a:0.5:10:1=light", ":0.5=skip"])
+def test_parse_routes_invalid(spec):
+    with pytest.raises(ValueError):
+        parse_routes(spec)
+
+
+def test_route_first_match_wins():
+    policy = RoutingPolicy.from_spec("консультация:0.85:600=template,консультация:0.6=light,*:0:300=light")
+    short = "Долг 300 тыс."
+    long = "слово " * 200
+    assert policy.route("консультация", 0.9, short) == "template"
+    assert policy.route("консультация", 0.9, long) == "light"
+    assert policy.route("консультация", 0.5, short) == "light"
+    assert policy.route("консультация", 0.5, long) == "full"
+    assert policy.route("подача_заявления", 0.95, long) == "full"
+    assert policy.tiers == {"template", "light", "full"}
+
+
+def test_route_without_confidence_skips_thresholds():
+    policy = RoutingPolicy.from_spec("консультация:0.6=skip,консультация=light", default_tier="full")
+    assert policy.route("консультация", None, "текст") == "light"
+    assert policy.route(None, None, "текст") == "full"
+
+
+def test_unknown_default_tier():
+    with pytest.raises(ValueError):
+        RoutingPolicy([], default_tier="cheap")
+
+
+def test_template_summary():
+    fields = {"total_debt": 1_200_000, "creditors_count": 3, "has_overdue": True}
+    assert template_summary("подача_заявления", fields) == (
+        "Категория: подача заявления. Долг 1 200 000 руб.; кредиторов: 3; есть просрочка."
+    )
+    assert template_summary(None, {}).startswith("Категория не определена.")
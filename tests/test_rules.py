@@ -0,0 +1,55 @@
+from app.nlp.rules import RuleExtractor
+
+
+def _extract(text):
+    return RuleExtractor().extract(text)
+
+
+def test_overdue_negative():
+    assert _extract("Просрочек нет, плачу вовремя")["has_overdue"] == {"value": False, "confidence": 0.85}
+
+
+def test_overdue_positive():
+    assert _extract("Есть просрочка 2 месяца")["has_overdue"] == {"value": True, "confidence": 0.85}
+
+
+def test_overdue_latest_mention_wins_with_low_confidence():
+    found = _extract("Раньше платил без просрочек, сейчас просрочка 3 месяца")["has_overdue"]
+    assert found["value"] is True
+    assert found["confidence"] < 0.8
+
+    found = _extract("Была просрочка, сейчас плачу вовремя")["has_overdue"]
+    assert found["value"] is False
+    assert found["confidence"] < 0.8
+
+
+def test_total_debt_multipliers():
+    assert _extract("Общий долг 1,2 млн руб")["total_debt"]["value"] == 1_200_000
+    assert _extract("Всего задолженность 850 тыс. рублей")["total_debt"]["value"] == 850_000
+    assert _extract("Долг 350 000 ₽")["total_debt"]["value"] == 350_000
+
+
+def test_total_debt_prefers_total_over_parts():
+    text = "По ипотеке остался 2 млн, платить стало тяжело после сокращения на работе. Всего должен 2,1 млн руб"
+    assert _extract(text)["total_debt"]["value"] == 2_100_000
+
+
+def test_total_debt_conflicting_amounts_low_confidence():
+    found = _extract("Кредит 300 тыс. руб и займ 50 тыс. руб")["total_debt"]
+    assert found["confidence"] < 0.8
+
+
+def test_bare_numbers_are_not_debt():
+    assert "total_debt" not in _extract("5 кредиторов, просрочка 6 месяцев")
+
+
+def test_creditors_count_digits_and_words():
+    assert _extract("У меня 5 кредиторов")["creditors_count"] == {"value": 5, "confidence": 0.9}
+    assert _extract("Долги в трёх банках")["creditors_count"]["value"] == 3
+    assert _extract("Должен двум МФО")["creditors_count"]["value"] == 2
+
+
+def test_creditors_count_instrumental_case():
+    assert _extract("Договорилась с двумя кредиторами о рассрочке")["creditors_count"]["value"] == 2
+    assert _extract("Спор с тремя банками")["creditors_count"]["value"] == 3
+    assert _extract("Суды с пятью МФО")["creditors_count"]["value"] == 5
@@ -0,0 +1,51 @@
+import pytest
+
+from app.llm.schema import coerce_fields, to_bool, to_int
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (850000, 850000),
+        (1.5, 2),
+        ("850 000 руб.", 850000),
+        ("1,2 млн", 1_200_000),
+        ("1.5 млн", 1_500_000),
+        ("1,200,000", 1_200_000),
+        ("1,200", 1200),
+        ("1,200 руб.", 1200),
+        ("1,20", 1),
+        ("1,250 млн", 1_250_000),
+        ("1,200.50", 1200),
+        ("2 тыс", 2000),
+        ("1.5", 2),
+        ("нет данных", None),
+        (True, None),
+        (None, None),
+        (float("nan"), None),
+    ],
+)
+def test_to_int(value, expected):
+    assert to_int(value) == expected
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [(True, True), ("да", True), ("false", False), (0, False), ("возможно", None), (None, None)],
+)
+def test_to_bool(value, expected):
+    assert to_bool(value) is expected
+
+
+def test_coerce_fields():
+    data = {"total_debt": "1,2 млн", "creditors_count": "3", "has_overdue": "да", "notes": "  ", "extra": 1}
+    assert coerce_fields(data, ["total_debt", "creditors_count", "has_overdue", "notes"]) == {
+        "total_debt": 1_200_000,
+        "creditors_count": 3,
+        "has_overdue": True,
+        "notes": None,
+    }
+
+
+def test_coerce_fields_missing_keys():
+    assert coerce_fields({}, ["total_debt", "notes"]) == {"total_debt": None, "notes": None}
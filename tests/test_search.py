@@ -0,0 +1,92 @@
+import pytest
+from sqlalchemy import delete, update
+
+from app.db import Request, fts_available, search_requests
+from app.db import search
+
+
+@pytest.fixture
+def session(session_factory):
+    session = session_factory()
+    if not fts_available(session.get_bind()):
+        pytest.skip("SQLite собрана без FTS5")
+    yield session
+    session.close()
+
+
+def _add(session, raw_text, summary=None, label="консультация"):
+    req = Request(raw_text=raw_text, summary=summary, label=label)
+    session.add(req)
+    session.commit()
+    return req.id
+
+
+def _ids(session, query, **kwargs):
+    return [hit["id"] for hit in search_requests(session, query, **kwargs)]
+
+
+def test_triggers_index_insert_update_delete(session):
+    req_id = _add(session, "Просрочка по кредитной карте")
+    assert _ids(session, "кредитной") == [req_id]
+    assert _ids(session, "ипотека") == []
+
+    # Резюме задачи /api/jobs записывается после вставки
+    session.execute(update(Request).where(Request.id == req_id).values(summary="Клиент просит реструктуризацию"))
+    session.commit()
+    assert _ids(session, "реструктуризацию") == [req_id]
+
+    session.execute(update(Request).where(Request.id == req_id).values(raw_text="Долг по ипотеке"))
+    session.commit()
+    assert _ids(session, "кредитной") == []
+    assert _ids(session, "ипотеке") == [req_id]
+
+    session.execute(delete(Request).where(Request.id == req_id))
+    session.commit()
+    assert _ids(session, "ипотеке") == []
+
+
+def test_yo_matches_ye(session):
+    req_id = _add(session, "Расчётный счёт арестован")
+    assert _ids(session, "расчетный") == [req_id]
+    assert _ids(session, "расчётный") == [req_id]
+
+
+def test_stem_expands_to_word_forms(session):
+    forms = [_add(session, text) for text in ("Долг по ипотеке", "Ипотека и кредит", "Платил ипотеку")]
+    _add(session, "Кредитная карта")
+    assert sorted(_ids(session, "ипотека")) == forms
+    assert search.query_stems("Ипотека ипотеки") == ["ипотек"]
+
+
+def test_all_words_required_and_label_filter(session):
+    both = _add(session, "Ипотека и просрочка", label="банкротство")
+    _add(session, "Ипотека, две просрочки", label="консультация")
+    _add(session, "Только ипотека")
+    assert sorted(_ids(session, "ипотека просрочка")) == sorted([both, both + 1])
+    assert _ids(session, "ипотека просрочка", label="банкротство") == [both]
+
+
+def test_frequent_words_fall_back_to_recency(session, monkeypatch):
+    ids = [_add(session, f"Долг по ипотеке, заявка {i}") for i in range(3)]
+    monkeypatch.setattr(search, "RANK_MAX_DOCS", 2)
+    hits = search_requests(session, "ипотека", limit=2)
+    assert [hit["id"] for hit in hits] == ids[::-1][:2]
+    assert all(hit["score"] is None for hit in hits)
+
+    monkeypatch.setattr(search, "RANK_MAX_DOCS", 50_000)
+    assert all(hit["score"] is not None for hit in search_requests(session, "ипотека"))
+
+
+def test_special_characters_are_not_query_syntax(session):
+    req_id = _add(session, "Долг 300 тыс. по кредиту")
+    assert _ids(session, 'кредиту" OR "*') == []
+    assert _ids(session, "кредиту (долг)") == [req_id]
+    assert _ids(session, "!!!") == []
+
+
+def test_snippet_escapes_html(session):
+    _add(session, 'Долг по ипотеке <script>alert("x")</script> & кредит')
+    snippet = search_requests(session, "ипотека")[0]["snippet"]
+    assert "<script>" not in snippet
+    assert "&lt;script&gt;" in snippet and "&amp;" in snippet
+    assert "<mark>ипотеке</mark>" in snippet
@@ -0,0 +1,147 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from prometheus_client import REGISTRY
+
+from app.services import SingleFlight
+
+
+def _coalesced():
+    return REGISTRY.get_sample_value("analyze_coalesced_total", {"scope": "process"}) or 0
+
+
+def _wait_followers(before, count):
+    """Дождаться, пока count ожидающих войдут в single-flight."""
+    deadline = time.monotonic() + 5
+    while _coalesced() - before < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_followers_share_leader_result():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"id": 1, "fields": {"total_debt": 100}}
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        leader = pool.submit(flight.do, "key", work)
+        assert started.wait(5)
+        before = _coalesced()
+        followers = [pool.submit(flight.do, "key", work) for _ in range(3)]
+        _wait_followers(before, 3)
+        release.set()
+        results = [leader.result(5)] + [f.result(5) for f in followers]
+
+    assert len(calls) == 1
+    assert all(r == {"id": 1, "fields": {"total_debt": 100}} for r in results)
+    # Каждый запрос получает свою копию результата
+    results[1]["fields"]["total_debt"] = 0
+    assert results[2]["fields"]["total_debt"] == 100
+
+
+def test_stream_followers_replay_leader_events():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        yield "label", {"label": "a"}
+        started.set()
+        release.wait(5)
+        yield "summary", {"delta": "резюме"}
+        yield "done", {"id": 1}
+
+    def replay(result):
+        yield "done", result
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        leader = pool.submit(lambda: list(flight.stream("key", work, replay)))
+        assert started.wait(5)
+        before = _coalesced()
+        follower = pool.submit(lambda: list(flight.stream("key", work, replay)))
+        plain = pool.submit(flight.do, "key", lambda: {"id": 2})
+        _wait_followers(before, 2)
+        release.set()
+        events = [("label", {"label": "a"}), ("summary", {"delta": "резюме"}), ("done", {"id": 1})]
+        assert leader.result(5) == events
+        assert follower.result(5) == events
+        # Обычный вызов получает данные последнего события
+        assert plain.result(5) == {"id": 1}
+    assert len(calls) == 1
+
+
+def test_stream_follower_of_plain_call_uses_replay():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def work():
+        started.set()
+        release.wait(5)
+        return {"id": 3}
+
+    def replay(result):
+        yield "done", result
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "key", work)
+        assert started.wait(5)
+        before = _coalesced()
+        follower = pool.submit(lambda: list(flight.stream("key", lambda: iter(()), replay)))
+        _wait_followers(before, 1)
+        release.set()
+        assert leader.result(5) == {"id": 3}
+        assert follower.result(5) == [("done", {"id": 3})]
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    assert flight.do(SingleFlight.key("a"), lambda: 1) == 1
+    assert flight.do(SingleFlight.key("b"), lambda: 2) == 2
+
+
+def test_key_normalizes_whitespace():
+    assert SingleFlight.key("Долг  300 тыс.\n", True) == SingleFlight.key("Долг 300 тыс.", True)
+    assert SingleFlight.key("Долг 300 тыс.", True) != SingleFlight.key("Долг 300 тыс.", False)
+
+
+def test_leader_error_is_shared_and_released():
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    try:
+        flight.do("key", fail)
+    except RuntimeError:
+        pass
+    assert flight.do("key", lambda: "ok") == "ok"
+
+
+def test_shared_lock_returns_other_process_result(session_factory):
+    # Два объекта с общей БД — как два воркера gunicorn
+    first, second = SingleFlight(session_factory, poll_interval=0.01), SingleFlight(session_factory, poll_interval=0.01)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"id": 7}
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(first.do, "key", work)
+        assert started.wait(5)
+        follower = pool.submit(second.do, "key", work)
+        release.set()
+        assert leader.result(5) == {"id": 7}
+        assert follower.result(5) == {"id": 7}
+    assert len(calls) == 1
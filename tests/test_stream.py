@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+
+from app.services import RequestAnalyzerService
+
+FIELDS = {"total_debt": 100, "creditors_count": 2, "has_overdue": True, "notes": None}
+
+
+class FakeLLM:
+    """Клиент LLM без сети, записывающий порядок вызовов."""
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _call(self, name):
+        with self._lock:
+            self.calls.append(name)
+
+    def summarize_request(self, text):
+        self._call("summary")
+        return "Резюме заявки."
+
+    def summarize_request_stream(self, text):
+        self._call("summary_stream")
+        yield "Резюме "
+        yield "заявки."
+        self._call("summary_stream_end")
+
+    def extract_fields(self, text, keys=None):
+        self._call("fields")
+        return dict(FIELDS)
+
+    def analyze_request(self, text):
+        self._call("combined")
+        return "Резюме заявки.", dict(FIELDS)
+
+
+def _stream(service, text="Долг по кредитам, прошу помочь"):
+    return list(service.analyze_stream(text))
+
+
+@pytest.mark.parametrize("mode", ["parallel", "sequential", "single"])
+def test_stream_done_matches_analyze(ml_model, session_factory, mode):
+    service = RequestAnalyzerService(ml_model, FakeLLM(), session_factory, llm_mode=mode)
+    events = _stream(service)
+    names = [name for name, _ in events]
+    assert names[0] == "label" and names[-2:] == ["fields", "done"]
+    assert "".join(data["delta"] for name, data in events if name == "summary") == "Резюме заявки."
+
+    done = events[-1][1]
+    expected = service.analyze("Долг по кредитам, прошу помочь", save=False)
+    assert done["id"] is not None
+    assert {k: v for k, v in done.items() if k != "id"} == {k: v for k, v in expected.items() if k != "id"}
+    assert "model_version" in done
+
+
+def test_single_mode_makes_one_combined_call(ml_model, session_factory):
+    llm = FakeLLM()
+    service = RequestAnalyzerService(ml_model, llm, session_factory, llm_mode="single")
+    _stream(service)
+    assert llm.calls == ["combined"]
+
+
+def test_sequential_mode_extracts_fields_after_summary(ml_model, session_factory):
+    llm = FakeLLM()
+    service = RequestAnalyzerService(ml_model, llm, session_factory, llm_mode="sequential")
+    _stream(service)
+    assert llm.calls == ["summary_stream", "summary_stream_end", "fields"]
+
+
+def test_classify_mode_stream(ml_model, session_factory):
+    service = RequestAnalyzerService(ml_model, None, session_factory)
+    events = _stream(service)
+    assert [name for name, _ in events] == ["label", "done"]
+    assert set(events[-1][1]) == {"id", "label", "confidence", "model_version"}
+
+
+def test_empty_text_stream(ml_model, session_factory):
+    service = RequestAnalyzerService(ml_model, FakeLLM(), session_factory)
+    assert _stream(service, "   ") == [("error", {"error": "Текст заявки не может быть пустым"})]
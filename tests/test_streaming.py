@@ -0,0 +1,34 @@
+import hashlib
+
+from app.db import Request
+from app.db.models import STATUS_DONE, STATUS_PENDING
+from app.ml import requests_chunks
+
+
+def _add(session_factory, *rows):
+    session = session_factory()
+    session.add_all(Request(raw_text=text, label=label, status=status) for text, label, status in rows)
+    session.commit()
+    session.close()
+
+
+def test_requests_chunks_fix_rows_and_hash_them(session_factory, tmp_path):
+    _add(
+        session_factory,
+        ("Долг 300 тыс.", "консультация", STATUS_DONE),
+        ("Хочу банкротство", "банкротство", STATUS_DONE),
+        ("В очереди", None, STATUS_PENDING),
+        ("Без метки", None, STATUS_DONE),
+    )
+    digest = hashlib.sha256()
+    source = requests_chunks(f"sqlite:///{tmp_path / 'app.db'}", chunk_size=1, digest=digest)
+
+    first = list(source())
+    assert first == [(["Долг 300 тыс."], ["консультация"]), (["Хочу банкротство"], ["банкротство"])]
+    data_hash = digest.hexdigest()
+    assert data_hash == hashlib.sha256("1\tконсультация\n2\tбанкротство\n".encode("utf-8")).hexdigest()
+
+    # Заявки, добавленные во время обучения, в следующие проходы не попадают
+    _add(session_factory, ("Новая заявка", "консультация", STATUS_DONE))
+    assert list(source()) == first
+    assert digest.hexdigest() == data_hash
@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.db import Request, WriteBehindWriter
+
+
+def _counting(session_factory):
+    """Фабрика сессий, считающая транзакции записи (одна сессия на коммит)."""
+    sessions = []
+
+    def factory():
+        sessions.append(1)
+        return session_factory()
+
+    return factory, sessions
+
+
+def _texts(session_factory, ids):
+    session = session_factory()
+    try:
+        return [session.get(Request, record_id).raw_text for record_id in ids]
+    finally:
+        session.close()
+
+
+def test_group_commit_batches_concurrent_inserts(session_factory):
+    factory, sessions = _counting(session_factory)
+    writer = WriteBehindWriter(factory, interval_ms=200)
+    try:
+        futures = [writer.submit(raw_text=f"заявка {i}") for i in range(10)]
+        ids = [future.result(5) for future in futures]
+    finally:
+        writer.close()
+    assert len(set(ids)) == 10
+    assert len(sessions) == 1
+    assert _texts(session_factory, ids) == [f"заявка {i}" for i in range(10)]
+
+
+def test_batch_size_is_limited(session_factory):
+    factory, sessions = _counting(session_factory)
+    writer = WriteBehindWriter(factory, interval_ms=200, max_batch=3)
+    try:
+        futures = [writer.submit(raw_text=f"заявка {i}") for i in range(7)]
+        assert all(future.result(5) for future in futures)
+    finally:
+        writer.close()
+    assert len(sessions) == 3
+
+
+def test_close_flushes_buffer(session_factory):
+    # Интервал дольше теста: записи попадают в БД только при остановке
+    writer = WriteBehindWriter(session_factory, interval_ms=60_000)
+    futures = [writer.submit(raw_text="заявка")]
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures += list(pool.map(lambda i: writer.submit(raw_text=f"поток {i}"), range(2)))
+    writer.close(timeout=5)
+    assert all(future.done() for future in futures)
+    ids = [future.result() for future in futures]
+    assert sorted(_texts(session_factory, ids)) == ["заявка", "поток 0", "поток 1"]
+
+    # После остановки следующая вставка запускает поток заново
+    future = writer.submit(raw_text="ещё")
+    writer.close(timeout=5)
+    assert future.result(0)
+
+
+def test_failed_flush_fails_its_futures(session_factory):
+    writer = WriteBehindWriter(session_factory, interval_ms=1)
+    try:
+        with pytest.raises(TypeError):
+            writer.submit(no_such_column=1).result(5)
+        assert writer.submit(raw_text="заявка").result(5)
+    finally:
+        writer.close()
@@ -1,4 +1,12 @@
-"""WSGI entry point for gunicorn."""
+"""
+WSGI entry point for gunicorn.
+
+With `gunicorn --preload` this module is imported once in the master process:
+create_app() loads the ML model there (ML_PRELOAD=1), so workers inherit it
+after fork and share its memory pages copy-on-write. gunicorn.conf.py sets
+APP_PRELOADED=1: background threads (job workers, model reload) are then started
+by its post_fork hook in each worker instead of in the master.
+"""
 
 import os
 from pathlib import Path
@@ -10,4 +18,4 @@ os.chdir(ROOT)
 from app.main import create_app
 from app.config import Settings
 
-app = create_app(Settings())
+app = create_app(Settings(), background=os.environ.get("APP_PRELOADED") != "1")